@@ -3,6 +3,8 @@ Antivirus Manager for LoadifyPro
 Provides a robust framework for integrating various antivirus engines.
 """
 import os
+import heapq
+import itertools
 import logging
 import threading
 import subprocess
@@ -11,27 +13,50 @@ import json
 import hashlib
 import shutil
 import sys
-from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
-import requests
+from scan_cache import ScanVerdictCache
+from virustotal_client import VirusTotalClient, DEFAULT_BASE_URL
+from scan_engines import ScanEngine, ScanResult, ScanStatus, StreamScan, ClamdEngine
+from scan_history import ScanHistory
 
 logger = logging.getLogger(__name__)
 
+# Scan queue priority classes; within a class smaller files are scanned first
+USER_SCAN_PRIORITY, AUTO_SCAN_PRIORITY = 0, 1
+HASH_CHUNK_SIZE = 1024 * 1024
+# VirusTotal "unknown file" answers are cached briefly, since the file may be submitted by someone else soon
+UNKNOWN_VERDICT_TTL = 6 * 3600
+
 class AntivirusEngine(Enum):
     WINDOWS_DEFENDER = "windows_defender"
     VIRUSTOTAL = "virustotal"
+    CLAMD = "clamd"
+
+class _MethodEngine(ScanEngine):
+    """(Internal) Adapts one of AntivirusManager's built-in scan methods to the ScanEngine interface."""
+    def __init__(self, method): self.method = method
+    def scan_file(self, file_path, config, result): return self.method(file_path, config, result)
+
+class StreamingScan:
+    """
+    A download's bytes on their way to the active engine's stream scan. The bytes are
+    hashed as they pass, so the verdict can be cached without reading the file again.
+    """
+    def __init__(self, manager: 'AntivirusManager', download_id: str, config: dict, stream: StreamScan):
+        self.manager, self.download_id, self.config, self.stream = manager, download_id, config, stream
+        self.sha256 = hashlib.sha256()
 
-class ScanStatus(Enum):
-    PENDING, SCANNING, CLEAN, INFECTED, ERROR, QUARANTINED, TIMEOUT, SKIPPED = "PENDING", "SCANNING", "CLEAN", "INFECTED", "ERROR", "QUARANTINED", "TIMEOUT", "SKIPPED"
+    def feed(self, data: bytes):
+        self.sha256.update(data); self.stream.feed(data)
 
-@dataclass
-class ScanResult:
-    file_path: str; engine: AntivirusEngine; status: ScanStatus
-    threats_found: List[str] = field(default_factory=list)
-    scan_time: float = 0.0
-    scan_date: str = field(default_factory=lambda: time.strftime('%Y-%m-%d %H:%M:%S'))
-    error_message: str = ""; file_hash: str = ""
+    def finish(self):
+        """Call once the download is complete; the verdict is then used by scan_file_async."""
+        if verdict := self.stream.finish():
+            with self.manager.lock: self.manager.stream_verdicts[self.download_id] = (self.sha256.hexdigest(), self.config, verdict)
+
+    def abort(self):
+        self.stream.abort()
 
 class AntivirusManager:
     """Manages all antivirus scanning, configuration, and quarantine operations."""
@@ -39,9 +64,27 @@ class AntivirusManager:
         self.configs: Dict[str, dict] = {}
         self.active_config_name: Optional[str] = None
         self.quarantine_dir = os.path.join(os.getcwd(), "quarantine")
-        self.scan_history: List[ScanResult] = []
+        self.scan_history = ScanHistory()
         self.lock = threading.Lock()
         self.update_callback = update_callback
+        self.verdict_cache = ScanVerdictCache()
+        self.vt_clients: Dict[tuple, VirusTotalClient] = {}  # One per key/endpoint, so pacing and quota are shared by all scans
+        self.engines: Dict[str, ScanEngine] = {
+            AntivirusEngine.WINDOWS_DEFENDER.value: _MethodEngine(self._scan_with_defender),
+            AntivirusEngine.VIRUSTOTAL.value: _MethodEngine(self._scan_with_virustotal),
+            AntivirusEngine.CLAMD.value: ClamdEngine(),
+        }
+        self.stream_verdicts: Dict[str, tuple] = {}  # download id -> (sha256, config, verdict) from scans fed during download
+        # Bounded scan pool: a heap of (priority, file size, seq, download id) served by up to max_concurrent_scans workers.
+        # Cancelled or re-submitted scans leave stale heap entries that workers skip (queued_scans holds the live seq).
+        self.max_concurrent_scans = 2
+        self.scan_queue: List[Tuple[int, int, int, str]] = []
+        self.queued_scans: Dict[str, Tuple[int, str, dict, Optional[ScanResult]]] = {}  # download id -> (seq, file path, config, verdict streamed during download)
+        self.scan_wakeup = threading.Condition()
+        self.scan_sequence = itertools.count()
+        self.scan_workers = 0
+        self.running_scans = 0
+        self.scans_stopped = False
         os.makedirs(self.quarantine_dir, exist_ok=True)
         self._init_default_configs()
 
@@ -49,33 +92,142 @@ class AntivirusManager:
         if "Windows Defender" not in self.configs and sys.platform == "win32":
             self.configs["Windows Defender"] = {'engine': AntivirusEngine.WINDOWS_DEFENDER.value, 'enabled': True, 'auto_scan': True, 'quarantine_infected': True}
         if "VirusTotal" not in self.configs:
-            self.configs["VirusTotal"] = {'engine': AntivirusEngine.VIRUSTOTAL.value, 'enabled': True, 'auto_scan': False, 'api_key': ''}
+            self.configs["VirusTotal"] = {'engine': AntivirusEngine.VIRUSTOTAL.value, 'enabled': True, 'auto_scan': False, 'api_key': '', 'requests_per_minute': 4, 'daily_quota': 500}
+        if "ClamAV" not in self.configs:
+            self.configs["ClamAV"] = {'engine': AntivirusEngine.CLAMD.value, 'enabled': True, 'auto_scan': True, 'address': '127.0.0.1:3310', 'stream_during_download': True, 'quarantine_infected': True}
         if self.active_config_name is None and "Windows Defender" in self.configs:
             self.active_config_name = "Windows Defender"
 
-    def scan_file_async(self, file_path: str, download_id: str):
+    def register_engine(self, engine_id: str, engine: ScanEngine):
+        """Makes an engine available to configs whose 'engine' is `engine_id`."""
+        self.engines[engine_id] = engine
+
+    def open_stream(self, download_id: str) -> Optional[StreamingScan]:
+        """
+        Starts scanning a download while it is written, if the active engine supports it and
+        auto-scan is on. The caller feeds every byte in order and calls finish() on completion
+        (or abort() otherwise).
+        """
+        config = self.configs.get(self.active_config_name) if self.active_config_name else None
+        if not config or not config.get('enabled') or not config.get('auto_scan') or not (engine := self.engines.get(config.get('engine'))):
+            return None
+        try:
+            stream = engine.open_stream(config)
+        except Exception as e:
+            logger.warning(f"Could not start a stream scan for {download_id}: {e}"); return None
+        return StreamingScan(self, download_id, config, stream) if stream else None
+
+    def scan_file_async(self, file_path: str, download_id: str, user_requested: bool = False):
+        """
+        Queues a file for scanning. User-requested scans are served before automatic ones,
+        and smaller files before larger ones; submitting a queued download again replaces its entry.
+        """
+        with self.lock: streamed = self.stream_verdicts.pop(download_id, None)
         if not self.active_config_name or self.active_config_name not in self.configs: return
         config = self.configs[self.active_config_name]
-        if not config.get('enabled') or not config.get('auto_scan'):
+        if not config.get('enabled') or not (user_requested or config.get('auto_scan')):
             if self.update_callback: self.update_callback(download_id, {'scan_status': ScanStatus.SKIPPED.value})
             return
-        threading.Thread(target=self._scan_file_worker, args=(file_path, config, download_id), daemon=True).start()
+        streamed_result = None
+        if streamed and not user_requested:
+            # Scanned while downloading: the verdict is known, but quarantine and history writes still go through the pool
+            file_hash, config, (status, threats) = streamed
+            streamed_result = ScanResult(file_path=file_path, engine=config['engine'], status=ScanStatus(status), threats_found=list(threats), file_hash=file_hash)
+        if streamed_result: size = 0
+        else:
+            try: size = os.path.getsize(file_path)
+            except OSError: size = 0
+        priority = USER_SCAN_PRIORITY if user_requested or streamed_result else AUTO_SCAN_PRIORITY
+        with self.scan_wakeup:
+            if self.scans_stopped: return
+            seq = next(self.scan_sequence)
+            self.queued_scans[download_id] = (seq, file_path, config, streamed_result)
+            heapq.heappush(self.scan_queue, (priority, size, seq, download_id))
+            start_worker = self.scan_workers < self.max_concurrent_scans
+            if start_worker: self.scan_workers += 1
+            self.scan_wakeup.notify()
+        if self.update_callback: self.update_callback(download_id, {'scan_status': ScanStatus.PENDING.value})
+        if start_worker: threading.Thread(target=self._scan_pool_worker, name="av-scan", daemon=True).start()
+
+    def set_max_concurrent_scans(self, count: int):
+        """Resizes the scan pool; surplus workers exit once their current scan is done."""
+        with self.scan_wakeup:
+            self.max_concurrent_scans = max(count, 1)
+            extra = max(min(self.max_concurrent_scans - self.scan_workers, len(self.queued_scans)), 0)
+            self.scan_workers += extra
+            self.scan_wakeup.notify_all()
+        for _ in range(extra): threading.Thread(target=self._scan_pool_worker, name="av-scan", daemon=True).start()
+
+    def cancel_scan(self, download_id: str) -> bool:
+        """Drops a scan that has not started yet. Returns False if it was not queued."""
+        with self.scan_wakeup:
+            cancelled = self.queued_scans.pop(download_id, None) is not None
+        if cancelled and self.update_callback: self.update_callback(download_id, {'scan_status': ScanStatus.CANCELLED.value})
+        return cancelled
+
+    def get_queue_stats(self) -> Dict[str, int]:
+        """Returns the number of scans waiting and running."""
+        with self.scan_wakeup:
+            return {'queued': len(self.queued_scans), 'running': self.running_scans}
+
+    def shutdown(self):
+        """Discards queued scans and stops idle workers; a scan in progress finishes on its own."""
+        with self.scan_wakeup:
+            self.scans_stopped = True
+            self.queued_scans.clear(); self.scan_queue.clear()
+            self.scan_wakeup.notify_all()
+        self.scan_history.close()
+
+    def _scan_pool_worker(self):
+        while True:
+            with self.scan_wakeup:
+                while not self.scan_queue and not self.scans_stopped and self.scan_workers <= self.max_concurrent_scans:
+                    self.scan_wakeup.wait()
+                if self.scans_stopped or self.scan_workers > self.max_concurrent_scans:
+                    self.scan_workers -= 1  # Stopped, or the pool was shrunk
+                    return
+                _, _, seq, download_id = heapq.heappop(self.scan_queue)
+                job = self.queued_scans.get(download_id)
+                if not job or job[0] != seq: continue  # Cancelled or superseded
+                del self.queued_scans[download_id]
+                self.running_scans += 1
+            try:
+                if streamed_result := job[3]:
+                    self.verdict_cache.put(streamed_result.file_hash, streamed_result.engine, {'status': streamed_result.status.value, 'threats_found': streamed_result.threats_found, 'scan_date': streamed_result.scan_date})
+                    self._finish_scan(streamed_result, job[2], download_id)
+                else:
+                    self._scan_file_worker(job[1], job[2], download_id)
+            except Exception as e:
+                logger.error(f"Scan of {job[1]} failed: {e}")
+            finally:
+                with self.scan_wakeup: self.running_scans -= 1
 
     def _scan_file_worker(self, file_path: str, config: dict, download_id: str):
         if self.update_callback: self.update_callback(download_id, {'scan_status': ScanStatus.SCANNING.value})
         start_time = time.time(); file_hash = self._calculate_file_hash(file_path)
-        engine = AntivirusEngine(config['engine'])
-        result = ScanResult(file_path=file_path, engine=engine, status=ScanStatus.SCANNING, file_hash=file_hash)
+        engine_id = config['engine']
+        result = ScanResult(file_path=file_path, engine=engine_id, status=ScanStatus.SCANNING, file_hash=file_hash)
         try:
             if not os.path.exists(file_path): raise FileNotFoundError("File to scan does not exist.")
-            method = {'WINDOWS_DEFENDER': self._scan_with_defender, 'VIRUSTOTAL': self._scan_with_virustotal}.get(engine.name)
-            if method: result = method(file_path, config, result)
-            else: raise ValueError(f"Unsupported engine: {engine}")
+            if cached := self.verdict_cache.get(file_hash, engine_id):
+                # Identical content already has a verdict from this engine
+                result.status, result.threats_found, result.from_cache = ScanStatus(cached['status']), list(cached['threats_found']), True
+            else:
+                engine = self.engines.get(engine_id)
+                if engine: result = engine.scan_file(file_path, config, result)
+                else: raise ValueError(f"Unsupported engine: {engine_id}")
+                if result.status in (ScanStatus.CLEAN, ScanStatus.INFECTED):
+                    self.verdict_cache.put(file_hash, engine_id, {'status': result.status.value, 'threats_found': result.threats_found, 'scan_date': result.scan_date}, result.cache_ttl_sec)
         except Exception as e: logger.error(f"Scan worker failed: {e}"); result.status = ScanStatus.ERROR; result.error_message = str(e)
         result.scan_time = time.time() - start_time
+        self._finish_scan(result, config, download_id)
+
+    def _finish_scan(self, result: ScanResult, config: dict, download_id: str):
+        """(Internal) Quarantines and records a verdict. Runs on a scan pool worker, never the GUI thread."""
+        file_path = result.file_path
         if result.status == ScanStatus.INFECTED and config.get('quarantine_infected'):
             if self._quarantine_file(file_path): result.status = ScanStatus.QUARANTINED
-        with self.lock: self.scan_history.append(result)
+        self.scan_history.add(result)
         if self.update_callback: self.update_callback(download_id, {'scan_status': result.status.value, 'scan_result': result.threats_found})
 
     def _scan_with_defender(self, file_path, config, result):
@@ -89,18 +241,20 @@ class AntivirusManager:
         except subprocess.TimeoutExpired: result.status = ScanStatus.TIMEOUT; result.error_message = "Scan timed out."
         return result
 
-    def _scan_with_virustotal(self, file_path, config, result):
+    def _virustotal_client(self, config: dict) -> VirusTotalClient:
         api_key = config.get('api_key')
         if not api_key: raise ValueError("VirusTotal API key is not configured.")
-        url, headers = f"https://www.virustotal.com/api/v3/files/{result.file_hash}", {"x-apikey": api_key}
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code == 404: result.status = ScanStatus.CLEAN; result.threats_found.append("File not on VirusTotal (Unknown)."); return result
-            response.raise_for_status()
-            stats = response.json().get("data", {}).get("attributes", {}).get("last_analysis_stats", {})
-            if stats.get("malicious", 0) > 0: result.status = ScanStatus.INFECTED; result.threats_found.append(f"{stats['malicious']} engines flagged this file.")
-            else: result.status = ScanStatus.CLEAN
-        except requests.exceptions.RequestException as e: raise ConnectionError(f"VirusTotal API request failed: {e}")
+        key = (api_key, config.get('api_base_url') or DEFAULT_BASE_URL, config.get('requests_per_minute', 4), config.get('daily_quota', 500))
+        with self.lock:
+            if key not in self.vt_clients: self.vt_clients[key] = VirusTotalClient(*key)
+            return self.vt_clients[key]
+
+    def _scan_with_virustotal(self, file_path, config, result):
+        if not result.file_hash: raise ValueError("Could not hash the file for a VirusTotal lookup.")
+        stats = self._virustotal_client(config).lookup_file(result.file_hash)
+        if stats is None: result.status = ScanStatus.CLEAN; result.threats_found.append("File not on VirusTotal (Unknown)."); result.cache_ttl_sec = UNKNOWN_VERDICT_TTL; return result
+        if stats.get("malicious", 0) > 0: result.status = ScanStatus.INFECTED; result.threats_found.append(f"{stats['malicious']} engines flagged this file.")
+        else: result.status = ScanStatus.CLEAN
         return result
 
     def _quarantine_file(self, file_path: str) -> bool:
@@ -114,7 +268,7 @@ class AntivirusManager:
         sha256 = hashlib.sha256()
         try:
             with open(file_path, "rb") as f:
-                while chunk := f.read(8192): sha256.update(chunk)
+                while chunk := f.read(HASH_CHUNK_SIZE): sha256.update(chunk)
             return sha256.hexdigest()
         except (FileNotFoundError, IOError) as e: logger.error(f"Could not hash file {file_path}: {e}"); return ""
 
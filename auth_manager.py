@@ -1,13 +1,82 @@
 """
 Authentication Manager for LoadifyPro
 Handles credentials for downloads requiring HTTP Basic or Digest authentication.
+Credentials can be scoped to a host (and optionally a realm), and each server's auth
+scheme and Digest nonce are remembered, so after the first challenge every request
+(including resumes and segments) authenticates up front instead of costing a 401.
 """
+import os
+import re
+import base64
+import hashlib
+import threading
 import logging
-from typing import Optional, Tuple
-from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Tuple
+
+from requests.auth import AuthBase, HTTPBasicAuth
+from requests.cookies import extract_cookies_to_jar
+from requests.utils import parse_dict_header
 
 logger = logging.getLogger(__name__)
 
+DIGEST_HASHES = {'MD5': 'md5', 'MD5-SESS': 'md5', 'SHA-256': 'sha256', 'SHA-256-SESS': 'sha256', 'SHA-512-256': 'sha512_256', 'SHA-512-256-SESS': 'sha512_256'}
+AUTH_PARAM = r'[\w-]+\s*=\s*(?:"(?:[^"\\]|\\.)*"|[^,\s]*)'
+CHALLENGE = re.compile(rf'(?:^|,)\s*(basic|digest)\s+({AUTH_PARAM}(?:\s*,\s*{AUTH_PARAM})*)', re.IGNORECASE)
+
+class AuthChallenge:
+    """A server's last auth challenge, shared by all requests to it."""
+
+    def __init__(self, scheme: str, params: dict):
+        self.scheme = scheme  # 'basic' or 'digest'
+        self.realm = params.get('realm', '')
+        self.nonce = params.get('nonce', '')
+        self.opaque = params.get('opaque')
+        self.algorithm = (params.get('algorithm') or 'MD5').upper()
+        self.qop = [value.strip() for value in (params.get('qop') or '').split(',') if value.strip()]
+        self.nonce_count = 0
+
+def _parse_challenges(header: str) -> Dict[str, dict]:
+    """(Internal) WWW-Authenticate header -> {scheme: params} for the Basic and Digest challenges it contains."""
+    return {match.group(1).lower(): parse_dict_header(match.group(2)) for match in CHALLENGE.finditer(header or '')}
+
+class _HostAuth(AuthBase):
+    """(Internal) requests auth for one host; authenticates from the cached challenge and learns from 401s."""
+
+    def __init__(self, manager: 'AuthManager', host: str, port: int):
+        self.manager = manager
+        self.host, self.port = host, port
+
+    def __call__(self, r):
+        header = self.manager._authorization(self.host, self.port, r.method, r.url)
+        if header: r.headers['Authorization'] = header
+        r.register_hook('response', self._handle_401)
+        return r
+
+    def _handle_401(self, r, **kwargs):
+        if r.status_code != 401 or getattr(r.request, 'loadify_auth_retry', False):
+            return r
+        # After a redirect to another host the challenge is not ours to answer (or to cache)
+        parts = urlsplit(r.url)
+        if ((parts.hostname or '').lower(), parts.port or (443 if parts.scheme == 'https' else 80)) != (self.host, self.port):
+            return r
+        challenges = _parse_challenges(r.headers.get('www-authenticate', ''))
+        if not self.manager._learn(self.host, self.port, challenges, r.request.headers.get('Authorization')):
+            return r  # No usable challenge, no credentials for it, or the credentials were just rejected
+        # Retry once with the new challenge, on the same connection (as requests' own Digest auth does)
+        r.content
+        r.close()
+        prep = r.request.copy()
+        prep.loadify_auth_retry = True
+        extract_cookies_to_jar(prep._cookies, r.request, r.raw)
+        prep.prepare_cookies(prep._cookies)
+        header = self.manager._authorization(self.host, self.port, prep.method, prep.url)
+        if header: prep.headers['Authorization'] = header
+        retried = r.connection.send(prep, **kwargs)
+        retried.history.append(r)
+        retried.request = prep
+        return retried
+
 class AuthManager:
     """Manages authentication credentials for HTTP requests."""
 
@@ -15,41 +84,123 @@ class AuthManager:
         """Initializes the AuthManager."""
         self.credentials: Optional[Tuple[str, str]] = None
         self.is_enabled = False
+        self.scoped_credentials: List[dict] = []
+        self.challenges: Dict[Tuple[str, int], AuthChallenge] = {}
+        self.host_auth: Dict[Tuple[str, int], _HostAuth] = {}
+        self.lock = threading.Lock()
         logger.info("AuthManager initialized.")
 
-    def configure(self, is_enabled: bool, username: str, password: str):
+    def configure(self, is_enabled: bool, username: str, password: str, scoped_credentials: Optional[List[dict]] = None):
         """
         Configures and enables or disables authentication.
 
         Args:
             is_enabled (bool): Whether authentication should be active.
-            username (str): The username for authentication.
+            username (str): The username for authentication (used for hosts without scoped credentials).
             password (str): The password for authentication.
+            scoped_credentials (list, optional): Dicts with 'host', 'username', 'password' and an optional
+                                                 'realm'. A host entry also covers its subdomains.
         """
         self.is_enabled = is_enabled
-        if self.is_enabled and username:
-            self.credentials = (username, password)
-            logger.info(f"Authentication ENABLED for user '{username}'.")
+        with self.lock:
+            self.scoped_credentials = [entry for entry in scoped_credentials or [] if entry.get('host') and entry.get('username')]
+            self.challenges.clear()  # Challenges answered with the old credentials may no longer apply
+        if self.is_enabled and (username or self.scoped_credentials):
+            self.credentials = (username, password) if username else None
+            logger.info(f"Authentication ENABLED for user '{username}' and {len(self.scoped_credentials)} scoped credentials.")
         else:
             self.is_enabled = False
             self.credentials = None
             logger.info("Authentication DISABLED.")
 
-    def get_auth(self, auth_type: str = 'basic') -> Optional[object]:
+    def get_auth(self, url: Optional[str] = None) -> Optional[object]:
         """
         Returns a requests.auth object if authentication is enabled and configured.
 
         Args:
-            auth_type (str): The type of authentication ('basic' or 'digest').
+            url (str, optional): The URL being requested. With a URL, the returned object is
+                                 shared by all requests to that host and reuses its challenge.
 
         Returns:
             A requests.auth object or None.
         """
-        if not self.is_enabled or not self.credentials:
+        if not self.is_enabled:
+            return None
+        if not url:
+            return HTTPBasicAuth(*self.credentials) if self.credentials else None
+        try:
+            parts = urlsplit(url)
+            key = ((parts.hostname or '').lower(), parts.port or (443 if parts.scheme == 'https' else 80))
+        except ValueError:
             return None
+        with self.lock:
+            if not self._find_credentials(key[0], None, any_realm=True):
+                return None
+            if key not in self.host_auth: self.host_auth[key] = _HostAuth(self, *key)
+            return self.host_auth[key]
+
+    def _find_credentials(self, host: str, realm: Optional[str], any_realm: bool = False) -> Optional[Tuple[str, str]]:
+        """(Internal) Most specific credentials for host (and realm): realm-scoped, then host-scoped, then global. Caller holds the lock."""
+        matching = [entry for entry in self.scoped_credentials
+                    if host == entry['host'].lower() or host.endswith('.' + entry['host'].lower().lstrip('.'))]
+        for entry in sorted(matching, key=lambda entry: (not entry.get('realm'), -len(entry['host']))):
+            if not entry.get('realm') or any_realm or entry['realm'] == realm:
+                return entry['username'], entry.get('password', '')
+        return self.credentials
+
+    def _authorization(self, host: str, port: int, method: str, url: str) -> Optional[str]:
+        """(Internal) The Authorization header for a request, from the host's cached challenge (Basic until one is seen)."""
+        with self.lock:
+            challenge = self.challenges.get((host, port))
+            credentials = self._find_credentials(host, challenge.realm if challenge else None)
+            if not credentials:
+                return None
+            if not challenge or challenge.scheme == 'basic':
+                return 'Basic ' + base64.b64encode(f"{credentials[0]}:{credentials[1]}".encode('latin-1', 'replace')).decode('ascii')
+            challenge.nonce_count += 1
+            nonce_count = challenge.nonce_count
+        return self._digest_header(challenge, nonce_count, credentials, method, url)
 
-        username, password = self.credentials
-        if auth_type.lower() == 'digest':
-            return HTTPDigestAuth(username, password)
-        
-        return HTTPBasicAuth(username, password)
\ No newline at end of file
+    def _learn(self, host: str, port: int, challenges: Dict[str, dict], sent_authorization: Optional[str]) -> bool:
+        """
+        (Internal) Caches the challenge from a 401. Returns True if the request is worth retrying:
+        there are credentials for the challenge, and the 401 was not simply a rejection of them.
+        """
+        scheme = 'digest' if 'digest' in challenges and challenges['digest'].get('algorithm', 'MD5').upper() in DIGEST_HASHES else 'basic' if 'basic' in challenges else None
+        if not scheme:
+            return False
+        challenge = AuthChallenge(scheme, challenges[scheme])
+        with self.lock:
+            previous = self.challenges.get((host, port))
+            self.challenges[(host, port)] = challenge
+            if not self._find_credentials(host, challenge.realm):
+                return False
+        if not sent_authorization:
+            return True
+        if scheme == 'digest':
+            # A stale nonce only means it expired; the same nonce again means the credentials were wrong
+            stale = challenges['digest'].get('stale', '').lower() == 'true'
+            return stale or not sent_authorization.startswith('Digest ') or not previous or previous.nonce != challenge.nonce
+        return not sent_authorization.startswith('Basic ') or (previous is not None and previous.realm != challenge.realm)
+
+    @staticmethod
+    def _digest_header(challenge: AuthChallenge, nonce_count: int, credentials: Tuple[str, str], method: str, url: str) -> str:
+        """(Internal) RFC 7616 Digest response for one request."""
+        username, password = credentials
+        hash_name = DIGEST_HASHES[challenge.algorithm]
+        digest = lambda value: hashlib.new(hash_name, value.encode('utf-8')).hexdigest()
+        parts = urlsplit(url)
+        uri = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        cnonce = os.urandom(8).hex()
+        ha1 = digest(f"{username}:{challenge.realm}:{password}")
+        if challenge.algorithm.endswith('-SESS'): ha1 = digest(f"{ha1}:{challenge.nonce}:{cnonce}")
+        ha2 = digest(f"{method}:{uri}")
+        fields = [f'username="{username}"', f'realm="{challenge.realm}"', f'nonce="{challenge.nonce}"', f'uri="{uri}"', f'algorithm={challenge.algorithm}']
+        if 'auth' in challenge.qop:
+            response = digest(f"{ha1}:{challenge.nonce}:{nonce_count:08x}:{cnonce}:auth:{ha2}")
+            fields += ['qop=auth', f'nc={nonce_count:08x}', f'cnonce="{cnonce}"']
+        else:
+            response = digest(f"{ha1}:{challenge.nonce}:{ha2}")
+        fields.append(f'response="{response}"')
+        if challenge.opaque is not None: fields.append(f'opaque="{challenge.opaque}"')
+        return 'Digest ' + ', '.join(fields)
@@ -0,0 +1,140 @@
+"""
+Bandwidth Profiles for LoadifyPro
+Switches the global speed limit between time-of-day profiles (e.g. throttled during
+business hours, unlimited overnight) by scheduling each transition on the Scheduler.
+"""
+import logging
+import threading
+from datetime import datetime, time as dt_time, timedelta
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)  # Monday == 0, as returned by datetime.weekday()
+
+class BandwidthProfile:
+    """A data class describing a speed limit that applies during a daily time window."""
+    def __init__(self, name: str, limit_kb: float, start: str, end: str, days=ALL_DAYS):
+        self.name = name
+        self.limit_kb = limit_kb  # 0 means unlimited
+        self.start = _parse_hhmm(start)
+        self.end = _parse_hhmm(end)
+        self.days = tuple(days)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BandwidthProfile':
+        return cls(data.get('name', ''), float(data.get('limit_kb', 0)), data.get('start', '00:00'), data.get('end', '00:00'), data.get('days', ALL_DAYS))
+
+    def matches(self, now: datetime) -> bool:
+        """
+        Returns True if the profile is active at `now`. A window whose end is before its
+        start runs overnight and belongs to the weekday on which it starts.
+        """
+        t, weekday = now.time(), now.weekday()
+        if self.start == self.end:
+            return weekday in self.days
+        if self.start < self.end:
+            return weekday in self.days and self.start <= t < self.end
+        return (t >= self.start and weekday in self.days) or (t < self.end and (weekday - 1) % 7 in self.days)
+
+def _parse_hhmm(value: str) -> dt_time:
+    hours, minutes = value.split(':')
+    return dt_time(int(hours), int(minutes))
+
+class BandwidthProfileManager:
+    """Keeps the SpeedLimiter in line with the active bandwidth profile."""
+
+    def __init__(self, scheduler, speed_limiter):
+        """
+        Initializes the BandwidthProfileManager.
+
+        Args:
+            scheduler: The application Scheduler used to run profile transitions.
+            speed_limiter: The SpeedLimiter retuned whenever the active profile changes.
+        """
+        self.scheduler = scheduler
+        self.speed_limiter = speed_limiter
+        self.profiles: List[BandwidthProfile] = []
+        self.is_enabled = False
+        self.default_enabled = False
+        self.default_limit_kb = 0.0
+        self.active_profile: Optional[BandwidthProfile] = None
+        self._applied: Optional[tuple] = None
+        self._next_job_id: Optional[str] = None
+        self._generation = 0  # Bumped by every apply_current, so a superseded one drops the job it scheduled
+        self.lock = threading.Lock()
+        logger.info("BandwidthProfileManager initialized.")
+
+    def configure(self, is_enabled: bool, profiles: List[dict], default_enabled: bool, default_limit_kb: float):
+        """
+        Configures the profiles and applies the one active right now.
+
+        Args:
+            is_enabled (bool): Whether profiles should override the static speed limit.
+            profiles (list): Profile dicts ('name', 'limit_kb', 'start', 'end', 'days'); the first match wins.
+            default_enabled (bool): Static speed limit state used when no profile matches.
+            default_limit_kb (float): Static speed limit in KB/s used when no profile matches.
+        """
+        with self.lock:
+            self.is_enabled = is_enabled
+            self.profiles = []
+            for data in profiles or []:
+                try: self.profiles.append(BandwidthProfile.from_dict(data))
+                except (ValueError, AttributeError) as e: logger.error(f"Ignoring invalid bandwidth profile {data}: {e}")
+            self.default_enabled = default_enabled
+            self.default_limit_kb = default_limit_kb
+            self._applied = None  # Force the limiter to pick up the new configuration
+        self.apply_current()
+
+    def apply_current(self, now: Optional[datetime] = None):
+        """Applies the profile active at `now` and schedules the next transition."""
+        now = now or datetime.now()
+        # The plan is made under our lock, but the scheduler is only called outside it: the scheduler
+        # takes its own lock and runs _on_transition, so holding both would invite a lock-order deadlock
+        with self.lock:
+            stale_job_id, self._next_job_id = self._next_job_id, None
+            self._generation += 1
+            generation = self._generation
+
+            profile = next((p for p in self.profiles if p.matches(now)), None) if self.is_enabled else None
+            self.active_profile = profile
+            if profile:
+                target = (profile.limit_kb > 0, profile.limit_kb)
+            else:
+                target = (self.default_enabled, self.default_limit_kb)
+
+            # Only retune on an actual change so running transfers keep their accumulated tokens
+            if target != self._applied:
+                self.speed_limiter.configure(*target)
+                self._applied = target
+                logger.info(f"Bandwidth profile '{profile.name if profile else 'default'}' applied.")
+
+            next_change = self._next_boundary(now) if self.is_enabled and self.profiles else None
+
+        if stale_job_id:
+            self.scheduler.cancel_job(stale_job_id)
+        if not next_change:
+            return
+        job_id = self.scheduler.schedule_task(next_change, self._on_transition)
+        with self.lock:
+            superseded = generation != self._generation  # A newer apply_current has scheduled its own transition
+            if not superseded:
+                self._next_job_id = job_id
+        if superseded:
+            self.scheduler.cancel_job(job_id)
+
+    def _on_transition(self):
+        """(Internal) Scheduler callback fired at a profile window boundary."""
+        with self.lock:
+            self._next_job_id = None  # This job has already left the scheduler
+        self.apply_current()
+
+    def _next_boundary(self, now: datetime) -> Optional[datetime]:
+        """
+        (Internal) Returns the earliest profile start or end strictly after `now`. Boundaries
+        recur daily, so the next one is always within a day; on days a profile does not
+        cover the re-evaluation is simply a no-op.
+        """
+        candidates = [datetime.combine(now.date() + timedelta(days=offset), boundary)
+                      for profile in self.profiles for boundary in (profile.start, profile.end) for offset in (0, 1)]
+        return min((moment for moment in candidates if moment > now), default=None)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Speed Limiter Micro-Benchmark for LoadifyPro
+Measures limiter overhead (lock acquisitions per GB and raw throughput ceiling) for
+per-chunk consume() versus batched ByteCredit grants, plus pacing accuracy at a real limit.
+
+Usage: python bench_speed_limiter.py [--gb 1] [--threads 4]
+"""
+import argparse
+import threading
+import time
+
+from speed_limiter import SpeedLimiter
+
+CHUNK_SIZE = 8192
+GB = 1024 ** 3
+
+class CountingLock:
+    """Wraps a lock and counts how many times it is acquired."""
+    def __init__(self, lock):
+        self._lock = lock
+        self.acquisitions = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquisitions += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+def _run(limiter: SpeedLimiter, total_bytes: int, threads: int, batched: bool) -> float:
+    per_thread = total_bytes // threads
+
+    def worker():
+        credit = limiter.credit() if batched else None
+        charge = credit.consume if batched else limiter.consume
+        for _ in range(per_thread // CHUNK_SIZE):
+            charge(CHUNK_SIZE)
+        if credit: credit.release()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers: t.start()
+    for t in workers: t.join()
+    return time.perf_counter() - start
+
+def bench_overhead(gigabytes: float, threads: int):
+    """Limit set far above what the loop can reach, so only limiter overhead is measured."""
+    total = int(gigabytes * GB)
+    print(f"Overhead: {gigabytes:g} GB in {CHUNK_SIZE} B chunks across {threads} threads")
+    for batched in (False, True):
+        limiter = SpeedLimiter()
+        limiter.configure(True, 100 * 1024 * 1024)  # 100 GB/s
+        limiter.lock = CountingLock(limiter.lock)
+        elapsed = _run(limiter, total, threads, batched)
+        name = "ByteCredit grants" if batched else "consume() per chunk"
+        print(f"  {name:<22} {limiter.lock.acquisitions / gigabytes:>12,.0f} locks/GB  {total / elapsed / 1024**2:>10,.0f} MB/s ceiling")
+
+def bench_pacing(limit_kb: float, seconds: float, threads: int):
+    """Checks that batched grants still deliver the configured rate."""
+    limiter = SpeedLimiter()
+    limiter.configure(True, limit_kb, burst_kb=limit_kb / 10)
+    total = int(limit_kb * 1024 * seconds)
+    elapsed = _run(limiter, total, threads, batched=True)
+    print(f"Pacing: target {limit_kb:,.0f} KB/s, achieved {total / elapsed / 1024:,.0f} KB/s over {elapsed:.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--gb', type=float, default=1.0, help="Gigabytes pushed through the limiter in the overhead run")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent transfer threads")
+    args = parser.parse_args()
+    bench_overhead(args.gb, args.threads)
+    bench_pacing(limit_kb=20 * 1024, seconds=2, threads=args.threads)
+
+if __name__ == "__main__":
+    main()
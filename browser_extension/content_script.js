@@ -33,7 +33,8 @@ function createQualityPopup() {
     `;
 
     const qualityOptions = [
-        { label: '🎬 Best Quality (Auto)', value: 'best', description: 'Highest available quality' },
+        { label: '⚡ Auto (Fits My Connection)', value: 'auto', description: 'Best quality that finishes within the target time' },
+        { label: '🎬 Best Quality', value: 'best', description: 'Highest available quality' },
         { label: '📺 4K (2160p)', value: '2160p', description: 'Ultra HD quality' },
         { label: '📺 1080p', value: '1080p', description: 'Full HD quality' },
         { label: '📺 720p', value: '720p', description: 'HD quality' },
@@ -19,7 +19,8 @@ class BrowserIntegrationListener:
         Initializes the listener.
 
         Args:
-            message_queue: A thread-safe queue to pass received URLs to the main app.
+            message_queue: A thread-safe queue receiving each decoded message dict, followed
+                           by None once the browser closes the connection.
         """
         self.message_queue = message_queue
         self.thread = None
@@ -58,10 +59,10 @@ class BrowserIntegrationListener:
                 message = sys.stdin.buffer.read(message_length).decode('utf-8')
                 data = json.loads(message)
 
-                if 'url' in data:
-                    logger.info(f"Received URL from browser: {data['url']}")
-                    # Put the URL into the queue for the main GUI thread to process
-                    self.message_queue.put(data['url'])
+                if 'url' in data or 'urls' in data:
+                    logger.info(f"Received message from browser: {data}")
+                    # Hand the whole message over; it may carry a quality or a batch of 'urls'
+                    self.message_queue.put(data)
 
             except (struct.error, json.JSONDecodeError, UnicodeDecodeError) as e:
                 logger.error(f"Error processing message from browser: {e}")
@@ -71,4 +72,6 @@ class BrowserIntegrationListener:
                 logger.error(f"An unexpected error occurred in the listener: {e}")
                 break
         
+        # Wake the consumer blocked on the queue: no more messages will arrive
+        self.message_queue.put(None)
         logger.info("Browser integration listener has stopped.")
@@ -0,0 +1,145 @@
+"""
+Device Scheduler for LoadifyPro
+Knows which storage device each download destination lives on, so the dispatcher can
+spread concurrent downloads across devices instead of piling writers onto one disk or
+network mount. Tracks active writers (with optional per-device limits) and the write
+throughput achieved on each device.
+"""
+import os
+import time
+import threading
+import logging
+from typing import Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DeviceKey = Union[int, str]
+
+class DeviceStats:
+    """Writers and throughput of one device."""
+
+    def __init__(self, device: DeviceKey, path: str):
+        self.device = device
+        self.path = path              # A destination on the device, to tell devices apart in logs
+        self.active = 0
+        self.total_bytes = 0
+        self.rate: Optional[float] = None  # Smoothed bytes/second across all writers
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+
+class DeviceScheduler:
+    """Thread-safe accounting of downloads per storage device (st_dev of the destination)."""
+
+    # Throughput is averaged over windows of this length
+    RATE_WINDOW_SEC = 1.0
+
+    def __init__(self, default_limit: int = 0, alpha: float = 0.3):
+        """
+        Initializes the DeviceScheduler.
+
+        Args:
+            default_limit (int): Concurrent downloads allowed per device. 0 means no limit (downloads
+                                 are still spread across devices when there is a choice).
+            alpha (float): Weight of each window in the smoothed throughput.
+        """
+        self.default_limit = default_limit
+        self.alpha = alpha
+        self.device_limits: Dict[DeviceKey, int] = {}
+        self.device_cache: Dict[str, DeviceKey] = {}
+        self.devices: Dict[DeviceKey, DeviceStats] = {}
+        self.assignments: Dict[str, Tuple[DeviceKey, int]] = {}  # item id -> (device, bytes accounted so far)
+        self.lock = threading.Lock()
+
+    def configure(self, default_limit: int, limits_by_folder: Optional[Dict[str, int]] = None):
+        """
+        Sets the writer limits.
+
+        Args:
+            default_limit (int): Concurrent downloads per device; 0 for no limit.
+            limits_by_folder (dict, optional): Folder -> limit for the device the folder is on
+                                               (the lowest applies if several folders share a device).
+        """
+        with self.lock:
+            self.device_cache.clear()  # Mounts may have changed
+        device_limits: Dict[DeviceKey, int] = {}
+        for folder, limit in (limits_by_folder or {}).items():
+            device = self.device_of(folder)
+            device_limits[device] = min(limit, device_limits.get(device, limit))
+        with self.lock:
+            self.default_limit = max(default_limit, 0)
+            self.device_limits = device_limits
+        logger.info(f"Device scheduler: {self.default_limit or 'no'} writer limit per device, {len(device_limits)} device override(s).")
+
+    def device_of(self, destination: str) -> DeviceKey:
+        """The device a destination folder is on: st_dev of the folder, or of its nearest existing parent."""
+        with self.lock:
+            if destination in self.device_cache:
+                return self.device_cache[destination]
+        path = os.path.abspath(destination or '.')
+        device: DeviceKey = os.path.normcase(path)  # Fallback when nothing along the path can be stat'ed
+        while True:
+            try:
+                device = os.stat(path).st_dev
+                break
+            except OSError:
+                parent = os.path.dirname(path)
+                if parent == path: break
+                path = parent
+        with self.lock:
+            self.device_cache[destination] = device
+        return device
+
+    def _limit(self, device: DeviceKey) -> int:
+        return self.device_limits.get(device, self.default_limit)
+
+    def has_capacity(self, destination: str) -> bool:
+        """True if another download to `destination` stays within its device's writer limit."""
+        device = self.device_of(destination)
+        with self.lock:
+            limit = self._limit(device)
+            return not limit or (self.devices[device].active if device in self.devices else 0) < limit
+
+    def load(self, destination: str) -> int:
+        """Number of downloads currently writing to `destination`'s device."""
+        device = self.device_of(destination)
+        with self.lock:
+            return self.devices[device].active if device in self.devices else 0
+
+    def acquire(self, item_id: str, destination: str, downloaded_size: int = 0):
+        """Counts a starting download against its destination's device."""
+        device = self.device_of(destination)
+        with self.lock:
+            if item_id in self.assignments: return
+            stats = self.devices.setdefault(device, DeviceStats(device, destination))
+            stats.active += 1
+            self.assignments[item_id] = (device, downloaded_size)
+
+    def release(self, item_id: str):
+        with self.lock:
+            if (assignment := self.assignments.pop(item_id, None)):
+                self.devices[assignment[0]].active -= 1
+
+    def record_progress(self, item_id: str, downloaded_size: int):
+        """Accounts the bytes a running download has received since its last progress update to its device."""
+        with self.lock:
+            if not (assignment := self.assignments.get(item_id)):
+                return
+            device, accounted = assignment
+            delta = downloaded_size - accounted
+            if delta <= 0: return
+            self.assignments[item_id] = (device, downloaded_size)
+            stats = self.devices[device]
+            stats.total_bytes += delta
+            stats.window_bytes += delta
+            now = time.monotonic()
+            if (elapsed := now - stats.window_start) >= self.RATE_WINDOW_SEC:
+                sample = stats.window_bytes / elapsed
+                stats.rate = sample if stats.rate is None else self.alpha * sample + (1 - self.alpha) * stats.rate
+                stats.window_start, stats.window_bytes = now, 0
+
+    def stats(self) -> list:
+        """Per-device snapshot: device, an example path, active writers, limit, bytes written and smoothed rate."""
+        with self.lock:
+            return [{'device': stats.device, 'path': stats.path, 'active': stats.active, 'limit': self._limit(stats.device),
+                     'total_bytes': stats.total_bytes, 'rate_bps': round(stats.rate) if stats.rate is not None else None}
+                    for stats in self.devices.values()]
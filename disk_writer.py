@@ -0,0 +1,161 @@
+"""
+Disk Writer for LoadifyPro
+Optional write-behind stage between the network and the disk. Received chunks go into
+a bounded per-file buffer and a writer thread drains it in large coalesced writes, so a
+slow disk no longer stalls the socket read loop on every chunk. When the buffer is full
+the receiver blocks (backpressure), which keeps memory bounded and lets TCP flow control
+slow the sender. How often data is fsynced is configurable per destination folder.
+"""
+import os
+import threading
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 'never' leaves flushing to the OS, 'close' fsyncs once the file is complete (or paused),
+# 'always' fsyncs after every coalesced write (slow, but nothing is lost on power failure)
+FSYNC_POLICIES = ('never', 'close', 'always')
+
+class WrittenFile:
+    """
+    A file opened through DiskWriter. `write` either writes directly or, with write-behind,
+    queues the data for the file's writer thread. Errors from the writer thread are raised
+    from the next `write` or from `close`.
+    """
+
+    def __init__(self, path: str, mode: str, fsync_policy: str, write_behind: bool, buffer_bytes: int, coalesce_bytes: int):
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.buffer_bytes = buffer_bytes
+        self.coalesce_bytes = coalesce_bytes
+        self.file = open(path, mode)
+        self.chunks: deque = deque()
+        self.buffered = 0
+        self.closing = False
+        self.error: Optional[Exception] = None
+        self.condition = threading.Condition()
+        self.writer: Optional[threading.Thread] = None
+        if write_behind:
+            self.writer = threading.Thread(target=self._write_loop, name="disk-writer", daemon=True)
+            self.writer.start()
+
+    def write(self, data: bytes):
+        if not self.writer:
+            self._write_out(data)
+            return
+        with self.condition:
+            # Backpressure: wait for room, but always admit a chunk into an empty buffer so oversized chunks cannot deadlock
+            while self.buffered and self.buffered + len(data) > self.buffer_bytes and not self.error:
+                self.condition.wait()
+            if self.error: raise self.error
+            self.chunks.append(data)
+            self.buffered += len(data)
+            self.condition.notify_all()
+
+    def _write_out(self, data: bytes):
+        self.file.write(data)
+        if self.fsync_policy == 'always':
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                while not self.chunks and not self.closing:
+                    self.condition.wait()
+                if not self.chunks:
+                    return
+                batch, size = [], 0
+                while self.chunks and size < self.coalesce_bytes:
+                    chunk = self.chunks.popleft()
+                    batch.append(chunk); size += len(chunk)
+            try:
+                self._write_out(b''.join(batch) if len(batch) > 1 else batch[0])
+            except Exception as e:  # Anything escaping here would leave write() waiting for room forever
+                logger.error(f"Write-behind failed for {self.path}: {e}")
+                with self.condition:
+                    self.error = e
+                    self.chunks.clear(); self.buffered = 0
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.buffered -= size
+                self.condition.notify_all()
+
+    def close(self):
+        """Writes out everything buffered, applies the fsync policy and closes the file."""
+        if self.writer:
+            with self.condition:
+                self.closing = True
+                self.condition.notify_all()
+            self.writer.join()
+        try:
+            if not self.error and self.fsync_policy in ('close', 'always'):
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+        if self.error: raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class DiskWriter:
+    """Opens download files with the configured write-behind buffering and per-destination fsync policy."""
+
+    def __init__(self):
+        """Initializes the DiskWriter. Write-behind is off until configured."""
+        self.write_behind = False
+        self.buffer_bytes = 16 * 1024**2
+        self.coalesce_bytes = 1024**2
+        self.fsync_default = 'never'
+        self.fsync_by_destination: Dict[str, str] = {}
+        logger.info("DiskWriter initialized.")
+
+    def configure(self, write_behind: bool, buffer_mb: float = 16, coalesce_kb: float = 1024, fsync_default: str = 'never', fsync_by_destination: Optional[Dict[str, str]] = None):
+        """
+        Configures the DiskWriter. Files already open keep their settings.
+
+        Args:
+            write_behind (bool): Whether writes go through a per-file buffer and writer thread.
+            buffer_mb (float): Per-file buffer; receivers block while it is full.
+            coalesce_kb (float): Target size of each write the writer thread issues.
+            fsync_default (str): fsync policy (see FSYNC_POLICIES) for destinations without their own.
+            fsync_by_destination (dict, optional): Folder -> fsync policy. A folder also covers its subfolders;
+                                                   the most specific folder wins.
+        """
+        self.write_behind = write_behind
+        self.buffer_bytes = max(int(buffer_mb * 1024**2), 64 * 1024)
+        self.coalesce_bytes = max(int(coalesce_kb * 1024), 8192)
+        self.fsync_default = self._valid_policy(fsync_default)
+        self.fsync_by_destination = {self._normalize(folder): self._valid_policy(policy) for folder, policy in (fsync_by_destination or {}).items()}
+        logger.info(f"Write-behind is {'ENABLED' if write_behind else 'DISABLED'} (buffer {self.buffer_bytes // 1024} KB, fsync '{self.fsync_default}').")
+
+    @staticmethod
+    def _valid_policy(policy: str) -> str:
+        if policy in FSYNC_POLICIES:
+            return policy
+        logger.warning(f"Unknown fsync policy '{policy}', using 'never'.")
+        return 'never'
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def fsync_policy_for(self, path: str) -> str:
+        """The fsync policy of the most specific configured folder containing `path`."""
+        path = self._normalize(path)
+        best, policy = -1, self.fsync_default
+        for folder, folder_policy in self.fsync_by_destination.items():
+            if (path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)) and len(folder) > best:
+                best, policy = len(folder), folder_policy
+        return policy
+
+    def open(self, path: str, mode: str = 'wb') -> WrittenFile:
+        """Opens `path` for writing (binary mode) with the current settings."""
+        return WrittenFile(path, mode, self.fsync_policy_for(path), self.write_behind, self.buffer_bytes, self.coalesce_bytes)
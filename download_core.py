@@ -4,25 +4,45 @@ Contains data structures and worker functions for all file and YouTube downloads
 This module is completely decoupled from the UI.
 """
 import os
+import re
 import time
+import itertools
 import logging
 from urllib.parse import urlparse, unquote
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable
 
 import requests
+import urllib3
 import yt_dlp
+import yt_dlp.networking.exceptions
 
 logger = logging.getLogger(__name__)
 
+_item_sequence = itertools.count()  # Keeps ids unique when many items are created in the same millisecond
+
+# Playlist and channel pages; a watch URL that merely carries &list= is still a single video
+PLAYLIST_URL = re.compile(r'youtube\.com/(?:playlist\?|channel/|c/|user/|@)')
+MAX_PLAYLIST_DEPTH = 2  # Channel -> tab (Videos, Shorts, ...) -> video
+# 'auto' quality: used until the host's throughput has been measured
+AUTO_FALLBACK_QUALITY = '720p'
+# 'auto' quality: a pick made before the transfer started is redone if throughput moved by this factor
+AUTO_RESELECT_FACTOR = 2.0
+# Failures that blame the proxy itself, as raised by requests/urllib3 or re-raised by yt-dlp's networking layer
+PROXY_ERRORS = (requests.exceptions.ProxyError, urllib3.exceptions.ProxyError, yt_dlp.networking.exceptions.ProxyError)
+
 class DownloadState:
     """Enum-like class for tracking the state of a download."""
     QUEUED, DOWNLOADING, PAUSED, COMPLETED, ERROR, CANCELLED = "QUEUED", "DOWNLOADING", "PAUSED", "COMPLETED", "ERROR", "CANCELLED"
 
+class DownloadPaused(yt_dlp.utils.DownloadCancelled):
+    """Raised from the yt-dlp progress hook to stop a paused transfer; partial files are kept for resuming."""
+
 class DownloadItem:
     """A data class representing all properties of a single download task."""
     def __init__(self, url: str, destination: str):
-        self.id = f"dl_{int(time.time() * 1000)}"
+        self.id = f"dl_{int(time.time() * 1000)}_{next(_item_sequence)}"
         self.url = url
         self.destination = destination
         self.filename = self._extract_filename(url)
@@ -40,6 +60,20 @@ class DownloadItem:
         self.error_message: str = ""
         self.quality = 'best'  # Default quality setting
         self.paused = False
+        self.concurrent_fragments = 1  # Parallel fragment connections for DASH/HLS, set by the dispatcher
+        self.fragment_progress = ""
+        # 'auto' quality: target completion time (set by the dispatcher) and the format picked for it
+        self.auto_target_sec = 600
+        self.auto_format_id = ""
+        self.auto_format_label = ""
+        self.auto_throughput = 0.0  # Throughput estimate the pick was based on
+        # Playlist/channel fan-out: a group item aggregates the progress of its child items
+        self.group_id: Optional[str] = None
+        self.is_group = False
+        self.child_ids: list[str] = []
+        self.expanding = False
+        self.expected_children = 0  # Children handed to entry_callback, known once expansion ends
+        self.ingested = False  # Accepted through IngestFilter (browser submissions); its in-flight slot is released when done
 
     def _extract_filename(self, url: str) -> str:
         """Robustly extracts a filename from a URL."""
@@ -64,22 +98,46 @@ class DownloadItem:
         self.state = DownloadState.QUEUED
         logger.info(f"Download {self.id} resumed")
 
+def _cache_metadata(metadata_cache, url: str, info: dict):
+    """(Internal) Stores extracted metadata; the cache is an optimization, so its failures never fail a download."""
+    if not metadata_cache: return
+    try:
+        metadata_cache.put(url, info)
+    except Exception as e:
+        logger.warning(f"Could not cache metadata for {url}: {e}")
+
 def download_youtube_task(item: DownloadItem, update_callback: Callable, finished_callback: Callable, managers: dict):
     """Worker task for downloading a YouTube video."""
     proxy_manager = managers['proxy']
+    speed_limiter = managers['speed_limiter']
+    # Bytes already charged to the limiter, per output file (video/audio streams are separate files)
+    charged_bytes: dict[str, int] = {}
+    charged_lock = threading.Lock()
+    proxies = proxy_manager.get_proxies(item.url)
+    transfer = {}  # 'started': monotonic time of the first progress report, for the proxy's throughput sample
     
     def progress_hook(d):
         if item.cancel_event.is_set(): raise yt_dlp.utils.DownloadCancelled('Download cancelled by user.')
-        if item.pause_event.is_set(): 
-            # Wait while paused
-            while item.pause_event.is_set() and not item.cancel_event.is_set():
-                time.sleep(0.1)
-            if item.cancel_event.is_set(): raise yt_dlp.utils.DownloadCancelled('Download cancelled by user.')
+        # Abort instead of blocking so the connection and the worker slot are released;
+        # yt-dlp keeps the .part file (and fragment state) and continues from it on resume
+        if item.pause_event.is_set(): raise DownloadPaused('Download paused by user.')
         if d['status'] == 'downloading':
+            transfer.setdefault('started', time.monotonic())
+            # Charge the delta since the last hook against the shared token bucket. yt-dlp calls
+            # hooks synchronously from its receive loop, so blocking here throttles the transfer,
+            # including each fragment of DASH/HLS downloads.
+            key = d.get('tmpfilename') or d.get('filename') or ''
+            downloaded_so_far = d.get('downloaded_bytes') or 0
+            with charged_lock:
+                delta = downloaded_so_far - charged_bytes.get(key, 0)
+                if delta > 0: charged_bytes[key] = downloaded_so_far
+            if delta > 0: speed_limiter.consume(delta)
             total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
             if total > 0:
                 downloaded, speed, eta = d.get('downloaded_bytes', 0), d.get('speed', 0), d.get('eta', 0)
                 update = {'total_size': total, 'downloaded_size': downloaded, 'progress': (downloaded / total) * 100, 'speed': speed / 1024**2 if speed else 0, 'time_remaining': time.strftime('%H:%M:%S', time.gmtime(eta)) if eta else "∞"}
+                if d.get('fragment_count'):
+                    update['fragment_progress'] = f"{d.get('fragment_index') or 0}/{d['fragment_count']}"
                 update_callback(item.id, update)
     
     # Configure format based on quality setting
@@ -93,26 +151,128 @@ def download_youtube_task(item: DownloadItem, update_callback: Callable, finishe
             'noplaylist': True,
             'quiet': True,
             'no_warnings': True,
-            'proxy': proxy_manager.get_proxies().get('http') if proxy_manager.get_proxies() else None
+            'proxy': proxies.get('http') if proxies else None,
+            # Fragments of DASH/HLS formats are fetched in parallel; every fragment thread still
+            # passes through progress_hook and therefore the shared limiter. No static 'ratelimit':
+            # the shared limiter alone governs, so limit changes (e.g. bandwidth profiles) apply mid-transfer
+            'concurrent_fragment_downloads': item.concurrent_fragments,
         }
         
+        metadata_cache = managers.get('metadata_cache')
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(item.url, download=False)
+            info = metadata_cache.get(item.url) if metadata_cache else None
+            from_cache = info is not None
+            if not from_cache:
+                info = ydl.sanitize_info(ydl.extract_info(item.url, download=False))
+                _cache_metadata(metadata_cache, item.url, info)
+            if item.quality == 'auto':
+                # Resolved here, just before the transfer, from the format list and the latest throughput estimate
+                ydl.format_selector = ydl.build_format_selector(_resolve_auto_quality(item, info, managers.get('throughput'), update_callback))
             filename = ydl.prepare_filename(info)
-            update_callback(item.id, {'filename': os.path.basename(filename)})
-            ydl.download([item.url])
+            update_callback(item.id, {'filename': os.path.basename(filename), 'filepath': filename})
+            # Download from the extracted info instead of ydl.download([url]), which would extract again
+            try:
+                ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.DownloadError:
+                if not from_cache: raise
+                # Stream URLs in cached metadata may have expired upstream; extract afresh once
+                metadata_cache.invalidate(item.url)
+                info = ydl.sanitize_info(ydl.extract_info(item.url, download=False))
+                _cache_metadata(metadata_cache, item.url, info)
+                ydl.process_ie_result(info, download=True)
         
         final_state = DownloadState.COMPLETED if not item.cancel_event.is_set() else DownloadState.CANCELLED
+        if final_state == DownloadState.COMPLETED and 'started' in transfer:
+            proxy_manager.report(proxies, True, sum(charged_bytes.values()), time.monotonic() - transfer['started'])
+    except DownloadPaused:
+        final_state = DownloadState.PAUSED if not item.cancel_event.is_set() else DownloadState.CANCELLED
     except yt_dlp.utils.DownloadCancelled: 
         final_state = DownloadState.CANCELLED
     except Exception as e: 
         logger.error(f"YouTube download failed for {item.url}: {e}")
+        if _is_proxy_error(e): proxy_manager.report(proxies, False)
         final_state = DownloadState.ERROR
         item.error_message = str(e)
     finally:
         update_callback(item.id, {'state': final_state})
         finished_callback(item.id)
 
+def _is_proxy_error(error: Optional[BaseException]) -> bool:
+    """True if `error` or an exception it wraps is a proxy failure; yt-dlp's DownloadError keeps the original in exc_info."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, PROXY_ERRORS): return True
+        seen.add(id(error))
+        exc_info = getattr(error, 'exc_info', None)
+        error = (exc_info[1] if exc_info else None) or error.__cause__ or error.__context__
+    return False
+
+def is_playlist_url(url: str) -> bool:
+    """True for YouTube playlist and channel URLs, which are expanded into one item per video."""
+    return bool(PLAYLIST_URL.search(url))
+
+def expand_playlist_task(group: DownloadItem, entry_callback: Callable, update_callback: Callable, managers: dict, max_workers: int = 4):
+    """
+    Worker task that streams the videos of a playlist or channel into individual downloads.
+
+    Entries are read lazily page by page. Each video's metadata is extracted on a bounded
+    pool (warming the metadata cache for the child download) and `entry_callback(url)` is
+    called as soon as it is ready, so downloads start before the listing is complete.
+    """
+    proxies = managers['proxy'].get_proxies(group.url)
+    metadata_cache = managers.get('metadata_cache')
+    base_opts = {'quiet': True, 'no_warnings': True, 'proxy': proxies.get('http') if proxies else None}
+    slots = threading.BoundedSemaphore(max_workers * 2)  # Stop paging ahead while the pool is saturated
+    discovered = 0
+    handed_over = 0  # entry_callback calls; the group is complete only once this many children exist
+    handed_over_lock = threading.Lock()
+    local = threading.local()
+
+    def prefetch(url: str):
+        nonlocal handed_over
+        try:
+            if metadata_cache and not group.cancel_event.is_set():
+                if not hasattr(local, 'ydl'): local.ydl = yt_dlp.YoutubeDL(base_opts)  # YoutubeDL is not thread-safe
+                metadata_cache.put(url, local.ydl.sanitize_info(local.ydl.extract_info(url, download=False)))
+        except Exception as e:
+            logger.warning(f"Metadata prefetch failed for {url}: {e}")  # The child download will extract on its own
+        finally:
+            slots.release()
+        if not group.cancel_event.is_set():
+            with handed_over_lock:
+                handed_over += 1
+            entry_callback(url)
+
+    def walk(ydl, pool, url: str, depth: int):
+        nonlocal discovered
+        info = ydl.extract_info(url, download=False, process=False)
+        if depth == 0 and info.get('title'):
+            update_callback(group.id, {'filename': info['title']})
+        for entry in info.get('entries') or []:
+            if group.cancel_event.is_set(): return
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if not entry_url: continue
+            if (entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab') and depth < MAX_PLAYLIST_DEPTH:
+                walk(ydl, pool, entry_url, depth + 1)
+                continue
+            slots.acquire()
+            pool.submit(prefetch, entry_url)
+            discovered += 1
+            update_callback(group.id, {'time_remaining': f"{discovered} found"})
+
+    update = {'expanding': False}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="playlist-extract") as pool:
+            with yt_dlp.YoutubeDL({**base_opts, 'extract_flat': 'in_playlist', 'lazy_playlist': True}) as ydl:
+                walk(ydl, pool, group.url, 0)
+    except Exception as e:
+        logger.error(f"Playlist expansion failed for {group.url}: {e}")
+        update['error_message'] = str(e)
+    finally:
+        logger.info(f"Playlist {group.url} expanded into {discovered} item(s).")
+        update['expected_children'] = handed_over  # The pool has drained, so no more callbacks can follow
+        update_callback(group.id, update)
+
 def _get_format_selector(quality: str) -> str:
     """Get yt-dlp format selector based on quality preference."""
     quality_map = {
@@ -127,32 +287,86 @@ def _get_format_selector(quality: str) -> str:
     }
     return quality_map.get(quality, 'best[ext=mp4]/best')
 
+def _select_auto_format(info: dict, bytes_per_sec: float, target_sec: float) -> Optional[dict]:
+    """
+    Picks the highest single-file format whose estimated size downloads within `target_sec`
+    at `bytes_per_sec`, or the smallest one if none does. Sizes come from the format list
+    (exact, approximate, or bitrate x duration).
+    """
+    duration = info.get('duration') or 0
+    candidates = []
+    for f in info.get('formats') or []:
+        if f.get('vcodec') == 'none' or f.get('acodec') == 'none': continue  # Same single-file formats as the fixed qualities
+        size = f.get('filesize') or f.get('filesize_approx') or (f.get('tbr') or 0) * 125 * duration  # tbr is in kbit/s
+        if size > 0: candidates.append(((f.get('height') or 0, f.get('ext') == 'mp4', f.get('tbr') or 0), size, f))
+    if not candidates: return None
+    fitting = [c for c in candidates if c[1] <= bytes_per_sec * target_sec]
+    return (max(fitting, key=lambda c: c[0]) if fitting else min(candidates, key=lambda c: c[1]))[2]
+
+def _resolve_auto_quality(item: DownloadItem, info: dict, throughput, update_callback: Callable) -> str:
+    """Returns the format selector for an 'auto' quality item, reusing an earlier pick where it is still valid."""
+    bytes_per_sec = throughput.estimate(item.url) if throughput else None
+    if item.auto_format_id:
+        # Partial data belongs to the earlier format; otherwise only a drastic throughput change warrants a new pick
+        changed = bytes_per_sec and (not item.auto_throughput or max(bytes_per_sec / item.auto_throughput, item.auto_throughput / bytes_per_sec) >= AUTO_RESELECT_FACTOR)
+        if item.downloaded_size > 0 or not changed:
+            return f"{item.auto_format_id}/{_get_format_selector('best')}"
+    if not bytes_per_sec:
+        return _get_format_selector(AUTO_FALLBACK_QUALITY)
+    chosen = _select_auto_format(info, bytes_per_sec, item.auto_target_sec)
+    if not chosen:
+        return _get_format_selector(AUTO_FALLBACK_QUALITY)
+    label = f"{chosen['height']}p" if chosen.get('height') else chosen.get('format_note') or chosen['format_id']
+    logger.info(f"Auto quality for {item.url}: {label} at {bytes_per_sec / 1024:.0f} KB/s within {item.auto_target_sec:.0f}s")
+    update_callback(item.id, {'auto_format_id': chosen['format_id'], 'auto_format_label': label, 'auto_throughput': bytes_per_sec})
+    return f"{chosen['format_id']}/{_get_format_selector('best')}"
+
 def download_direct_file_task(item: DownloadItem, update_callback: Callable, finished_callback: Callable, managers: dict):
     """Worker task for downloading a direct file."""
+    scan_stream = None
+    bandwidth = managers['speed_limiter'].credit()
+    proxies = managers['proxy'].get_proxies(item.url)
     try:
-        proxies = managers['proxy'].get_proxies()
-        auth = managers['auth'].get_auth()
-        speed_limiter = managers['speed_limiter']
-        with requests.get(item.url, stream=True, timeout=30, proxies=proxies, auth=auth) as r:
+        auth = managers['auth'].get_auth(item.url)
+        # Continue a paused transfer from the bytes already on disk
+        resume_from = os.path.getsize(item.filepath) if item.downloaded_size and os.path.exists(item.filepath) else 0
+        headers = {'Range': f'bytes={resume_from}-'} if resume_from else None
+        with requests.get(item.url, stream=True, timeout=30, proxies=proxies, auth=auth, headers=headers) as r:
             r.raise_for_status()
+            if r.status_code != 206: resume_from = 0 # Server ignored the range, start over
+            # Let a streaming antivirus engine see the bytes as they arrive; only whole files can be streamed
+            if not resume_from and (antivirus := managers.get('antivirus')): scan_stream = antivirus.open_stream(item.id)
             total_size = int(r.headers.get('content-length', 0))
+            total_size = total_size + resume_from if total_size else 0
             update_callback(item.id, {'total_size': total_size})
-            downloaded, start_time = 0, time.time()
-            with open(item.filepath, 'wb') as f:
+            downloaded, start_time = resume_from, time.time()
+            # Through the disk writer, which may buffer writes behind this loop so a slow disk does not stall the socket
+            with managers['disk_writer'].open(item.filepath, 'ab' if resume_from else 'wb') as f:
                 for chunk in r.iter_content(chunk_size=8192):
-                    if item.cancel_event.is_set(): break
+                    if item.cancel_event.is_set() or item.pause_event.is_set(): break
                     if chunk:
-                        speed_limiter.consume(len(chunk))
+                        bandwidth.consume(len(chunk))
                         f.write(chunk); downloaded += len(chunk)
+                        if scan_stream: scan_stream.feed(chunk)
                         elapsed = time.time() - start_time
-                        speed = downloaded / elapsed / 1024**2 if elapsed > 1 else 0
+                        speed = (downloaded - resume_from) / elapsed / 1024**2 if elapsed > 1 else 0
                         eta = (total_size - downloaded) / (speed * 1024**2) if speed > 0 and total_size > 0 else 0
                         update = {'downloaded_size': downloaded, 'progress': (downloaded / total_size) * 100 if total_size > 0 else 0, 'speed': speed, 'time_remaining': time.strftime('%H:%M:%S', time.gmtime(eta)) if eta else "∞"}
                         update_callback(item.id, update)
-        final_state = DownloadState.COMPLETED if not item.cancel_event.is_set() else DownloadState.CANCELLED
+        if item.cancel_event.is_set(): final_state = DownloadState.CANCELLED
+        elif item.pause_event.is_set(): final_state = DownloadState.PAUSED
+        else: final_state = DownloadState.COMPLETED
+        if final_state == DownloadState.COMPLETED: managers['proxy'].report(proxies, True, downloaded - resume_from, time.time() - start_time)
+    except (requests.exceptions.ProxyError, requests.exceptions.ConnectTimeout) as e:
+        logger.error(f"Proxy error for {item.url}: {e}"); final_state = DownloadState.ERROR; item.error_message = f"Network Error: {e}"
+        managers['proxy'].report(proxies, False)
     except (requests.exceptions.RequestException, ConnectionError) as e: logger.error(f"Network error for {item.url}: {e}"); final_state = DownloadState.ERROR; item.error_message = f"Network Error: {e}"
     except Exception as e: logger.error(f"Direct download failed for {item.url}: {e}"); final_state = DownloadState.ERROR; item.error_message = str(e)
     finally:
+        # Hand back the unspent grant however the transfer ended, or the other transfers lose that share of the limit
+        bandwidth.release()
+        # Before reporting the final state, so the verdict is waiting when the completed file is handed to the scanner
+        if scan_stream: scan_stream.finish() if final_state == DownloadState.COMPLETED else scan_stream.abort()
         update_callback(item.id, {'state': final_state})
         finished_callback(item.id)
 
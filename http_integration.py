@@ -1,61 +1,200 @@
 """
 HTTP Integration for LoadifyPro
 Provides a simple HTTP server for browser extension communication.
+Requests are served concurrently; the download callback must be thread-safe and
+only hand URLs off to the GUI (it is never allowed to touch Tk widgets).
 """
+import time
 import threading
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
 import urllib.parse
 
+from ingest_filter import IngestDecision
+
 logger = logging.getLogger(__name__)
 
+SSE_KEEPALIVE_SECONDS = 15  # Comment line sent on idle event streams so proxies keep them open
+SSE_COALESCE_SECONDS = 0.25  # Minimum gap between event batches; updates in between are merged
+MAX_PAGE_SIZE = 1000
+# Only these origins may read status responses cross-origin; web pages must not see URLs and local paths
+EXTENSION_ORIGIN_SCHEMES = ('chrome-extension://', 'moz-extension://', 'safari-web-extension://')
+
 class LoadifyProHTTPHandler(BaseHTTPRequestHandler):
     """HTTP request handler for LoadifyPro integration."""
     
-    def __init__(self, download_callback, *args, **kwargs):
+    def __init__(self, download_callback, status_hub, ingest_filter, scan_history, device_scheduler, *args, **kwargs):
         self.download_callback = download_callback
+        self.status_hub = status_hub
+        self.ingest_filter = ingest_filter
+        self.scan_history = scan_history
+        self.device_scheduler = device_scheduler
         super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        """Handle status queries: /downloads, /downloads/{id}, the /events stream, /scans and /devices."""
+        parts = urllib.parse.urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        if path == '/scans' and self.scan_history:
+            return self._query_scans(urllib.parse.parse_qs(parts.query))
+        if path == '/devices' and self.device_scheduler:
+            # Writers, limits and smoothed write throughput per storage device
+            return self._send_json(200, {'devices': self.device_scheduler.stats()}, self._extension_origin())
+        if not self.status_hub or not (path in ('/downloads', '/events') or path.startswith('/downloads/')):
+            self.send_error(404, "Not found")
+            return
+        try:
+            if path == '/events':
+                self._stream_events()
+            elif path == '/downloads':
+                params = urllib.parse.parse_qs(parts.query)
+                offset = max(int(params.get('offset', ['0'])[0]), 0)
+                limit = min(max(int(params.get('limit', ['100'])[0]), 0), MAX_PAGE_SIZE)
+                self._send_json(200, self.status_hub.query(params.get('state', [None])[0], params.get('url', [None])[0], offset, limit), self._extension_origin())
+            else:
+                snapshot = self.status_hub.get(urllib.parse.unquote(path[len('/downloads/'):]))
+                if snapshot: self._send_json(200, snapshot, self._extension_origin())
+                else: self.send_error(404, "Unknown download id")
+        except ValueError as e:
+            self.send_error(400, f"Invalid query: {e}")
+
+    def _query_scans(self, params: dict):
+        """Antivirus scan history, filtered by hash, path, status and a [since, until) Unix time range."""
+        try:
+            value = lambda name: params.get(name, [None])[0]
+            since, until = value('since'), value('until')
+            self._send_json(200, self.scan_history.query(
+                file_hash=value('hash'), file_path=value('path'), status=value('status'),
+                since=float(since) if since else None, until=float(until) if until else None,
+                offset=max(int(value('offset') or 0), 0), limit=min(max(int(value('limit') or 100), 0), MAX_PAGE_SIZE)), self._extension_origin())
+        except ValueError as e:
+            self.send_error(400, f"Invalid query: {e}")
+
+    def _stream_events(self):
+        """Server-Sent Events stream of coalesced per-download changes."""
+        subscription = self.status_hub.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            if origin := self._extension_origin():
+                self.send_header('Access-Control-Allow-Origin', origin)
+                self.send_header('Vary', 'Origin')
+            self.end_headers()
+            self.wfile.write(b': connected\n\n'); self.wfile.flush()
+            while (changes := subscription.get(SSE_KEEPALIVE_SECONDS)) is not None:
+                if not changes:
+                    self.wfile.write(b': keep-alive\n\n')
+                for change in changes:
+                    self.wfile.write(f"event: update\ndata: {json.dumps(change)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(SSE_COALESCE_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Client went away
+        finally:
+            subscription.close()
     
     def do_POST(self):
         """Handle POST requests from browser extension."""
+        if self.path not in ('/add_download', '/add_downloads'):
+            self.send_error(404, "Not found")
+            return
+        try:
+            entries = self._download_entries(self._read_json())
+            if not entries:
+                self.send_error(400, "No URL provided")
+                return
+
+            counts = {IngestDecision.ACCEPTED: 0, IngestDecision.DUPLICATE: 0, IngestDecision.RATE_LIMITED: 0}
+            urls = [url for url, _ in entries]
+            # The whole request is charged once against the origin's rate limit
+            decisions = self.ingest_filter.check_batch(urls, self._request_origin()) if self.ingest_filter else [IngestDecision.ACCEPTED] * len(urls)
+            for (url, quality), decision in zip(entries, decisions):
+                counts[decision] += 1
+                if decision != IngestDecision.ACCEPTED:
+                    logger.info(f"Ignored URL from browser ({decision}): {url}")
+                    continue
+                logger.info(f"Received URL from browser: {url}, Quality: {quality}")
+                if self.download_callback:
+                    self.download_callback(url, quality)
+
+            accepted, duplicates, rate_limited = counts[IngestDecision.ACCEPTED], counts[IngestDecision.DUPLICATE], counts[IngestDecision.RATE_LIMITED]
+            summary = {"accepted": accepted, "duplicates": duplicates, "rate_limited": rate_limited}
+            if accepted:
+                self._send_json(202, {"status": "success", "message": "Download added" if accepted == 1 else f"{accepted} downloads added", **summary})
+            elif duplicates:
+                # Not an error for the extension: the download is already queued or just finished
+                self._send_json(200, {"status": "duplicate", "message": "Download already queued", **summary})
+            else:
+                self._send_json(429, {"status": "rate_limited", "message": "Too many requests from this origin, slow down", "rejected_urls": [url for url, decision in zip(urls, decisions) if decision == IngestDecision.RATE_LIMITED], **summary})
+        except (ValueError, AttributeError) as e:
+            self.send_error(400, f"Invalid request body: {e}")
+        except Exception as e:
+            logger.error(f"Error handling POST request: {e}")
+            self.send_error(500, f"Internal server error: {e}")
+
+    def _download_entries(self, data) -> list:
+        """
+        (url, quality) pairs from an /add_download body ({"url", "quality"}) or an /add_downloads body,
+        either {"downloads": [{"url", "quality"}, ...]} or {"urls": [...], "quality"}. Raises ValueError if malformed.
+        """
         if self.path == '/add_download':
-            try:
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-                
-                url = data.get('url', '')
-                quality = data.get('quality', 'best')
-                if url:
-                    logger.info(f"Received URL from browser: {url}, Quality: {quality}")
-                    
-                    # Call the download callback with quality
-                    if self.download_callback:
-                        self.download_callback(url, quality)
-                    
-                    # Send success response
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    
-                    response = {"status": "success", "message": "Download added"}
-                    self.wfile.write(json.dumps(response).encode('utf-8'))
-                else:
-                    self.send_error(400, "No URL provided")
-                    
-            except Exception as e:
-                logger.error(f"Error handling POST request: {e}")
-                self.send_error(500, f"Internal server error: {e}")
+            objects = [data]
+        elif 'downloads' in data:
+            objects = data['downloads']
+            if not isinstance(objects, list) or not all(isinstance(entry, dict) for entry in objects):
+                raise ValueError("'downloads' must be a list of objects")
         else:
-            self.send_error(404, "Not found")
+            urls = data.get('urls', [])
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise ValueError("'urls' must be a list of strings")
+            objects = [{'url': url, 'quality': data.get('quality', 'best')} for url in urls]
+        entries = []
+        for entry in objects:
+            url, quality = entry.get('url'), entry.get('quality', 'best')
+            if not isinstance(url, str) or not isinstance(quality, str):
+                raise ValueError("'url' and 'quality' must be strings")
+            if url.strip(): entries.append((url, quality))
+        return entries
+
+    def _request_origin(self) -> str:
+        """Identifies the submitting site for rate limiting: Origin, then Referer host, then client address."""
+        if origin := self.headers.get('Origin'):
+            return origin
+        if referer := self.headers.get('Referer'):
+            return urllib.parse.urlsplit(referer).netloc
+        return self.client_address[0]
+
+    def _read_json(self) -> dict:
+        """Reads and decodes the JSON request body."""
+        content_length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+        if not isinstance(data, dict): raise ValueError("expected a JSON object")
+        return data
+
+    def _extension_origin(self):
+        """The request's Origin if it is a browser extension, else None (no cross-origin read access)."""
+        origin = self.headers.get('Origin') or ''
+        return origin if origin.startswith(EXTENSION_ORIGIN_SCHEMES) else None
+
+    def _send_json(self, status: int, payload: dict, cors_origin='*'):
+        """Sends a JSON response; `cors_origin` is the allowed cross-origin reader, None for none."""
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cors_origin:
+            self.send_header('Access-Control-Allow-Origin', cors_origin)
+            if cors_origin != '*': self.send_header('Vary', 'Origin')
+        self.end_headers()
+        self.wfile.write(body)
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests."""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
     
@@ -66,8 +205,12 @@ class LoadifyProHTTPHandler(BaseHTTPRequestHandler):
 class HTTPIntegration:
     """HTTP server for browser integration."""
     
-    def __init__(self, download_callback, port=8080):
+    def __init__(self, download_callback, port=8080, status_hub=None, ingest_filter=None, scan_history=None, device_scheduler=None):
         self.download_callback = download_callback
+        self.status_hub = status_hub
+        self.ingest_filter = ingest_filter
+        self.scan_history = scan_history
+        self.device_scheduler = device_scheduler
         self.port = port
         self.server = None
         self.thread = None
@@ -79,15 +222,18 @@ class HTTPIntegration:
             return
             
         def handler(*args, **kwargs):
-            return LoadifyProHTTPHandler(self.download_callback, *args, **kwargs)
+            return LoadifyProHTTPHandler(self.download_callback, self.status_hub, self.ingest_filter, self.scan_history, self.device_scheduler, *args, **kwargs)
             
-        self.server = HTTPServer(('localhost', self.port), handler)
+        self.server = ThreadingHTTPServer(('localhost', self.port), handler)
+        self.server.daemon_threads = True
         self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.thread.start()
         logger.info(f"HTTP integration server started on port {self.port}")
     
     def stop(self):
         """Stop the HTTP server."""
+        if self.status_hub:
+            self.status_hub.close() # Release threads blocked on event streams
         if self.server:
             self.server.shutdown()
             self.server.server_close()
@@ -0,0 +1,137 @@
+"""
+Ingest Filter for LoadifyPro
+Screens URLs submitted by the browser extension before they become downloads:
+identical URLs that are in flight or were seen moments ago are coalesced, and each
+origin is held to a token-bucket request rate so link floods cannot swamp the queue.
+"""
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change what gets downloaded
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|mc_eid|ref_src)$')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+YOUTUBE_ID = re.compile(r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})')
+
+class IngestDecision:
+    """Enum-like class for the outcome of IngestFilter.check() and check_batch()."""
+    ACCEPTED, DUPLICATE, RATE_LIMITED = "accepted", "duplicate", "rate_limited"
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of `url` for duplicate detection: YouTube links collapse to
+    their video id; otherwise scheme and host are lower-cased, default ports, fragments
+    and tracking parameters are dropped and the remaining query is sorted.
+    """
+    url = url.strip()
+    if match := YOUTUBE_ID.search(url):
+        return f"youtube:{match.group(1)}"
+    try:
+        parts = urlsplit(url)
+        scheme, host = parts.scheme.lower(), (parts.hostname or '').lower()
+        netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+        if parts.username: netloc = f"{parts.username}@{netloc}"
+        query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)))
+        return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+    except ValueError:
+        return url
+
+class IngestFilter:
+    """Thread-safe duplicate and flood filter for browser-submitted URLs."""
+
+    def __init__(self, dedup_window_sec: float = 10.0, rate_per_origin: float = 5.0, burst_per_origin: int = 20, max_tracked: int = 10000):
+        self.dedup_window_sec = dedup_window_sec
+        self.rate_per_origin = rate_per_origin
+        self.burst_per_origin = burst_per_origin
+        self.max_tracked = max_tracked
+        self.recent: 'OrderedDict[str, float]' = OrderedDict()  # normalized URL -> last seen (monotonic), oldest first
+        self.in_flight: Dict[str, int] = {}
+        self.origin_buckets: Dict[str, Tuple[float, float]] = {}  # origin -> (tokens, last refill)
+        self.lock = threading.Lock()
+        logger.info("IngestFilter initialized.")
+
+    def configure(self, dedup_window_sec: float, rate_per_origin: float, burst_per_origin: int):
+        """
+        Updates the filter limits.
+
+        Args:
+            dedup_window_sec (float): How long a URL stays a duplicate after it was last seen or finished. 0 disables dedup.
+            rate_per_origin (float): Sustained requests per second accepted from one origin. 0 disables rate limiting.
+            burst_per_origin (int): Requests one origin may send back to back before the rate applies.
+        """
+        with self.lock:
+            self.dedup_window_sec = dedup_window_sec
+            self.rate_per_origin = rate_per_origin
+            self.burst_per_origin = max(burst_per_origin, 1)
+            self.origin_buckets.clear()
+
+    def check(self, url: str, origin: str = '') -> str:
+        """
+        Decides whether `url` should become a new download and records it if so.
+
+        Returns:
+            An IngestDecision value.
+        """
+        return self.check_batch([url], origin)[0]
+
+    def check_batch(self, urls: List[str], origin: str = '') -> List[str]:
+        """
+        Decides which URLs submitted in one request should become new downloads and records them.
+        The request costs one token of the origin's rate limit however many URLs it carries, so a
+        batch is accepted or rejected as a whole rather than cut off part-way.
+
+        Returns:
+            An IngestDecision value per URL.
+        """
+        keys = [normalize_url(url) for url in urls]
+        now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+            if not self._take_origin_token(origin, now):
+                return [IngestDecision.RATE_LIMITED] * len(keys)
+            decisions = []
+            for key in keys:
+                # A duplicate does not refresh the window, or a URL retried within it would never be accepted again
+                if self.dedup_window_sec > 0 and (key in self.in_flight or key in self.recent):
+                    decisions.append(IngestDecision.DUPLICATE)
+                    continue
+                self.in_flight[key] = self.in_flight.get(key, 0) + 1
+                self.recent[key] = now; self.recent.move_to_end(key)
+                decisions.append(IngestDecision.ACCEPTED)
+        return decisions
+
+    def release(self, url: str):
+        """Marks a download of `url` as finished; it stays a duplicate for one more window."""
+        key = normalize_url(url)
+        with self.lock:
+            if (count := self.in_flight.get(key, 0)) > 1: self.in_flight[key] = count - 1
+            else: self.in_flight.pop(key, None)
+            self.recent[key] = time.monotonic(); self.recent.move_to_end(key)
+
+    def _prune(self, now: float):
+        """(Internal) Forgets URLs outside the window. Caller holds the lock."""
+        while self.recent:
+            key, seen = next(iter(self.recent.items()))
+            if now - seen < self.dedup_window_sec and len(self.recent) <= self.max_tracked:
+                break
+            self.recent.popitem(last=False)
+
+    def _take_origin_token(self, origin: str, now: float) -> bool:
+        """(Internal) Per-origin token bucket. Caller holds the lock."""
+        if self.rate_per_origin <= 0:
+            return True
+        tokens, last = self.origin_buckets.get(origin, (self.burst_per_origin, now))
+        tokens = min(self.burst_per_origin, tokens + (now - last) * self.rate_per_origin)
+        if tokens < 1:
+            self.origin_buckets[origin] = (tokens, now)
+            return False
+        self.origin_buckets[origin] = (tokens - 1, now)
+        if len(self.origin_buckets) > self.max_tracked:
+            self.origin_buckets.pop(next(iter(self.origin_buckets)))
+        return True
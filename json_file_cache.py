@@ -0,0 +1,76 @@
+"""
+JSON File Cache for LoadifyPro
+The on-disk machinery shared by the metadata and scan verdict caches: one JSON file per
+entry, replaced atomically, with periodic pruning by age and count. Cache directories
+may be shared by several processes, so any entry can disappear at any moment.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class JsonFileCache:
+    """Base for thread-safe, TTL'd on-disk caches storing one JSON document per entry."""
+
+    # Writes between two prune() passes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, cache_dir: str, ttl_sec: float, max_entries: int):
+        self.cache_dir = cache_dir
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.writes_since_prune = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _read(self, path: str) -> Optional[dict]:
+        """(Internal) The entry stored at `path`, or None if it is missing or unreadable."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def _write(self, path: str, entry: dict, description: str):
+        """(Internal) Atomically stores `entry` at `path`; failures are logged, never raised."""
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"  # Unique per writer, even across processes
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to cache {description}: {e}")
+            self._remove(tmp_path)
+            return
+        with self.lock:
+            self.writes_since_prune += 1
+            if self.writes_since_prune < self.PRUNE_INTERVAL:
+                return
+            self.writes_since_prune = 0
+        self.prune()
+
+    def prune(self):
+        """Deletes entries older than the TTL and evicts the oldest ones beyond max_entries."""
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.json')]
+        except OSError:
+            return
+        # Other processes may delete any entry between the listing and the stat
+        dated = []
+        for entry in entries:
+            try: dated.append((entry.stat().st_mtime, entry.path))
+            except OSError: pass
+        dated.sort(reverse=True)
+        cutoff = time.time() - self.ttl_sec
+        for index, (mtime, path) in enumerate(dated):
+            if index >= self.max_entries or mtime < cutoff:
+                self._remove(path)
+
+    def _remove(self, path: str):
+        try: os.remove(path)
+        except OSError: pass
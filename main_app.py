@@ -5,9 +5,12 @@ Initializes all managers, the main user interface, and connects all components.
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import os
+import sys
+import copy
 import queue
 import threading
 import logging
+from collections import deque
 
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
@@ -17,16 +20,25 @@ from antivirus_manager import AntivirusManager
 from settings_manager import SettingsManager
 from advanced_ui_manager import ThemeManager
 from proxy_manager import ProxyManager
-from scheduler import Scheduler
+from scheduler import Scheduler, MisfirePolicy
 from speed_limiter import SpeedLimiter
+from bandwidth_profiles import BandwidthProfileManager
 from auth_manager import AuthManager
-from download_core import DownloadItem, DownloadState, download_youtube_task, download_direct_file_task
+from metadata_cache import MetadataCache
+from download_core import DownloadItem, DownloadState, download_youtube_task, download_direct_file_task, expand_playlist_task, is_playlist_url
 from ui_components import DownloadCard, SettingsWindow
 from drag_drop_manager import DragDropManager
 from http_integration import HTTPIntegration
+from status_hub import DownloadStatusHub
+from ingest_filter import IngestFilter
+from video_workers import VideoWorkerPool
+from throughput_monitor import ThroughputMonitor
+from disk_writer import DiskWriter
+from device_scheduler import DeviceScheduler
 
 # --- Configuration ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filename='loadifypro.log', filemode='w')
+INGEST_BATCH_PER_TICK = 50  # Max queued downloads turned into cards per UI update tick
+TERMINAL_STATES = (DownloadState.COMPLETED, DownloadState.ERROR, DownloadState.CANCELLED)
 
 class ModernDownloadManager(TkinterDnD.Tk):
     """The main application class for LoadifyPro."""
@@ -45,17 +57,34 @@ class ModernDownloadManager(TkinterDnD.Tk):
         self.downloads: dict[str, DownloadItem] = {}
         self.download_cards: dict[str, DownloadCard] = {}
         self.download_queue, self.ui_update_queue = queue.Queue(), queue.Queue()
-        self.active_download_threads = []
+        self.finished_queue = queue.Queue()  # item ids whose worker (or group) is done, handled on the GUI thread
+        self.ingest_queue = queue.Queue()  # (url, destination or None for the current one, quality, group id, accepted by ingest_filter) from non-GUI threads
+        self.default_destination = os.path.join(os.path.expanduser("~"), "Downloads")
+        self.active_workers: dict[str, threading.Thread] = {}  # item id -> running download thread
+        self.pending_downloads: deque = deque()  # Queued item ids taken off download_queue, oldest first
         self.max_concurrent_downloads = self.settings.get('max_concurrent_downloads', 3)
         
-        # HTTP integration for browser
-        self.http_integration = HTTPIntegration(self._add_download_from_browser)
+        # HTTP integration for browser and external status clients
+        self.status_hub = DownloadStatusHub()
+        self.ingest_filter = IngestFilter()
         
         self.proxy_manager = ProxyManager()
         self.scheduler = Scheduler()
         self.speed_limiter = SpeedLimiter()
+        self.bandwidth_profiles = BandwidthProfileManager(self.scheduler, self.speed_limiter)
         self.auth_manager = AuthManager()
+        self.metadata_cache = MetadataCache()
+        self.video_workers = VideoWorkerPool()
+        self.throughput_monitor = ThroughputMonitor()
+        self.disk_writer = DiskWriter()
+        self.io_devices = DeviceScheduler()
         self.av_manager = AntivirusManager(update_callback=self._queue_ui_update)
+        self.http_integration = HTTPIntegration(self._add_download_from_browser, status_hub=self.status_hub, ingest_filter=self.ingest_filter, scan_history=self.av_manager.scan_history, device_scheduler=self.io_devices)
+        
+        # Recurring jobs refer to actions by name so they survive restarts; restored before the
+        # schedule settings are applied so unchanged jobs keep their next and last run
+        self.scheduler.register_action('add_downloads', self._enqueue_downloads)
+        self.scheduler.restore_jobs()
         
         self._apply_all_settings()
         self._create_ui()
@@ -70,44 +99,155 @@ class ModernDownloadManager(TkinterDnD.Tk):
         self.after(200, self._process_ui_updates)
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
+    def _settings_appliers(self) -> list:
+        """(settings keys, function applying them) per subsystem; a change re-applies only the subsystems it touches."""
+        return [
+            (('appearance_mode',), self._apply_appearance_settings),
+            (('proxy_enabled', 'proxy_http', 'proxy_https', 'proxy_bypass', 'proxy_pool_enabled', 'proxy_pool', 'proxy_pool_policy', 'proxy_pool_check_url', 'proxy_pool_check_interval_sec'), self._apply_proxy_settings),
+            (('bandwidth_profiles_enabled', 'bandwidth_profiles', 'speed_limit_enabled', 'speed_limit_kb'), self._apply_bandwidth_settings),
+            (('auth_enabled', 'auth_user', 'auth_pass', 'auth_credentials'), self._apply_auth_settings),
+            (('scheduled_downloads',), self._apply_schedule_settings),
+            (('av_configs', 'av_active_config', 'av_max_concurrent_scans', 'av_cache_ttl_hours', 'av_history_retention_days', 'av_history_max_records'), self._apply_antivirus_settings),
+            (('max_concurrent_downloads', 'video_worker_processes', 'device_writer_limit', 'device_writer_limits'), self._apply_concurrency_settings),
+            (('metadata_cache_ttl_sec',), self._apply_metadata_cache_settings),
+            (('ingest_dedup_window_sec', 'ingest_rate_per_origin', 'ingest_burst_per_origin'), self._apply_ingest_settings),
+            (('write_behind_enabled', 'write_behind_buffer_mb', 'write_behind_coalesce_kb', 'fsync_policy', 'fsync_by_destination'), self._apply_disk_writer_settings),
+        ]
+
     def _apply_all_settings(self):
-        s = self.settings_manager.settings
+        for _, apply in self._settings_appliers(): apply(self.settings_manager.settings)
         self.theme_manager.apply_theme()
+        self.applied_settings = copy.deepcopy(self.settings_manager.settings)
+
+    def _apply_appearance_settings(self, s: dict):
+        ctk.set_appearance_mode(s.get('appearance_mode', 'Dark'))  # Restyles existing widgets in place
+
+    def _apply_proxy_settings(self, s: dict):
         self.proxy_manager.configure(s.get('proxy_enabled', False), s.get('proxy_http', ''), s.get('proxy_https', ''))
-        self.speed_limiter.configure(s.get('speed_limit_enabled', False), s.get('speed_limit_kb', 1024))
-        self.auth_manager.configure(s.get('auth_enabled', False), s.get('auth_user', ''), s.get('auth_pass', ''))
+        self.proxy_manager.configure_bypass(s.get('proxy_bypass', []))
+        self.proxy_manager.configure_pool(s.get('proxy_pool_enabled', False), s.get('proxy_pool', []), s.get('proxy_pool_policy', 'weighted'),
+                                          s.get('proxy_pool_check_url', ''), s.get('proxy_pool_check_interval_sec', 60))
+
+    def _apply_bandwidth_settings(self, s: dict):
+        self.bandwidth_profiles.configure(s.get('bandwidth_profiles_enabled', False), s.get('bandwidth_profiles', []), s.get('speed_limit_enabled', False), s.get('speed_limit_kb', 1024))
+
+    def _apply_auth_settings(self, s: dict):
+        self.auth_manager.configure(s.get('auth_enabled', False), s.get('auth_user', ''), s.get('auth_pass', ''), s.get('auth_credentials', []))
+
+    def _apply_schedule_settings(self, s: dict):
+        entries = [(entry.get('cron', ''), (entry.get('urls', []), entry.get('destination'), entry.get('quality', 'best')), entry.get('misfire_policy', MisfirePolicy.RUN_ONCE))
+                   for entry in s.get('scheduled_downloads', []) if isinstance(entry, dict)]
+        self.scheduler.sync_recurring('add_downloads', entries)
+
+    def _apply_antivirus_settings(self, s: dict):
         self.av_manager.configs = s.get('av_configs', {})
         self.av_manager.active_config_name = s.get('av_active_config')
+        self.av_manager.set_max_concurrent_scans(s.get('av_max_concurrent_scans', 2))
+        self.av_manager.verdict_cache.ttl_sec = s.get('av_cache_ttl_hours', 168) * 3600
+        self.av_manager.scan_history.retention_days = s.get('av_history_retention_days', 90)
+        self.av_manager.scan_history.max_records = s.get('av_history_max_records', 100000)
+
+    def _apply_concurrency_settings(self, s: dict):
         self.max_concurrent_downloads = s.get('max_concurrent_downloads', 3)
+        self.video_workers.set_max_workers(s.get('video_worker_processes', 0))
+        self.io_devices.configure(s.get('device_writer_limit', 0), s.get('device_writer_limits', {}))
+        if hasattr(self, 'active_frame'): self._process_queue()  # Start queued downloads if slots were added
+
+    def _apply_metadata_cache_settings(self, s: dict):
+        self.metadata_cache.ttl_sec = s.get('metadata_cache_ttl_sec', 1800)
+
+    def _apply_ingest_settings(self, s: dict):
+        self.ingest_filter.configure(s.get('ingest_dedup_window_sec', 10), s.get('ingest_rate_per_origin', 5), s.get('ingest_burst_per_origin', 20))
 
+    def _apply_disk_writer_settings(self, s: dict):
+        self.disk_writer.configure(s.get('write_behind_enabled', False), s.get('write_behind_buffer_mb', 16), s.get('write_behind_coalesce_kb', 1024),
+                                   s.get('fsync_policy', 'never'), s.get('fsync_by_destination', {}))
 
     def save_and_apply_settings(self, new_settings: dict):
-        self.settings_manager.settings.update(new_settings)
-        self.settings_manager.save_settings()
-        self.translator.set_language(new_settings['language'])
-        self._apply_all_settings()
-        self._rebuild_ui()
+        settings = self.settings_manager.settings
+        settings.update(new_settings)
+        self.settings_manager.schedule_save()
+        # Diff against what was last applied (not the dict itself: the settings window edits av_configs in place)
+        changed = {key for key in set(settings) | set(self.applied_settings) if settings.get(key) != self.applied_settings.get(key)}
+        if not changed: return
+        logging.info(f"Applying changed settings: {', '.join(sorted(changed))}")
+        for keys, apply in self._settings_appliers():
+            if changed.intersection(keys): apply(settings)
+        self.applied_settings = copy.deepcopy(settings)
+        # Text and color themes are baked into widgets when they are created, so only these two need a rebuild
+        if changed & {'language', 'color_theme'}:
+            self.translator.set_language(settings['language'])
+            self.theme_manager.apply_theme()
+            self._rebuild_ui()
 
     def _process_queue(self):
-        self.active_download_threads = [t for t in self.active_download_threads if t.is_alive()]
-        while not self.download_queue.empty() and len(self.active_download_threads) < self.max_concurrent_downloads:
-            item_id = self.download_queue.get()
+        while not self.download_queue.empty(): self.pending_downloads.append(self.download_queue.get())
+        while self.pending_downloads and len(self.active_workers) < self.max_concurrent_downloads:
+            item_id = self._next_pending_download()
+            if item_id is None: return  # Every device with queued work is at its writer limit; a finishing download retries
             item = self.downloads[item_id]
+            # Stale entries: already running, paused while waiting (resume re-queues it) or cancelled before starting
+            if item_id in self.active_workers or item.pause_event.is_set(): continue
+            if item.cancel_event.is_set():
+                self._queue_ui_update(item_id, {'state': DownloadState.CANCELLED}); self._download_finished(item_id)
+                continue
             self._queue_ui_update(item_id, {'state': DownloadState.DOWNLOADING})
+            # Split the connection budget across download slots so parallel fragments never exceed it
+            item.concurrent_fragments = max(1, min(self.settings.get('concurrent_fragments', 4), self.settings.get('max_connections', 16) // max(self.max_concurrent_downloads, 1)))
+            item.auto_target_sec = max(self.settings.get('auto_quality_target_min', 10), 1) * 60
             
-            target = download_youtube_task if item.is_youtube else download_direct_file_task
-            args = (item, self._queue_ui_update, self._download_finished, {
-                'proxy': self.proxy_manager,
-                'auth': self.auth_manager,
-                'speed_limiter': self.speed_limiter
-            })
+            # With worker processes enabled the thread only relays progress; yt-dlp runs out of process
+            video_task = self.video_workers.run if self.video_workers.enabled else download_youtube_task
+            target = video_task if item.is_youtube else download_direct_file_task
+            args = (item, self._queue_ui_update, self._download_finished, self._download_managers())
 
             thread = threading.Thread(target=target, args=args, daemon=True)
-            self.active_download_threads.append(thread); thread.start()
+            self.io_devices.acquire(item_id, item.destination, item.downloaded_size)
+            self.active_workers[item_id] = thread; thread.start()
+
+    def _next_pending_download(self):
+        """
+        Removes and returns the next download to start: the oldest queued one whose destination
+        device has the fewest active writers, skipping devices at their limit. The whole queue is
+        considered (so an idle device is found however far back its downloads wait), looking each
+        device up once. Stale entries are returned as soon as they are seen so the caller drops them.
+        """
+        best_index, best_load = None, None
+        device_loads = {}  # device -> active writers, None if at its limit
+        for index, item_id in enumerate(self.pending_downloads):
+            item = self.downloads[item_id]
+            if item_id in self.active_workers or item.pause_event.is_set() or item.cancel_event.is_set():
+                best_index = index; break
+            device = self.io_devices.device_of(item.destination)
+            if device not in device_loads:
+                device_loads[device] = self.io_devices.load(item.destination) if self.io_devices.has_capacity(item.destination) else None
+            load = device_loads[device]
+            if load is None or (best_load is not None and load >= best_load): continue
+            best_index, best_load = index, load
+            if load == 0: break  # An idle device; nothing can beat it
+        if best_index is None: return None
+        item_id = self.pending_downloads[best_index]
+        del self.pending_downloads[best_index]
+        return item_id
+
+    def _download_managers(self) -> dict:
+        return {
+            'proxy': self.proxy_manager,
+            'auth': self.auth_manager,
+            'speed_limiter': self.speed_limiter,
+            'metadata_cache': self.metadata_cache,
+            'antivirus': self.av_manager,
+            'throughput': self.throughput_monitor,
+            'disk_writer': self.disk_writer
+        }
 
     def _on_closing(self):
         self.scheduler.stop()
         self.http_integration.stop()
+        self.settings_manager.flush()
+        self.proxy_manager.stop()
+        self.av_manager.shutdown()
+        self.video_workers.close()
         self.destroy()
 
     def _create_ui(self):
@@ -126,12 +266,14 @@ class ModernDownloadManager(TkinterDnD.Tk):
         self.completed_label=ctk.CTkLabel(stats_panel,text=f"{self.completed_label_prefix}: 0");self.completed_label.pack(side="left",padx=10)
         self.speed_label_prefix = self.translator.get('total_speed')
         self.speed_label=ctk.CTkLabel(stats_panel,text=f"{self.speed_label_prefix}: 0 MB/s",text_color='#ff0080');self.speed_label.pack(side="left",padx=10)
+        self.scan_queue_label_prefix = self.translator.get('scan_queue')
+        self.scan_queue_label=ctk.CTkLabel(stats_panel,text=f"{self.scan_queue_label_prefix}: 0");self.scan_queue_label.pack(side="left",padx=10)
 
         new_dl_frame = ctk.CTkFrame(self); new_dl_frame.grid(row=2, column=0, padx=20, pady=20, sticky="ew")
         new_dl_frame.grid_columnconfigure(1, weight=1)
         self.url_entry = ctk.CTkEntry(new_dl_frame, placeholder_text=self.translator.get('url_placeholder')); self.url_entry.grid(row=0, column=0, columnspan=3, padx=10, pady=10, sticky="ew")
         self.dest_label = ctk.CTkLabel(new_dl_frame, text=self.translator.get('destination')); self.dest_label.grid(row=1, column=0, padx=10, pady=5, sticky="w")
-        self.dest_entry = ctk.CTkEntry(new_dl_frame); self.dest_entry.insert(0, os.path.join(os.path.expanduser("~"), "Downloads")); self.dest_entry.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
+        self.dest_entry = ctk.CTkEntry(new_dl_frame); self.dest_entry.insert(0, self.default_destination); self.dest_entry.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
         self.browse_button = ctk.CTkButton(new_dl_frame, text=self.translator.get('browse'), width=80, command=self._browse); self.browse_button.grid(row=1, column=2, padx=10, pady=5)
         self.start_button = ctk.CTkButton(new_dl_frame, text=self.translator.get('start_download'), command=self._add_download); self.start_button.grid(row=2, column=0, columnspan=3, padx=10, pady=10)
 
@@ -144,97 +286,151 @@ class ModernDownloadManager(TkinterDnD.Tk):
     def _add_download(self):
         url, dest = self.url_entry.get().strip(), self.dest_entry.get().strip()
         if not (url and dest): return messagebox.showerror(self.translator.get('error_title'), self.translator.get('url_dest_required'))
+        self._create_download(url, dest); self.url_entry.delete(0, ctk.END)
+
+    def _create_download(self, url: str, dest: str, quality: str = 'best', group_id: str = None) -> DownloadItem:
+        """Creates a DownloadItem with its card and queues it. Must run on the GUI thread."""
         item = DownloadItem(url, dest)
+        item.quality = quality
+        item.group_id = group_id
+        if group_id and (group := self.downloads.get(group_id)):
+            group.child_ids.append(item.id)
+            if group.cancel_event.is_set(): item.cancel_event.set()  # Queued by the expansion just before the group was cancelled
+        # Playlists and channels become a group row that the expansion fills with child items
+        item.is_group = item.is_youtube and not group_id and is_playlist_url(url)
         self.downloads[item.id] = item
+        self.status_hub.register(item)
         callbacks = {
             'cancel_download': self.cancel_download, 
             'pause_download': self.pause_download,
             'resume_download': self.resume_download,
+            'scan_download': self.scan_download,
+            'cancel_scan': self.av_manager.cancel_scan,
             'refresh_download_link': self.refresh_download_link,
             'get_translator': lambda: self.translator
         }
         card = DownloadCard(self.active_frame, item, callbacks)
         card.pack(fill="x", padx=5, pady=5); self.download_cards[item.id] = card
-        self.download_queue.put(item.id); self.url_entry.delete(0, ctk.END); self._process_queue()
+        if item.is_group:
+            item.expanding = True
+            self._queue_ui_update(item.id, {'state': DownloadState.DOWNLOADING})
+            entry_callback = lambda entry_url: self.ingest_queue.put((entry_url, dest, quality, item.id, False))
+            threading.Thread(target=expand_playlist_task, args=(item, entry_callback, self._queue_ui_update, self._download_managers()), daemon=True).start()
+        else:
+            self.download_queue.put(item.id); self._process_queue()
+        return item
+
+    def _enqueue_downloads(self, urls: list, destination: str = None, quality: str = 'best'):
+        """Thread-safe: queues URLs for creation on the GUI thread (used by scheduled jobs)."""
+        for url in urls:
+            if url and url.strip(): self.ingest_queue.put((url.strip(), destination, quality, None, False))
 
     def _process_ui_updates(self):
         try:
+            # Bounded per tick so a burst of browser adds cannot freeze the UI
+            for _ in range(min(self.ingest_queue.qsize(), INGEST_BATCH_PER_TICK)):
+                url, dest, quality, group_id, ingested = self.ingest_queue.get_nowait()
+                item = self._create_download(url, dest or self.dest_entry.get().strip() or self.default_destination, quality, group_id)
+                item.ingested = ingested
+            touched_groups = set()
             while not self.ui_update_queue.empty():
                 item_id, update_data = self.ui_update_queue.get_nowait()
                 if (item := self.downloads.get(item_id)) and (card := self.download_cards.get(item_id)):
                     for key, value in update_data.items(): setattr(item, key, value)
                     card.update_ui(item)
+                    if item.group_id or item.is_group: touched_groups.add(item.group_id or item_id)
+            for group_id in touched_groups: self._refresh_group(group_id)
+            # After the updates above, so the final state sent by each worker has been applied
+            for _ in range(self.finished_queue.qsize()):
+                self._handle_download_finished(self.finished_queue.get_nowait())
+            if not self.download_queue.empty(): self._process_queue()
             self._update_global_stats()
         except queue.Empty: pass
         finally: self.after(200, self._process_ui_updates)
 
     def _add_download_from_browser(self, url, quality='best'):
-        """Add download from browser extension via HTTP."""
+        """Add download from browser extension via HTTP. Called on server threads, so it only queues."""
         if url and url.strip():
-            # Check if it's a YouTube video or a file download
-            if 'youtube.com' in url or 'youtu.be' in url:
-                # YouTube video - use quality selection
-                self.url_entry.delete(0, ctk.END)
-                self.url_entry.insert(0, url.strip())
-                self._add_download_with_quality(quality)
-                logging.info(f"Added video download from browser: {url} with quality: {quality}")
-            else:
-                # File download - no quality selection needed
-                self.url_entry.delete(0, ctk.END)
-                self.url_entry.insert(0, url.strip())
-                self._add_download()
-                logging.info(f"Added file download from browser: {url}")
+            # Quality only matters for videos; file downloads simply ignore it
+            self.ingest_queue.put((url.strip(), None, quality, None, True))  # Accepted by the ingest filter in HTTPIntegration
+            logging.info(f"Queued download from browser: {url} with quality: {quality}")
     
     def _add_download_with_quality(self, quality='best'):
         """Add download with specific quality setting."""
         url, dest = self.url_entry.get().strip(), self.dest_entry.get().strip()
         if not (url and dest): 
             return messagebox.showerror(self.translator.get('error_title'), self.translator.get('url_dest_required'))
-        
-        item = DownloadItem(url, dest)
-        item.quality = quality  # Store quality preference
-        self.downloads[item.id] = item
-        callbacks = {
-            'cancel_download': self.cancel_download, 
-            'pause_download': self.pause_download,
-            'resume_download': self.resume_download,
-            'refresh_download_link': self.refresh_download_link,
-            'get_translator': lambda: self.translator
-        }
-        card = DownloadCard(self.active_frame, item, callbacks)
-        card.pack(fill="x", padx=5, pady=5); self.download_cards[item.id] = card
-        self.download_queue.put(item.id); self.url_entry.delete(0, ctk.END); self._process_queue()
+        self._create_download(url, dest, quality); self.url_entry.delete(0, ctk.END)
     
     def _add_download_from_browser_file(self, url):
         """Add file download from browser extension (no quality selection needed)."""
-        if url and url.strip():
-            # Add the URL to the URL entry field and trigger download
-            self.url_entry.delete(0, ctk.END)
-            self.url_entry.insert(0, url.strip())
-            # Automatically start the download (files don't have quality options)
-            self._add_download()
-            logging.info(f"Added file download from browser: {url}")
+        self._add_download_from_browser(url)
+
+    def _refresh_group(self, group_id: str):
+        """Recomputes a playlist group's row from its children and finishes it once all are done."""
+        group = self.downloads.get(group_id)
+        if not group or group.state in TERMINAL_STATES: return
+        children = [self.downloads[c] for c in group.child_ids if c in self.downloads]
+        update = {
+            'total_size': sum(c.total_size for c in children),
+            'downloaded_size': sum(c.downloaded_size for c in children),
+            'progress': sum(c.progress for c in children) / len(children) if children else 0.0,
+            'speed': sum(c.speed for c in children if c.state == DownloadState.DOWNLOADING),
+            'time_remaining': f"{sum(c.state in TERMINAL_STATES for c in children)}/{len(children)}",
+        }
+        # Children still waiting in ingest_queue (it is drained in bounded batches) must not be missed
+        if not group.expanding and len(group.child_ids) >= group.expected_children and all(c.state in TERMINAL_STATES for c in children):
+            if group.cancel_event.is_set(): update['state'] = DownloadState.CANCELLED
+            elif group.error_message or any(c.state != DownloadState.COMPLETED for c in children): update['state'] = DownloadState.ERROR
+            else: update['state'] = DownloadState.COMPLETED
+        for key, value in update.items(): setattr(group, key, value)
+        self.status_hub.publish(group_id, update)
+        if card := self.download_cards.get(group_id): card.update_ui(group)
+        if group.state in TERMINAL_STATES: self._download_finished(group_id)
 
     def _update_global_stats(self):
-        active = [item for item in self.downloads.values() if item.state == DownloadState.DOWNLOADING]
-        completed = [item for item in self.downloads.values() if item.state in [DownloadState.COMPLETED, DownloadState.ERROR, DownloadState.CANCELLED]]
+        # Group rows only aggregate their children, so they are left out of the totals
+        active = [item for item in self.downloads.values() if item.state == DownloadState.DOWNLOADING and not item.is_group]
+        completed = [item for item in self.downloads.values() if item.state in [DownloadState.COMPLETED, DownloadState.ERROR, DownloadState.CANCELLED] and not item.is_group]
         total_speed = sum(item.speed for item in active)
         self.active_label.configure(text=f"{self.active_label_prefix}: {len(active)}")
         self.completed_label.configure(text=f"{self.completed_label_prefix}: {len(completed)}")
         self.speed_label.configure(text=f"{self.speed_label_prefix}: {total_speed:.2f} MB/s")
+        scans = self.av_manager.get_queue_stats()
+        self.scan_queue_label.configure(text=f"{self.scan_queue_label_prefix}: {scans['queued']}" + (f" (+{scans['running']})" if scans['running'] else ""))
 
     def _queue_ui_update(self, item_id: str, update_dict: dict):
         self.ui_update_queue.put((item_id, update_dict))
+        # Every transfer reports its speed through here, which makes it the natural place to measure hosts
+        if update_dict.get('speed') and (item := self.downloads.get(item_id)) and not item.is_group:
+            self.throughput_monitor.record(item.url, update_dict['speed'] * 1024**2)
+        if 'downloaded_size' in update_dict: self.io_devices.record_progress(item_id, update_dict['downloaded_size'])
+        self.status_hub.publish(item_id, update_dict)
 
     def _download_finished(self, item_id):
+        """Thread-safe: called by a worker (or a group) once it stops; handled on the next UI tick."""
+        self.finished_queue.put(item_id)
+
+    def _handle_download_finished(self, item_id):
+        self.active_workers.pop(item_id, None)
+        self.io_devices.release(item_id)
         item = self.downloads.get(item_id)
-        if item and item.state == DownloadState.COMPLETED: self.av_manager.scan_file_async(item.filepath, item.id)
+        if item and item.state not in TERMINAL_STATES:
+            # A paused worker exited; if it was resumed meanwhile, start it again now that the slot is free
+            if not item.pause_event.is_set(): self._queue_ui_update(item_id, {'state': DownloadState.QUEUED}); self.download_queue.put(item_id)
+            self._process_queue()
+            return
+        # Only browser submissions hold an in-flight slot in the ingest filter
+        if item and item.ingested: self.ingest_filter.release(item.url)
+        if item and item.state == DownloadState.COMPLETED and not item.is_group: self.av_manager.scan_file_async(item.filepath, item.id)
         if item and (card := self.download_cards.get(item_id)) and card.master == self.active_frame:
             card.pack_forget()
             callbacks = {
             'cancel_download': self.cancel_download, 
             'pause_download': self.pause_download,
             'resume_download': self.resume_download,
+            'scan_download': self.scan_download,
+            'cancel_scan': self.av_manager.cancel_scan,
             'get_translator': lambda: self.translator
         }
             completed_card = DownloadCard(self.completed_frame, item, callbacks); completed_card.pack(fill="x", padx=5, pady=5)
@@ -246,25 +442,37 @@ class ModernDownloadManager(TkinterDnD.Tk):
     
     def pause_download(self, item_id):
         """Pause a download."""
-        if item := self.downloads.get(item_id):
+        if (item := self.downloads.get(item_id)) and item.is_group:
+            for child_id in item.child_ids:
+                if self.downloads[child_id].state in (DownloadState.QUEUED, DownloadState.DOWNLOADING): self.pause_download(child_id)
+        elif item:
             item.pause()
+            self.status_hub.publish(item_id, {'state': item.state})
             if item_id in self.download_cards:
                 self.download_cards[item_id].update_ui(item)
             logging.info(f"Download {item_id} paused by user")
 
     def resume_download(self, item_id):
         """Resume a download."""
-        if item := self.downloads.get(item_id):
+        if (item := self.downloads.get(item_id)) and item.is_group:
+            for child_id in item.child_ids:
+                if self.downloads[child_id].state == DownloadState.PAUSED: self.resume_download(child_id)
+        elif item:
             item.resume()
+            self.status_hub.publish(item_id, {'state': item.state})
             if item_id in self.download_cards:
                 self.download_cards[item_id].update_ui(item)
-            # Re-queue the download for processing
-            self.download_queue.put(item_id)
+            if item_id in self.active_workers:
+                # The worker has not reached its next progress hook yet, so it simply carries on
+                self._queue_ui_update(item_id, {'state': DownloadState.DOWNLOADING})
+            else:
+                # Paused workers exit and free their slot; a new one continues from the partial file
+                self.download_queue.put(item_id); self._process_queue()
             logging.info(f"Download {item_id} resumed by user")
 
     def refresh_download_link(self, item_id):
         """Refresh the download link for a failed or expired download."""
-        if item := self.downloads.get(item_id):
+        if (item := self.downloads.get(item_id)) and not item.is_group:
             try:
                 # Reset the download state
                 item.state = DownloadState.QUEUED
@@ -276,6 +484,7 @@ class ModernDownloadManager(TkinterDnD.Tk):
                 item.paused = False
                 item.pause_event.clear()
                 item.cancel_event.clear()
+                self.status_hub.register(item)
                 
                 # Update UI
                 if item_id in self.download_cards:
@@ -292,8 +501,15 @@ class ModernDownloadManager(TkinterDnD.Tk):
                 logging.error(f"Error refreshing download link for {item_id}: {e}")
                 messagebox.showerror("Error", f"Failed to refresh download link: {e}")
 
+    def scan_download(self, item_id):
+        """Scans a completed download on request; it is served ahead of automatic scans."""
+        if (item := self.downloads.get(item_id)) and item.state == DownloadState.COMPLETED and not item.is_group:
+            self.av_manager.scan_file_async(item.filepath, item_id, user_requested=True)
+
     def cancel_download(self, item_id):
-        if item := self.downloads.get(item_id): item.cancel_event.set()
+        if item := self.downloads.get(item_id):
+            item.cancel_event.set()
+            for child_id in item.child_ids: self.cancel_download(child_id)
 
     def _open_settings(self):
         SettingsWindow(self)
@@ -307,6 +523,8 @@ class ModernDownloadManager(TkinterDnD.Tk):
             'cancel_download': self.cancel_download, 
             'pause_download': self.pause_download,
             'resume_download': self.resume_download,
+            'scan_download': self.scan_download,
+            'cancel_scan': self.av_manager.cancel_scan,
             'refresh_download_link': self.refresh_download_link,
             'get_translator': lambda: self.translator
         }
@@ -315,6 +533,9 @@ class ModernDownloadManager(TkinterDnD.Tk):
             self.download_cards[item_id] = card
 
 if __name__ == "__main__":
+    # Only in the real entry point: importing this module (e.g. from a worker process) must not truncate the log
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', filename='loadifypro.log', filemode='w')
     app = ModernDownloadManager()
+    if "--minimized" in sys.argv: app.iconify() # Started on demand by the native messaging host
     app.mainloop()
 
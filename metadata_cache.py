@@ -0,0 +1,53 @@
+"""
+Metadata Cache for LoadifyPro
+Stores yt-dlp extraction results (title, format lists, stream URLs) on disk with a TTL,
+so repeated or retried video downloads skip the expensive extraction step. Shared by
+all download workers and kept across restarts.
+"""
+import os
+import time
+import hashlib
+import logging
+from typing import Optional
+
+from ingest_filter import normalize_url
+from json_file_cache import JsonFileCache
+
+logger = logging.getLogger(__name__)
+
+class MetadataCache(JsonFileCache):
+    """A thread-safe, TTL'd on-disk cache of extracted video metadata keyed by video id."""
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_sec: float = 1800, max_entries: int = 2000):
+        """
+        Initializes the MetadataCache.
+
+        Args:
+            cache_dir (str, optional): Directory for cache files. Defaults to ./metadata_cache.
+            ttl_sec (float): Entry lifetime. Stream URLs inside the metadata expire upstream,
+                             so this should stay well below a few hours.
+            max_entries (int): Oldest entries are evicted beyond this count.
+        """
+        super().__init__(cache_dir or os.path.join(os.getcwd(), "metadata_cache"), ttl_sec, max_entries)
+
+    def _path(self, url: str) -> str:
+        # normalize_url() reduces YouTube links to their video id, so every URL form of a video shares an entry
+        return os.path.join(self.cache_dir, hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Returns the cached info dict for `url`, or None if absent or expired."""
+        path = self._path(url)
+        if (entry := self._read(path)) is None:
+            return None
+        if time.time() - entry.get('saved_at', 0) > self.ttl_sec:
+            self._remove(path)
+            return None
+        logger.info(f"Metadata cache hit for {url}")
+        return entry.get('info')
+
+    def put(self, url: str, info: dict):
+        """Stores a JSON-serializable info dict (see YoutubeDL.sanitize_info) for `url`."""
+        self._write(self._path(url), {'saved_at': time.time(), 'url': url, 'info': info}, f"metadata for {url}")
+
+    def invalidate(self, url: str):
+        self._remove(self._path(url))
@@ -34,6 +34,7 @@ class LocaleManager:
                 "active_downloads": "ACTIVE",
                 "completed_downloads": "COMPLETED",
                 "total_speed": "SPEED",
+                "scan_queue": "SCAN QUEUE",
                 "url_placeholder": "Enter or Drag & Drop URL here...",
                 "destination": "Destination",
                 "browse": "Browse",
@@ -48,6 +49,7 @@ class LocaleManager:
                 "status_error": "ERROR",
                 "status_cancelled": "CANCELLED",
                 "status_scanning": "SCANNING",
+                "status_pending": "PENDING",
                 "status_infected": "INFECTED",
                 "status_quarantined": "QUARANTINED",
                 "settings_ui_customization": "UI Customization",
@@ -68,6 +70,7 @@ class LocaleManager:
                 "settings_proxy_enabled": "Enable Proxy:",
                 "settings_proxy_http": "HTTP Proxy:",
                 "settings_proxy_https": "HTTPS Proxy:",
+                "settings_proxy_bypass": "Bypass Proxy For (comma-separated):",
                 "settings_speed_limit": "Speed Limiter",
                 "settings_speed_limit_enabled": "Enable Speed Limit:",
                 "settings_speed_limit_kb": "Speed Limit (KB/s):",
@@ -77,6 +80,9 @@ class LocaleManager:
                 "settings_auth_password": "Password:",
                 "settings_scheduler": "Scheduler",
                 "settings_max_concurrent": "Max Concurrent Downloads:",
+                "settings_concurrent_fragments": "Parallel Fragments per Video:",
+                "settings_video_workers": "Video Worker Processes (0 = off):",
+                "settings_auto_quality_target": "Auto Quality Target Time (min):",
             },
             "es": {
                 "app_title": "LoadifyPro - Gestor de Descargas Profesional",
@@ -84,6 +90,7 @@ class LocaleManager:
                 "active_downloads": "ACTIVOS",
                 "completed_downloads": "COMPLETADOS",
                 "total_speed": "VELOCIDAD",
+                "scan_queue": "COLA DE ANÁLISIS",
                 "url_placeholder": "Ingrese o Arrastre y Suelte la URL aquí...",
                 "destination": "Destino",
                 "browse": "Navegar",
@@ -98,6 +105,7 @@ class LocaleManager:
                 "status_error": "ERROR",
                 "status_cancelled": "CANCELADO",
                 "status_scanning": "ANALIZANDO",
+                "status_pending": "PENDIENTE",
                 "status_infected": "INFECTADO",
                 "status_quarantined": "EN CUARENTENA",
                 "settings_ui_customization": "Personalización de Interfaz",
@@ -118,6 +126,7 @@ class LocaleManager:
                 "settings_proxy_enabled": "Habilitar Proxy:",
                 "settings_proxy_http": "Proxy HTTP:",
                 "settings_proxy_https": "Proxy HTTPS:",
+                "settings_proxy_bypass": "Sin Proxy Para (separado por comas):",
                 "settings_speed_limit": "Limitador de Velocidad",
                 "settings_speed_limit_enabled": "Habilitar Límite de Velocidad:",
                 "settings_speed_limit_kb": "Límite de Velocidad (KB/s):",
@@ -127,6 +136,9 @@ class LocaleManager:
                 "settings_auth_password": "Contraseña:",
                 "settings_scheduler": "Programador",
                 "settings_max_concurrent": "Descargas Concurrentes Máximas:",
+                "settings_concurrent_fragments": "Fragmentos Paralelos por Video:",
+                "settings_video_workers": "Procesos de Video (0 = desactivado):",
+                "settings_auto_quality_target": "Tiempo Objetivo de Calidad Auto (min):",
             }
         }
 
@@ -2,12 +2,17 @@
 """
 Native Messaging Host for LoadifyPro Browser Extension
 This script runs as a standalone process to handle communication from the browser extension.
+Received URLs are forwarded in batches to the running LoadifyPro instance over its local HTTP API.
 """
 import sys
 import struct
 import json
 import logging
 import os
+import time
+import subprocess
+import urllib.request
+import urllib.error
 from pathlib import Path
 
 # Add the project directory to Python path
@@ -27,11 +32,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Local LoadifyPro HTTP API (see http_integration.py)
+APP_URL = "http://localhost:8080"
+BATCH_WINDOW_SEC = 0.05  # How long to wait for more messages to join a batch
+MAX_BATCH = 100
+APP_START_TIMEOUT_SEC = 30
+
 def main():
     """Main function to run the native messaging host."""
     logger.info("Native messaging host starting...")
     
-    # Create a message queue (we'll just print URLs for now)
+    # The listener puts each message dict on the queue, then None when stdin closes
     message_queue = queue.Queue()
     
     # Create and start the listener
@@ -39,31 +50,70 @@ def main():
     listener.start()
     
     try:
-        # Process messages from the queue
-        while True:
+        while (message := message_queue.get()) is not None: # Blocks; no CPU is used while idle
+            batch = [message]
             try:
-                # Check for messages (non-blocking)
-                if not message_queue.empty():
-                    url = message_queue.get_nowait()
-                    logger.info(f"Received URL from browser: {url}")
-                    
-                    # Send response back to browser
-                    response = {"status": "success", "message": f"URL received: {url}"}
-                    send_response(response)
-                    
+                while len(batch) < MAX_BATCH:
+                    if (message := message_queue.get(timeout=BATCH_WINDOW_SEC)) is None:
+                        message_queue.put(None) # Re-post end-of-stream for the outer loop
+                        break
+                    batch.append(message)
             except queue.Empty:
-                # No messages, continue
                 pass
-            except KeyboardInterrupt:
-                logger.info("Native host shutting down...")
-                break
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                break
-                
+
+            by_quality = {}
+            for m in batch:
+                by_quality.setdefault(m.get('quality', 'best'), []).extend([m['url']] if m.get('url') else m.get('urls', []))
+            try:
+                accepted = sum(forward_urls(urls, quality).get('accepted', 0) for quality, urls in by_quality.items())
+                response = {"status": "success", "message": f"{accepted} URL(s) sent to LoadifyPro", "accepted": accepted}
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not forward URLs to LoadifyPro: {e}")
+                response = {"status": "error", "message": str(e)}
+            # sendNativeMessage expects exactly one reply per message
+            for _ in batch:
+                send_response(response)
+    except KeyboardInterrupt:
+        logger.info("Native host shutting down...")
     finally:
         listener.stop()
 
+def forward_urls(urls, quality='best'):
+    """Sends URLs to the running LoadifyPro instance, starting one if none is listening."""
+    try:
+        return _post_downloads(urls, quality)
+    except urllib.error.URLError as e:
+        if not isinstance(e.reason, ConnectionRefusedError):
+            raise
+    start_app()
+    return _post_downloads(urls, quality)
+
+def _post_downloads(urls, quality):
+    body = json.dumps({"urls": urls, "quality": quality}).encode('utf-8')
+    request = urllib.request.Request(f"{APP_URL}/add_downloads", data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as reply:
+            return json.loads(reply.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        # Duplicates and rate limiting are reported in the body, not as failures
+        return json.loads(e.read().decode('utf-8') or '{}')
+
+def start_app():
+    """Launches LoadifyPro minimized in the background and waits until its HTTP API answers."""
+    logger.info("No running LoadifyPro instance found, starting one.")
+    options = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32" else {'start_new_session': True}
+    # stdout must not be inherited: it is the native messaging channel
+    subprocess.Popen([sys.executable, str(project_dir / 'main_app.py'), '--minimized'], cwd=str(project_dir),
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **options)
+    deadline = time.monotonic() + APP_START_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{APP_URL}/downloads?limit=0", timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise TimeoutError("LoadifyPro did not start in time")
+
 def send_response(response):
     """Send a response back to the browser extension."""
     try:
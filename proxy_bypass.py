@@ -0,0 +1,147 @@
+"""
+Proxy Bypass for LoadifyPro
+Decides which URLs skip the proxy, from no_proxy/PAC-style rules. Rules are compiled
+once into a suffix set, a single regular expression and a list of networks, and the
+decision for each host is cached, so the check costs a dictionary lookup per request.
+
+Rule syntax (one rule per entry, case-insensitive):
+    example.com        example.com and all of its subdomains
+    .example.com       the same (no_proxy style)
+    *.example.com      the same (PAC/browser style)
+    build-*.corp.lan   shell-style wildcard over the whole host name
+    10.0.0.0/8         IP literals inside the network (host names are not resolved)
+    192.168.1.5, ::1   a single IP address
+    <local>            host names without a dot
+    *                  every host
+    host:port          any of the above, restricted to one port
+"""
+import re
+import fnmatch
+import ipaddress
+import threading
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BYPASS_RULES = ['localhost', '127.0.0.0/8', '::1']
+
+class _RuleSet:
+    """(Internal) The compiled form of the rules for one port (None: any port)."""
+
+    def __init__(self):
+        self.match_all = False
+        self.match_local = False
+        self.suffixes: set = set()
+        self.patterns: List[str] = []
+        self.regex: Optional[re.Pattern] = None
+        self.networks: list = []
+
+    def compile(self):
+        if self.patterns:
+            self.regex = re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in self.patterns))
+
+    def matches(self, host: str, address) -> bool:
+        if self.match_all:
+            return True
+        if address is not None:
+            return any(address in network for network in self.networks if network.version == address.version)
+        if self.match_local and '.' not in host:
+            return True
+        # Walk the host's own suffixes (a.b.example.com -> b.example.com -> example.com -> com) through the set
+        parts = host.split('.')
+        if any('.'.join(parts[i:]) in self.suffixes for i in range(len(parts))):
+            return True
+        return bool(self.regex and self.regex.match(host))
+
+class ProxyBypass:
+    """Thread-safe compiled matcher for proxy bypass rules, with a bounded per-host decision cache."""
+
+    def __init__(self, rules: Optional[Iterable[str]] = None, cache_size: int = 4096):
+        """
+        Initializes the ProxyBypass.
+
+        Args:
+            rules (iterable, optional): Bypass rules (see the module docstring). Defaults to loopback only.
+            cache_size (int): Number of (host, port) decisions remembered.
+        """
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.rule_sets: Dict[Optional[int], _RuleSet] = {}
+        self.configure(DEFAULT_BYPASS_RULES if rules is None else rules)
+
+    def configure(self, rules: Iterable[str]):
+        """Compiles a new rule list, replacing the current one. Invalid rules are logged and skipped."""
+        rules = list(rules)
+        rule_sets: Dict[Optional[int], _RuleSet] = {}
+        for raw in rules:
+            rule = (raw or '').strip().lower()
+            if not rule: continue
+            try:
+                host, port = self._split_rule(rule)
+                rule_set = rule_sets.setdefault(port, _RuleSet())
+                self._add(rule_set, host)
+            except ValueError as e:
+                logger.warning(f"Ignoring invalid proxy bypass rule '{raw}': {e}")
+        for rule_set in rule_sets.values(): rule_set.compile()
+        with self.lock:
+            self.rule_sets = rule_sets
+            self.cache.clear()
+        logger.info(f"Proxy bypass configured with {sum(1 for rule in rules if rule and rule.strip())} rules.")
+
+    @staticmethod
+    def _split_rule(rule: str) -> Tuple[str, Optional[int]]:
+        """(Internal) 'host:port' -> (host, port); bare IPv6 addresses and CIDRs keep their colons."""
+        if rule.startswith('['):
+            host, _, rest = rule[1:].partition(']')
+            return host, int(rest[1:]) if rest.startswith(':') else None
+        if rule.count(':') == 1:
+            host, port = rule.split(':')
+            return host, int(port)
+        return rule, None
+
+    @staticmethod
+    def _add(rule_set: _RuleSet, host: str):
+        if host == '*':
+            rule_set.match_all = True
+        elif host == '<local>':
+            rule_set.match_local = True
+        elif '/' in host or ':' in host or re.fullmatch(r'[\d.]+', host):
+            rule_set.networks.append(ipaddress.ip_network(host, strict=False))
+        elif host.startswith(('*.', '.')):
+            rule_set.suffixes.add(host.split('.', 1)[1])
+        elif '*' in host or '?' in host:
+            rule_set.patterns.append(host)
+        else:
+            rule_set.suffixes.add(host)
+
+    def should_bypass(self, url: str) -> bool:
+        """True if requests to `url` should go direct rather than through the proxy."""
+        try:
+            parts = urlsplit(url.strip())
+            host, port = (parts.hostname or '').rstrip('.'), parts.port
+        except ValueError:
+            return False
+        if not host:
+            return False
+        if port is None: port = 443 if parts.scheme == 'https' else 80
+        key = (host, port)
+        with self.lock:
+            decision = self.cache.get(key)
+            if decision is not None:
+                self.cache.move_to_end(key)
+                return decision
+            rule_sets = self.rule_sets
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+        decision = any(rule_set.matches(host, address) for rule_port, rule_set in rule_sets.items() if rule_port in (None, port))
+        with self.lock:
+            if rule_sets is self.rule_sets:  # Not reconfigured meanwhile
+                self.cache[key] = decision
+                if len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+        return decision
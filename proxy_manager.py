@@ -3,7 +3,10 @@ Proxy Manager for LoadifyPro
 Handles the configuration and application of proxy settings for download requests.
 """
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from proxy_pool import ProxyPool
+from proxy_bypass import ProxyBypass
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +17,9 @@ class ProxyManager:
         """Initializes the ProxyManager with default empty settings."""
         self.proxy_settings: Dict[str, Optional[str]] = {"http": None, "https": None}
         self.is_enabled = False
+        self.pool = ProxyPool()
+        self.pool_enabled = False
+        self.bypass = ProxyBypass()
         logger.info("ProxyManager initialized.")
 
     def configure(self, is_enabled: bool, http_proxy: str, https_proxy: str):
@@ -35,13 +41,51 @@ class ProxyManager:
             self.is_enabled = False # Ensure it's disabled if no URL is provided
             logger.info("Proxy is DISABLED.")
 
-    def get_proxies(self) -> Optional[Dict[str, str]]:
+    def configure_pool(self, is_enabled: bool, proxy_urls: List[str], policy: str = 'weighted', check_url: str = '', check_interval_sec: float = 60):
+        """
+        Configures the proxy pool. While enabled and non-empty, it takes precedence over the single proxy.
+
+        Args:
+            is_enabled (bool): Whether requests should be spread over the pool.
+            proxy_urls (list): Proxy URLs, each used for both HTTP and HTTPS.
+            policy (str): Selection policy (see ProxyPool).
+            check_url (str): URL fetched through each proxy by the health check. Blank keeps the default.
+            check_interval_sec (float): Time between health checks of a proxy.
+        """
+        self.pool_enabled = is_enabled and bool(proxy_urls)
+        self.pool.configure(proxy_urls if self.pool_enabled else [], policy, check_url or None, check_interval_sec)
+        logger.info(f"Proxy pool is {'ENABLED' if self.pool_enabled else 'DISABLED'}.")
+
+    def configure_bypass(self, rules: List[str]):
+        """Sets the hosts reached directly rather than through any proxy (see ProxyBypass for the rule syntax)."""
+        self.bypass.configure(rules)
+
+    def get_proxies(self, url: Optional[str] = None) -> Optional[Dict[str, str]]:
         """
         Returns the proxy dictionary for the 'requests' library if enabled.
 
+        Args:
+            url (str, optional): The URL the proxies are for; bypassed hosts get no proxy, and
+                                 pooled proxies may be chosen per host.
+
         Returns:
-            A dictionary of proxy settings or None if disabled/unconfigured.
+            A dictionary of proxy settings or None if disabled/unconfigured or bypassed for `url`.
         """
+        if url and (self.pool_enabled or self.is_enabled) and self.bypass.should_bypass(url):
+            return None
+        if self.pool_enabled and (proxy := self.pool.select(url)):
+            return {"http": proxy, "https": proxy}
         if self.is_enabled and any(self.proxy_settings.values()):
             return {k: v for k, v in self.proxy_settings.items() if v}
-        return None
\ No newline at end of file
+        return None
+
+    def report(self, proxies: Optional[Dict[str, str]], ok: bool, n_bytes: int = 0, seconds: float = 0):
+        """
+        Feeds the outcome of a transfer made with `proxies` (as returned by get_proxies) back
+        into the pool's health and throughput tracking. Ignored for non-pooled proxies.
+        """
+        if self.pool_enabled and proxies and proxies.get("http"):
+            self.pool.report(proxies["http"], ok, n_bytes, seconds)
+
+    def stop(self):
+        self.pool.stop()
@@ -0,0 +1,239 @@
+"""
+Proxy Pool for LoadifyPro
+Spreads requests over a set of proxies. Each proxy is health-checked in the background
+and measured (check latency, and the throughput real transfers achieve through it);
+proxies that keep failing are ejected and re-admitted once a later check passes.
+The check URL is configurable, so local proxy stand-ins can be used in tests.
+"""
+import time
+import random
+import itertools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from throughput_monitor import host_key
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('weighted', 'fastest', 'round_robin', 'sticky')
+DEFAULT_CHECK_URL = "http://www.gstatic.com/generate_204"
+# Transfers smaller than this say more about latency than about a proxy's capacity
+MIN_THROUGHPUT_SAMPLE_BYTES = 256 * 1024
+MAX_EJECT_SEC = 3600
+
+class ProxyStats:
+    """Health and performance of one proxy in the pool."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None     # Smoothed health-check round trip, seconds
+        self.throughput: Optional[float] = None  # Smoothed transfer speed, bytes/second
+        self.consecutive_failures = 0
+        self.ejections = 0                       # Consecutive ejections; each one waits twice as long for its re-check
+        self.recheck_at = 0.0                    # monotonic; when an ejected proxy is checked again, 0 while in rotation
+        self.last_checked = 0.0                  # monotonic
+
+    @property
+    def ejected(self) -> bool:
+        """Ejected proxies stay out of rotation until they pass a health check."""
+        return self.recheck_at > 0
+
+    def to_dict(self) -> dict:
+        return {'url': self.url, 'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'throughput_kbps': round(self.throughput / 1024, 1) if self.throughput is not None else None,
+                'consecutive_failures': self.consecutive_failures, 'ejected': self.ejected,
+                'recheck_in_sec': round(max(self.recheck_at - time.monotonic(), 0), 1) if self.ejected else None}
+
+class ProxyPool:
+    """
+    Thread-safe pool of proxies with background health checks.
+
+    Policies:
+        weighted     picks at random in proportion to each proxy's measured capacity
+                     (throughput, else inverse latency), so load follows capacity.
+        fastest      always the proxy with the lowest check latency.
+        round_robin  cycles through the healthy proxies.
+        sticky       keeps each host on the same proxy while it stays healthy (keeps
+                     sessions and server-side rate limits consistent); new hosts are
+                     assigned as with 'weighted'.
+    """
+
+    def __init__(self, check_url: str = DEFAULT_CHECK_URL, check_interval_sec: float = 60, check_timeout_sec: float = 10,
+                 eject_after_failures: int = 3, eject_sec: float = 60, alpha: float = 0.3):
+        """
+        Initializes the ProxyPool. Call configure() to load proxies and start checking them.
+
+        Args:
+            check_url (str): URL fetched through each proxy by the health check.
+            check_interval_sec (float): Time between checks of a healthy proxy.
+            check_timeout_sec (float): A check slower than this counts as a failure.
+            eject_after_failures (int): Consecutive failures (checks or transfers) before a proxy is ejected.
+            eject_sec (float): Delay before an ejected proxy is checked again; doubles while it keeps failing, up to an hour.
+            alpha (float): Weight of each new sample in the latency and throughput averages.
+        """
+        self.check_url = check_url
+        self.check_interval_sec = check_interval_sec
+        self.check_timeout_sec = check_timeout_sec
+        self.eject_after_failures = eject_after_failures
+        self.eject_sec = eject_sec
+        self.alpha = alpha
+        self.policy = 'weighted'
+        self.proxies: Dict[str, ProxyStats] = {}
+        self.sticky_hosts: Dict[str, str] = {}
+        self.rotation = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.checker: Optional[threading.Thread] = None
+
+    def configure(self, proxy_urls: List[str], policy: str = 'weighted', check_url: Optional[str] = None, check_interval_sec: Optional[float] = None):
+        """Sets the pool's proxies (keeping the stats of those already known) and starts health checks."""
+        if policy not in POLICIES:
+            logger.warning(f"Unknown proxy pool policy '{policy}', using 'weighted'.")
+            policy = 'weighted'
+        urls = list(dict.fromkeys(url.strip() for url in proxy_urls if url and url.strip()))
+        with self.lock:
+            self.policy = policy
+            if check_url: self.check_url = check_url
+            if check_interval_sec: self.check_interval_sec = check_interval_sec
+            self.proxies = {url: self.proxies.get(url) or ProxyStats(url) for url in urls}
+            self.sticky_hosts = {host: url for host, url in self.sticky_hosts.items() if url in self.proxies}
+            # Under the lock, where the loop decides to exit: either it sees the cleared stop and keeps going, or it has cleared self.checker
+            if urls:
+                self.stop_event.clear()
+                if not self.checker:
+                    self.checker = threading.Thread(target=self._check_loop, name="proxy-health", daemon=True)
+                    self.checker.start()
+        logger.info(f"Proxy pool configured with {len(urls)} proxies, policy '{policy}'.")
+        self.wakeup.set()  # Check new proxies right away
+
+    def select(self, url: Optional[str] = None) -> Optional[str]:
+        """
+        Picks a proxy for a request to `url` according to the policy.
+
+        Returns:
+            A proxy URL, or None if the pool is empty. If every proxy is ejected, the one
+            re-checked soonest is returned, so traffic keeps to the proxies rather than
+            going direct.
+        """
+        with self.lock:
+            if not self.proxies:
+                return None
+            healthy = [stats for stats in self.proxies.values() if not stats.ejected]
+            if not healthy:
+                fallback = min(self.proxies.values(), key=lambda stats: stats.recheck_at)
+                logger.warning(f"All pooled proxies are ejected; using {fallback.url}.")
+                return fallback.url
+            if self.policy == 'fastest':
+                return min(healthy, key=lambda stats: (stats.latency is None, stats.latency or 0)).url
+            if self.policy == 'round_robin':
+                return healthy[next(self.rotation) % len(healthy)].url
+            if self.policy == 'sticky' and url:
+                host = host_key(url)
+                bound = self.proxies.get(self.sticky_hosts.get(host))
+                if bound and not bound.ejected:
+                    return bound.url
+                chosen = self._weighted_choice(healthy)
+                self.sticky_hosts[host] = chosen.url
+                return chosen.url
+            return self._weighted_choice(healthy).url
+
+    @staticmethod
+    def _weighted_choice(candidates: List[ProxyStats]) -> ProxyStats:
+        """
+        (Internal) Picks a proxy in proportion to its capacity. Unmeasured proxies get the
+        average weight, so they are tried; recent failures scale a proxy's weight down.
+        """
+        if any(stats.throughput for stats in candidates):
+            weights = [stats.throughput for stats in candidates]
+        else:
+            weights = [1 / max(stats.latency, 0.001) if stats.latency is not None else None for stats in candidates]
+        known = [weight for weight in weights if weight]
+        average = sum(known) / len(known) if known else 1.0
+        weights = [(weight or average) / (1 + stats.consecutive_failures) for weight, stats in zip(weights, candidates)]
+        return random.choices(candidates, weights=weights)[0]
+
+    def report(self, proxy_url: str, ok: bool, n_bytes: int = 0, seconds: float = 0):
+        """Records the outcome of a transfer made through a pooled proxy."""
+        with self.lock:
+            stats = self.proxies.get(proxy_url)
+            if not stats:
+                return
+            if not ok:
+                self._record_failure(stats, "transfer failed")
+                return
+            stats.consecutive_failures = 0
+            if n_bytes >= MIN_THROUGHPUT_SAMPLE_BYTES and seconds > 0:
+                sample = n_bytes / seconds
+                stats.throughput = sample if stats.throughput is None else self.alpha * sample + (1 - self.alpha) * stats.throughput
+
+    def _record_failure(self, stats: ProxyStats, reason: str):
+        """
+        (Internal) Counts a failure and ejects the proxy once it has failed too often in a row.
+        A failed re-check of an ejected proxy pushes its next re-check back. Caller holds the lock.
+        """
+        stats.consecutive_failures += 1
+        if stats.ejected:
+            if stats.recheck_at > time.monotonic(): return  # A transfer that was already running through it
+        elif stats.consecutive_failures < self.eject_after_failures:
+            return
+        delay = min(self.eject_sec * 2 ** stats.ejections, MAX_EJECT_SEC)
+        if not stats.ejected: logger.warning(f"Proxy {stats.url} ejected ({reason}); re-checking in {delay:.0f}s.")
+        stats.ejections += 1
+        stats.recheck_at = time.monotonic() + delay
+
+    def check(self, stats: ProxyStats):
+        """Runs one health check through a proxy and updates its stats."""
+        started = time.monotonic()
+        try:
+            with requests.get(self.check_url, proxies={'http': stats.url, 'https': stats.url}, timeout=self.check_timeout_sec, stream=True) as response:
+                # Any answer from the target proves the proxy works; these come from the proxy itself
+                ok, reason = response.status_code not in (407, 502, 503, 504), f"HTTP {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            ok, reason = False, str(e)
+        elapsed = time.monotonic() - started
+        with self.lock:
+            stats.last_checked = time.monotonic()
+            if not ok:
+                self._record_failure(stats, f"health check: {reason}")
+                return
+            if stats.ejected:
+                logger.info(f"Proxy {stats.url} passed its health check and is back in rotation.")
+            stats.latency = elapsed if stats.latency is None else self.alpha * elapsed + (1 - self.alpha) * stats.latency
+            stats.consecutive_failures = stats.ejections = 0
+            stats.recheck_at = 0.0
+
+    def _due(self) -> List[ProxyStats]:
+        """(Internal) Proxies whose next check is due: healthy ones every interval, ejected ones at their re-check time."""
+        with self.lock:
+            return [stats for stats in self.proxies.values() if time.monotonic() >= self._next_check(stats)]
+
+    def _next_check(self, stats: ProxyStats) -> float:
+        if stats.ejected: return stats.recheck_at
+        return stats.last_checked + self.check_interval_sec if stats.last_checked else 0.0
+
+    def _check_loop(self):
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="proxy-check") as executor:
+            while True:
+                self.wakeup.clear()
+                due = self._due()
+                if due: list(executor.map(self.check, due))  # A slow proxy delays the round by at most the check timeout
+                with self.lock:
+                    if self.stop_event.is_set():
+                        self.checker = None
+                        return
+                    next_due = min((self._next_check(stats) for stats in self.proxies.values()), default=None)
+                # An emptied pool sleeps until configure() or stop() sets the wakeup
+                self.wakeup.wait(None if next_due is None else min(max(next_due - time.monotonic(), 1.0), self.check_interval_sec))
+
+    def stats(self) -> List[dict]:
+        with self.lock:
+            return [stats.to_dict() for stats in self.proxies.values()]
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
@@ -0,0 +1,51 @@
+"""
+Scan Verdict Cache for LoadifyPro
+Remembers antivirus verdicts on disk, keyed by the file's SHA-256 and the engine that
+produced them, so identical content is not rescanned (or looked up again on a metered
+API) until the verdict expires.
+"""
+import os
+import time
+from typing import Optional
+
+from json_file_cache import JsonFileCache
+
+class ScanVerdictCache(JsonFileCache):
+    """A thread-safe, TTL'd on-disk cache of scan verdicts keyed by (SHA-256, engine)."""
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_sec: float = 7 * 24 * 3600, max_entries: int = 20000):
+        """
+        Initializes the ScanVerdictCache.
+
+        Args:
+            cache_dir (str, optional): Directory for cache files. Defaults to ./scan_cache.
+            ttl_sec (float): Default verdict lifetime. Signatures improve over time, so even
+                             clean verdicts should eventually be rechecked.
+            max_entries (int): Oldest entries are evicted beyond this count.
+        """
+        super().__init__(cache_dir or os.path.join(os.getcwd(), "scan_cache"), ttl_sec, max_entries)
+
+    def _path(self, file_hash: str, engine: str) -> str:
+        return os.path.join(self.cache_dir, f"{engine}_{file_hash}.json")
+
+    def get(self, file_hash: str, engine: str) -> Optional[dict]:
+        """Returns the cached verdict ({'status', 'threats_found', 'scan_date'}), or None if absent or expired."""
+        if not file_hash:
+            return None
+        path = self._path(file_hash, engine)
+        if (entry := self._read(path)) is None:
+            return None
+        if time.time() > entry.get('expires_at', 0):
+            self._remove(path)
+            return None
+        return entry.get('verdict')
+
+    def put(self, file_hash: str, engine: str, verdict: dict, ttl_sec: Optional[float] = None):
+        """Stores a verdict. `ttl_sec` overrides the default lifetime (e.g. shorter for 'unknown' lookups)."""
+        if not file_hash:
+            return
+        entry = {'saved_at': time.time(), 'expires_at': time.time() + (self.ttl_sec if ttl_sec is None else ttl_sec), 'verdict': verdict}
+        self._write(self._path(file_hash, engine), entry, f"scan verdict for {file_hash}")
+
+    def invalidate(self, file_hash: str, engine: str):
+        self._remove(self._path(file_hash, engine))
@@ -0,0 +1,176 @@
+"""
+Scan Engines for LoadifyPro
+The interface antivirus engines implement to plug into AntivirusManager (with the scan
+status and result types they fill in), and a ClamAV engine that talks the clamd protocol.
+clamd can receive a file's bytes while they download (INSTREAM), so its verdict is ready
+the moment the download completes.
+"""
+import abc
+import queue
+import socket
+import struct
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (status, threats): status is a ScanStatus value; None when a streamed scan could not complete
+StreamVerdict = Optional[Tuple[str, List[str]]]
+
+class ScanStatus(Enum):
+    PENDING, SCANNING, CLEAN, INFECTED, ERROR, QUARANTINED, TIMEOUT, SKIPPED, CANCELLED = "PENDING", "SCANNING", "CLEAN", "INFECTED", "ERROR", "QUARANTINED", "TIMEOUT", "SKIPPED", "CANCELLED"
+
+@dataclass
+class ScanResult:
+    file_path: str; engine: str; status: ScanStatus  # engine: the config's engine id (an AntivirusEngine value for built-ins)
+    threats_found: List[str] = field(default_factory=list)
+    scan_time: float = 0.0
+    scan_date: str = field(default_factory=lambda: time.strftime('%Y-%m-%d %H:%M:%S'))
+    error_message: str = ""; file_hash: str = ""
+    from_cache: bool = False
+    cache_ttl_sec: Optional[float] = None  # Overrides the verdict cache's default lifetime for this result
+
+class StreamScan(abc.ABC):
+    """A scan fed incrementally with a file's bytes, in order, as they are written."""
+
+    @abc.abstractmethod
+    def feed(self, data: bytes): ...
+
+    @abc.abstractmethod
+    def finish(self) -> StreamVerdict:
+        """Ends the stream and returns its verdict, or None if the file must be scanned from disk instead."""
+
+    @abc.abstractmethod
+    def abort(self): ...
+
+class ScanEngine(abc.ABC):
+    """Interface for antivirus engines (see AntivirusManager.register_engine)."""
+
+    @abc.abstractmethod
+    def scan_file(self, file_path: str, config: dict, result: ScanResult) -> ScanResult:
+        """Scans a file on disk, filling in and returning `result`."""
+
+    def open_stream(self, config: dict) -> Optional[StreamScan]:
+        """Starts a scan fed while the file downloads; None if the engine cannot scan streams."""
+        return None
+
+def _parse_address(address: str):
+    """(Internal) 'host:port', 'tcp://host:port' or 'unix:///path/clamd.sock' -> (socket family, address)."""
+    if address.startswith('unix://'):
+        return socket.AF_UNIX, address[len('unix://'):]
+    host, _, port = address[len('tcp://'):].rpartition(':') if address.startswith('tcp://') else address.rpartition(':')
+    return socket.AF_INET, (host.strip('[]') or '127.0.0.1', int(port or 3310))
+
+class ClamdEngine(ScanEngine):
+    """
+    ClamAV via a clamd daemon (local or remote). Config keys: 'address' (default
+    127.0.0.1:3310), 'timeout' in seconds and 'stream_during_download' (default True).
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def _connect(self, config: dict) -> socket.socket:
+        family, address = _parse_address(config.get('address') or '127.0.0.1:3310')
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(config.get('timeout', 60))
+        try:
+            sock.connect(address)
+            sock.sendall(b"zINSTREAM\0")
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _send_chunk(sock: socket.socket, data: bytes):
+        sock.sendall(struct.pack('>I', len(data)) + data)
+
+    @staticmethod
+    def _read_reply(sock: socket.socket) -> Tuple[str, List[str], str]:
+        """(Internal) Ends the stream and parses clamd's reply into (status, threats, error message)."""
+        try:
+            sock.sendall(struct.pack('>I', 0))
+        except OSError:
+            pass  # clamd closes early when a size limit is hit; its reply explains why
+        reply = b""
+        while not reply.endswith(b"\0") and (data := sock.recv(4096)):
+            reply += data
+        reply_text = reply.rstrip(b"\0").decode('utf-8', 'replace').strip()
+        if reply_text.endswith(" OK"):
+            return "CLEAN", [], ""
+        if reply_text.endswith(" FOUND"):
+            return "INFECTED", [reply_text[len("stream: "):-len(" FOUND")] if reply_text.startswith("stream: ") else reply_text[:-len(" FOUND")]], ""
+        return "ERROR", [], reply_text or "clamd closed the connection without a verdict."
+
+    def scan_file(self, file_path: str, config: dict, result):
+        with self._connect(config) as sock:
+            with open(file_path, 'rb') as f:
+                try:
+                    while chunk := f.read(self.CHUNK_SIZE): self._send_chunk(sock, chunk)
+                except OSError:
+                    pass  # Size limit exceeded; read the reason below
+            status, threats, error = self._read_reply(sock)
+        result.status, result.error_message = ScanStatus(status), error
+        result.threats_found.extend(threats)
+        return result
+
+    def open_stream(self, config: dict) -> Optional[StreamScan]:
+        if not config.get('stream_during_download', True):
+            return None
+        return ClamdStream(self, config)
+
+class ClamdStream(StreamScan):
+    """
+    INSTREAM session fed from a download. Sending happens on its own thread behind a
+    bounded buffer, so a slow daemon never stalls the transfer: if the buffer overflows
+    the stream is abandoned and the file is scanned from disk after the download.
+    """
+    MAX_BUFFERED_CHUNKS = 1024
+
+    def __init__(self, engine: ClamdEngine, config: dict):
+        self.engine = engine
+        self.config = config
+        self.chunks: queue.Queue = queue.Queue(maxsize=self.MAX_BUFFERED_CHUNKS)
+        self.failed = threading.Event()
+        self.verdict: StreamVerdict = None
+        self.sender = threading.Thread(target=self._send_loop, name="clamd-stream", daemon=True)
+        self.sender.start()
+
+    def _send_loop(self):
+        sock = None
+        try:
+            sock = self.engine._connect(self.config)
+            while (chunk := self.chunks.get()) is not None:
+                if self.failed.is_set(): return
+                self.engine._send_chunk(sock, chunk)
+            status, threats, error = self.engine._read_reply(sock)
+            if status == "ERROR": logger.warning(f"clamd stream scan failed: {error}")
+            else: self.verdict = (status, threats)
+        except OSError as e:
+            logger.warning(f"clamd stream scan failed: {e}")
+            self.failed.set()
+        finally:
+            if sock: sock.close()
+
+    def feed(self, data: bytes):
+        if self.failed.is_set(): return
+        try:
+            self.chunks.put_nowait(data)
+        except queue.Full:
+            logger.warning("clamd stream fell behind the download; the file will be scanned after it completes.")
+            self.abort()
+
+    def finish(self) -> StreamVerdict:
+        if self.failed.is_set():
+            return None
+        self.chunks.put(None)
+        self.sender.join(self.config.get('timeout', 60))
+        return None if self.failed.is_set() else self.verdict
+
+    def abort(self):
+        self.failed.set()
+        try: self.chunks.put_nowait(None)  # Wake the sender if it is idle
+        except queue.Full: pass
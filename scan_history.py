@@ -0,0 +1,139 @@
+"""
+Scan History for LoadifyPro
+Keeps antivirus scan results in a bounded in-memory ring for quick access to recent
+scans and in an indexed SQLite store for queries by hash, path, status and date.
+Old records are removed by age and count so long-running instances stay bounded.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scanned_at REAL NOT NULL,
+    file_path TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    status TEXT NOT NULL,
+    threats TEXT NOT NULL,
+    scan_time REAL NOT NULL,
+    error_message TEXT NOT NULL,
+    from_cache INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_hash ON scans (file_hash);
+CREATE INDEX IF NOT EXISTS scans_path ON scans (file_path);
+CREATE INDEX IF NOT EXISTS scans_status_date ON scans (status, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_date ON scans (scanned_at);
+"""
+# Retention is enforced once per this many inserts rather than on every write
+RETENTION_EVERY = 200
+
+class ScanHistory:
+    """Thread-safe scan history: a ring of recent ScanResults backed by an SQLite database."""
+
+    def __init__(self, db_path: Optional[str] = None, memory_size: int = 500, retention_days: float = 90, max_records: int = 100000):
+        """
+        Initializes the ScanHistory.
+
+        Args:
+            db_path (str, optional): SQLite file. Defaults to ./scan_history.db.
+            memory_size (int): Number of recent results kept in memory.
+            retention_days (float): Records older than this are deleted. 0 keeps them regardless of age.
+            max_records (int): The oldest records beyond this count are deleted. 0 means no limit.
+        """
+        self.db_path = db_path or os.path.join(os.getcwd(), "scan_history.db")
+        self.recent_results: deque = deque(maxlen=memory_size)
+        self.retention_days = retention_days
+        self.max_records = max_records
+        self.inserts_since_retention = 0
+        self.lock = threading.Lock()
+        self.db: Optional[sqlite3.Connection] = None
+        try:
+            self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+            self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Scan history database unavailable, keeping recent scans in memory only: {e}")
+            self.db = None
+        self.apply_retention()
+
+    def add(self, result):
+        """Records a finished ScanResult."""
+        row = (time.time(), result.file_path, result.file_hash, str(result.engine), result.status.value,
+               json.dumps(result.threats_found), result.scan_time, result.error_message, int(result.from_cache))
+        with self.lock:
+            self.recent_results.append(result)
+            if not self.db: return
+            try:
+                self.db.execute("INSERT INTO scans (scanned_at, file_path, file_hash, engine, status, threats, scan_time, error_message, from_cache) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                self.db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to record scan of {result.file_path}: {e}")
+            self.inserts_since_retention += 1
+            if self.inserts_since_retention < RETENTION_EVERY: return
+        self.apply_retention()
+
+    def recent(self, limit: int = 50) -> list:
+        """Returns up to `limit` of the most recent ScanResults, newest first."""
+        with self.lock:
+            return list(self.recent_results)[::-1][:limit]
+
+    def query(self, file_hash: Optional[str] = None, file_path: Optional[str] = None, status: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, offset: int = 0, limit: int = 100) -> dict:
+        """
+        Searches the stored history, newest first.
+
+        Args:
+            file_hash (str, optional): Only scans of content with this SHA-256.
+            file_path (str, optional): Only scans of exactly this path.
+            status (str, optional): Only scans with this ScanStatus value (case-insensitive).
+            since (float, optional): Only scans at or after this Unix time.
+            until (float, optional): Only scans before this Unix time.
+            offset (int): Number of matching scans to skip.
+            limit (int): Maximum number of scans to return.
+
+        Returns:
+            A dict with the matching 'total' and the requested page of 'scans'.
+        """
+        clauses, args = [], []
+        for column, value in (('file_hash', file_hash.lower() if file_hash else None), ('file_path', file_path), ('status', status.upper() if status else None)):
+            if value: clauses.append(f"{column} = ?"); args.append(value)
+        if since is not None: clauses.append("scanned_at >= ?"); args.append(since)
+        if until is not None: clauses.append("scanned_at < ?"); args.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            if not self.db:
+                return {'total': 0, 'offset': offset, 'limit': limit, 'scans': []}
+            total = self.db.execute(f"SELECT COUNT(*) FROM scans {where}", args).fetchone()[0]
+            rows = self.db.execute(f"SELECT scanned_at, file_path, file_hash, engine, status, threats, scan_time, error_message, from_cache "
+                                   f"FROM scans {where} ORDER BY scanned_at DESC, id DESC LIMIT ? OFFSET ?", args + [limit, offset]).fetchall()
+        scans = [{'scanned_at': r[0], 'scan_date': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r[0])), 'file_path': r[1], 'file_hash': r[2],
+                  'engine': r[3], 'status': r[4], 'threats_found': json.loads(r[5]), 'scan_time': r[6], 'error_message': r[7], 'from_cache': bool(r[8])} for r in rows]
+        return {'total': total, 'offset': offset, 'limit': limit, 'scans': scans}
+
+    def apply_retention(self):
+        """Deletes records older than retention_days and the oldest ones beyond max_records."""
+        with self.lock:
+            self.inserts_since_retention = 0
+            if not self.db: return
+            try:
+                if self.retention_days > 0:
+                    self.db.execute("DELETE FROM scans WHERE scanned_at < ?", (time.time() - self.retention_days * 86400,))
+                if self.max_records > 0:
+                    self.db.execute("DELETE FROM scans WHERE id <= (SELECT id FROM scans ORDER BY id DESC LIMIT 1 OFFSET ?)", (self.max_records,))
+                self.db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to apply scan history retention: {e}")
+
+    def close(self):
+        with self.lock:
+            if self.db: self.db.close(); self.db = None
@@ -2,15 +2,90 @@
 Download Scheduler for LoadifyPro
 Manages time-based scheduling for starting download tasks in a non-blocking background thread.
 """
-import sched
+import os
+import json
+import uuid
+import heapq
+import itertools
 import time
 import threading
 import logging
-from typing import Callable, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+class MisfirePolicy:
+    """Enum-like class for what to do with runs of a recurring job missed while the app was closed."""
+    SKIP, RUN_ONCE, RUN_ALL = "skip", "run_once", "run_all"
+
+MAX_CATCH_UP_RUNS = 5  # Upper bound on missed runs replayed under MisfirePolicy.RUN_ALL
+CATCH_UP_SPACING_SEC = 60  # Replayed runs are spread out instead of all firing at startup
+
+CRON_ALIASES = {'@hourly': '0 * * * *', '@daily': '0 0 * * *', '@midnight': '0 0 * * *', '@weekly': '0 0 * * 0', '@monthly': '0 0 1 * *', '@yearly': '0 0 1 1 *'}
+
+class CronSchedule:
+    """
+    A parsed five-field cron expression ("minute hour day-of-month month day-of-week").
+    Supports '*', lists, ranges and steps, e.g. "0 2 * * *" or "*/15 9-17 * * 1-5".
+    Day-of-week uses 0 (or 7) for Sunday; like cron, if both day fields are restricted
+    a day matches when either does.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = self._parse_field(fields[2], 1, 31)
+        self.months = self._parse_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in self._parse_field(fields[4], 0, 7)}
+        self.days_restricted, self.weekdays_restricted = fields[2] != '*', fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(','):
+            spec, _, step = part.partition('/')
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(v) for v in spec.split('-', 1))
+            else:
+                start = end = int(spec)
+                if step: end = high
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Returns the first matching minute strictly after `moment`."""
+        t = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + 5
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
 class Job:
     """A data class representing a single scheduled job."""
     def __init__(self, job_id: str, start_time: datetime, action: Callable, args: tuple):
@@ -19,16 +94,45 @@ class Job:
         self.action = action
         self.args = args
         self.is_cancelled = False
+        # Set only for recurring jobs, which are persisted and restored by action name
+        self.cron: Optional[CronSchedule] = None
+        self.action_name: Optional[str] = None
+        self.misfire_policy = MisfirePolicy.RUN_ONCE
+        self.last_run: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {'id': self.id, 'cron': self.cron.expression, 'action': self.action_name, 'args': list(self.args),
+                'next_run': self.start_time.isoformat(), 'last_run': self.last_run.isoformat() if self.last_run else None,
+                'misfire_policy': self.misfire_policy}
 
 class Scheduler:
-    """A thread-safe scheduler for managing time-based tasks."""
+    """
+    A thread-safe scheduler for managing time-based tasks.
+
+    Pending jobs live in a heap ordered by monotonic deadline. The worker thread sleeps
+    on a condition variable until the earliest deadline (or until an earlier job is
+    scheduled) and hands due jobs to a thread pool, so actions never run under the lock.
+    Cancelled jobs are dropped from the job table immediately and their heap entries are
+    discarded lazily when they surface.
 
-    def __init__(self):
-        self.scheduler = sched.scheduler(time.monotonic, time.sleep)
+    Recurring (cron) jobs reference a registered action by name so they can be persisted
+    to `jobs_file` and restored on startup with restore_jobs().
+    """
+
+    def __init__(self, max_workers: int = 4, jobs_file: str = 'scheduled_jobs.json'):
         self.jobs: dict[str, Job] = {}
+        self.actions: Dict[str, Callable] = {}
+        self.jobs_file = jobs_file
+        self.unrestored_jobs: list = []  # Persisted entries restore_jobs() could not load, written back unchanged
+        self.save_lock = threading.Lock()
+        self.queue: list[tuple[float, int, str]] = []  # (deadline, sequence, job_id) heap
+        self.sequence = itertools.count()
+        self.max_workers = max_workers
+        self.executor: Optional[ThreadPoolExecutor] = None
         self.worker_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
         self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
         logger.info("Scheduler initialized.")
 
     def start(self):
@@ -38,6 +142,7 @@ class Scheduler:
             return
 
         self.stop_event.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduler-job")
         self.worker_thread = threading.Thread(target=self._run, daemon=True)
         self.worker_thread.start()
         logger.info("Scheduler worker thread started.")
@@ -48,58 +153,199 @@ class Scheduler:
             return
 
         self.stop_event.set()
+        with self.wakeup:
+            self.wakeup.notify()
         self.worker_thread.join(timeout=5) # Wait for thread to finish
+        if self.executor:
+            self.executor.shutdown(wait=False)
         logger.info("Scheduler worker thread stopped.")
 
     def _run(self):
         """The main loop for the scheduler thread."""
         while not self.stop_event.is_set():
-            with self.lock:
-                self.scheduler.run(blocking=False)
-            time.sleep(1) # Check for new events every second
+            due = []
+            with self.wakeup:
+                now = time.monotonic()
+                while self.queue and (self.queue[0][0] <= now or self.queue[0][2] not in self.jobs):
+                    _, _, job_id = heapq.heappop(self.queue)
+                    if (job := self.jobs.pop(job_id, None)) and not job.is_cancelled:
+                        due.append(job)
+                        if job.cron: self._reschedule_recurring(job)
+                if not due:
+                    timeout = self.queue[0][0] - now if self.queue else None
+                    self.wakeup.wait(timeout)
+                    continue
+            for job in due:
+                self.executor.submit(self._execute_job, job)
+            if any(job.cron for job in due): self._save_jobs()
 
     def schedule_task(self, start_time: datetime, action: Callable, args: tuple = ()) -> str:
         """Schedules a new task to be executed at a specific time."""
-        job_id = f"job_{int(time.time() * 1000)}"
-        job = Job(job_id, start_time, action, args)
-        
+        job = Job(self._new_job_id(), start_time, action, args)
+        with self.wakeup:
+            self._enqueue(job)
+        logger.info(f"Scheduled job {job.id} to run at {start_time}.")
+        return job.id
+
+    def register_action(self, name: str, action: Callable):
+        """Registers a callable that recurring jobs can refer to by name."""
+        self.actions[name] = action
+
+    def schedule_recurring(self, cron_expression: str, action_name: str, args: tuple = (), misfire_policy: str = MisfirePolicy.RUN_ONCE) -> str:
+        """
+        Schedules a persisted job that runs a registered action on a cron schedule.
+
+        Args:
+            cron_expression (str): Five-field cron expression, e.g. "0 2 * * *" for every night at 02:00.
+            action_name (str): Name of an action registered with register_action().
+            args (tuple): JSON-serializable arguments passed to the action.
+            misfire_policy (str): A MisfirePolicy value applied to runs missed while the app was closed.
+        """
+        if action_name not in self.actions:
+            raise ValueError(f"Unknown scheduler action: {action_name}")
+        cron = CronSchedule(cron_expression)
+        job = self._make_recurring(self._new_job_id(), cron, action_name, args, misfire_policy, cron.next_after(datetime.now()))
+        with self.wakeup:
+            self._enqueue(job)
+        self._save_jobs()
+        logger.info(f"Scheduled recurring job {job.id} ('{cron_expression}', next run {job.start_time}).")
+        return job.id
+
+    def restore_jobs(self):
+        """
+        Loads persisted recurring jobs, replaying missed runs according to each job's misfire policy.
+        Entries that cannot be loaded yet (e.g. their action is not registered) stay in the jobs file;
+        calling this again after registering more actions restores them.
+        """
+        try:
+            with open(self.jobs_file, 'r') as f:
+                saved_jobs = json.load(f)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Could not read scheduled jobs from {self.jobs_file}: {e}")
+            return
+
+        now = datetime.now()
+        unrestored = []
+        for data in saved_jobs:
+            if isinstance(data, dict) and data.get('id') in self.jobs: continue  # Already restored
+            try:
+                if data['action'] not in self.actions:
+                    raise ValueError(f"action '{data['action']}' is not registered")
+                cron = CronSchedule(data['cron'])
+                next_run = datetime.fromisoformat(data['next_run'])
+                job = self._make_recurring(data['id'], cron, data['action'], tuple(data.get('args', ())), data.get('misfire_policy', MisfirePolicy.RUN_ONCE), next_run)
+                if data.get('last_run'): job.last_run = datetime.fromisoformat(data['last_run'])
+            except (KeyError, TypeError, ValueError) as e:
+                # Kept in the jobs file, e.g. for an action that a later version or plugin registers
+                logger.error(f"Could not restore scheduled job {data}, keeping it for later: {e}")
+                unrestored.append(data)
+                continue
+
+            missed = 0
+            while next_run <= now and missed <= MAX_CATCH_UP_RUNS:
+                missed += 1
+                next_run = cron.next_after(next_run)
+            if next_run <= now:
+                next_run = cron.next_after(now)
+            catch_up = {MisfirePolicy.SKIP: 0, MisfirePolicy.RUN_ONCE: min(missed, 1)}.get(job.misfire_policy, min(missed, MAX_CATCH_UP_RUNS))
+            job.start_time = next_run
+            with self.wakeup:
+                self._enqueue(job)
+                for i in range(catch_up):
+                    self._enqueue(self._catch_up_copy(job, now + timedelta(seconds=i * CATCH_UP_SPACING_SEC)))
+            logger.info(f"Restored recurring job {job.id}: {missed} missed run(s), {catch_up} replayed, next run {next_run}.")
+        with self.lock:
+            self.unrestored_jobs = unrestored
+        self._save_jobs()
+
+    def sync_recurring(self, action_name: str, entries: List[Tuple[str, tuple, str]]):
+        """
+        Makes the recurring jobs of one action match `entries`, (cron expression, args, misfire policy)
+        tuples. Jobs that already match keep their schedule; the rest are cancelled and missing ones added.
+        """
+        key = lambda cron_expression, args, misfire_policy: (cron_expression.strip(), json.dumps(list(args)), misfire_policy)
+        wanted = list(entries)
         with self.lock:
-            self.jobs[job_id] = job
-            delay = (start_time - datetime.now()).total_seconds()
-            delay = max(delay, 0) # Ensure delay is not negative
-            
-            self.scheduler.enter(delay, 1, self._execute_job, (job_id,))
-        
-        logger.info(f"Scheduled job {job_id} to run at {start_time}.")
-        return job_id
+            existing = [job for job in self.jobs.values() if job.cron and job.action_name == action_name]
+        for job in existing:
+            match = next((entry for entry in wanted if key(*entry) == key(job.cron.expression, job.args, job.misfire_policy)), None)
+            if match: wanted.remove(match)
+            else: self.cancel_job(job.id)
+        for cron_expression, args, misfire_policy in wanted:
+            try:
+                self.schedule_recurring(cron_expression, action_name, args, misfire_policy)
+            except ValueError as e:
+                logger.error(f"Ignoring invalid recurring job '{cron_expression}': {e}")
+
+    def _new_job_id(self) -> str:
+        return f"job_{uuid.uuid4().hex}"
+
+    def _make_recurring(self, job_id: str, cron: CronSchedule, action_name: str, args: tuple, misfire_policy: str, next_run: datetime) -> Job:
+        job = Job(job_id, next_run, self.actions[action_name], tuple(args))
+        job.cron, job.action_name, job.misfire_policy = cron, action_name, misfire_policy
+        return job
+
+    def _catch_up_copy(self, job: Job, run_at: datetime) -> Job:
+        """(Internal) A one-shot, non-persisted run of a recurring job's action."""
+        return Job(self._new_job_id(), run_at, job.action, job.args)
+
+    def _enqueue(self, job: Job):
+        """(Internal) Adds a job to the table and heap. Caller holds the lock."""
+        delay = (job.start_time - datetime.now()).total_seconds()
+        deadline = time.monotonic() + max(delay, 0) # Ensure delay is not negative
+        self.jobs[job.id] = job
+        heapq.heappush(self.queue, (deadline, next(self.sequence), job.id))
+        if self.queue[0][2] == job.id:
+            self.wakeup.notify() # New earliest deadline, re-arm the worker's wait
+
+    def _reschedule_recurring(self, job: Job):
+        """(Internal) Re-queues a recurring job that just fired under its existing id. Caller holds the lock."""
+        job.last_run = job.start_time
+        job.start_time = job.cron.next_after(max(job.start_time, datetime.now()))
+        self._enqueue(job)
+
+    def _save_jobs(self):
+        """(Internal) Atomically writes all recurring jobs to the jobs file."""
+        with self.lock:
+            snapshot = [job.to_dict() for job in self.jobs.values() if job.cron] + self.unrestored_jobs
+        with self.save_lock:
+            tmp_file = f"{self.jobs_file}.{os.getpid()}.{uuid.uuid4().hex}.tmp"  # Another instance may be saving too
+            try:
+                with open(tmp_file, 'w') as f:
+                    json.dump(snapshot, f, indent=4)
+                os.replace(tmp_file, self.jobs_file)
+            except IOError as e:
+                logger.error(f"Failed to save scheduled jobs to {self.jobs_file}: {e}")
+                if os.path.exists(tmp_file): os.remove(tmp_file)
 
     def cancel_job(self, job_id: str) -> bool:
         """Cancels a pending scheduled job."""
         with self.lock:
-            if job_id in self.jobs:
-                self.jobs[job_id].is_cancelled = True
-                # Clean up from low-level scheduler queue
-                for event in self.scheduler.queue[:]: # Iterate over a copy
-                    if event.argument and event.argument[0] == job_id:
-                        try:
-                            self.scheduler.cancel(event)
-                        except ValueError:
-                            pass # Event might have already been executed
-                logger.info(f"Cancelled scheduled job {job_id}.")
-                return True
+            job = self.jobs.pop(job_id, None)
+            if job:
+                job.is_cancelled = True
+                self._compact_queue()
+        if job:
+            if job.cron: self._save_jobs()
+            logger.info(f"Cancelled scheduled job {job_id}.")
+            return True
         logger.warning(f"Could not cancel job {job_id}: not found.")
         return False
 
-    def _execute_job(self, job_id: str):
+    def _compact_queue(self):
+        """(Internal) Rebuilds the heap once cancelled entries outnumber live ones. Caller holds the lock."""
+        if len(self.queue) > 2 * len(self.jobs) + 64:
+            self.queue = [entry for entry in self.queue if entry[2] in self.jobs]
+            heapq.heapify(self.queue)
+
+    def _execute_job(self, job: Job):
         """Wrapper to execute the job's action, handling cancellation and errors."""
-        with self.lock:
-            job = self.jobs.get(job_id)
-            if job and not job.is_cancelled:
-                logger.info(f"Executing scheduled job {job_id}.")
-                try:
-                    job.action(*job.args)
-                except Exception as e:
-                    logger.error(f"Error executing job {job_id}: {e}")
-                finally:
-                    if job_id in self.jobs:
-                        del self.jobs[job_id]
\ No newline at end of file
+        if job.is_cancelled:
+            return
+        logger.info(f"Executing scheduled job {job.id}.")
+        try:
+            job.action(*job.args)
+        except Exception as e:
+            logger.error(f"Error executing job {job.id}: {e}")
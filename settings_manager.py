@@ -2,17 +2,26 @@
 Settings Manager for LoadifyPro
 Handles loading and saving of user preferences from a JSON file.
 """
+import os
 import json
+import uuid
+import threading
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
 class SettingsManager:
     """Manages loading and saving application settings to/from a JSON file."""
 
-    def __init__(self, settings_file: str = 'settings.json'):
+    def __init__(self, settings_file: str = 'settings.json', save_delay_sec: float = 1.0):
         self.settings_file = settings_file
+        self.save_delay_sec = save_delay_sec
+        self.pending_json: Optional[tuple] = None  # (serialized settings, seq) waiting for the debounced write
+        self.save_timer: Optional[threading.Timer] = None
+        self.save_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.snapshot_seq = self.written_seq = 0  # Orders writes, so an older snapshot never overwrites a newer one
         self.defaults: Dict[str, Any] = {
             'language': 'en',
             'appearance_mode': 'Dark',
@@ -20,11 +29,40 @@ class SettingsManager:
             'proxy_enabled': False,
             'proxy_http': '',
             'proxy_https': '',
+            'proxy_bypass': ['localhost', '127.0.0.0/8', '::1'],
+            'proxy_pool_enabled': False,
+            'proxy_pool': [],
+            'proxy_pool_policy': 'weighted',
+            'proxy_pool_check_url': '',
+            'proxy_pool_check_interval_sec': 60,
             'speed_limit_enabled': False,
             'speed_limit_kb': 1024,
+            'bandwidth_profiles_enabled': False,
+            'bandwidth_profiles': [],
+            'scheduled_downloads': [],
             'auth_enabled': False,
             'auth_user': '',
             'auth_pass': '',
+            'auth_credentials': [],
+            'ingest_dedup_window_sec': 10,
+            'ingest_rate_per_origin': 5,
+            'ingest_burst_per_origin': 20,
+            'metadata_cache_ttl_sec': 1800,
+            'concurrent_fragments': 4,
+            'max_connections': 16,
+            'device_writer_limit': 0,
+            'device_writer_limits': {},
+            'write_behind_enabled': False,
+            'write_behind_buffer_mb': 16,
+            'write_behind_coalesce_kb': 1024,
+            'fsync_policy': 'never',
+            'fsync_by_destination': {},
+            'video_worker_processes': 0,
+            'auto_quality_target_min': 10,
+            'av_max_concurrent_scans': 2,
+            'av_cache_ttl_hours': 168,
+            'av_history_retention_days': 90,
+            'av_history_max_records': 100000,
             'av_configs': {},
             'av_active_config': None
         }
@@ -41,9 +79,47 @@ class SettingsManager:
         return current_settings
 
     def save_settings(self):
-        try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=4)
-            logger.info(f"Settings successfully saved to {self.settings_file}.")
-        except IOError as e:
-            logger.error(f"Failed to save settings to {self.settings_file}: {e}")
\ No newline at end of file
+        """Writes the settings now (replacing any pending debounced save)."""
+        data = json.dumps(self.settings, indent=4)
+        with self.save_lock:
+            if self.save_timer: self.save_timer.cancel(); self.save_timer = None
+            self.pending_json = None
+            self.snapshot_seq += 1; seq = self.snapshot_seq
+        self._write(data, seq)
+
+    def schedule_save(self):
+        """
+        Saves the settings after `save_delay_sec`, coalescing bursts of changes into one write.
+        The settings are serialized now, so later in-place edits cannot race the writer thread.
+        """
+        data = json.dumps(self.settings, indent=4)
+        with self.save_lock:
+            self.snapshot_seq += 1
+            self.pending_json = (data, self.snapshot_seq)
+            if self.save_timer: self.save_timer.cancel()
+            self.save_timer = threading.Timer(self.save_delay_sec, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        """Writes a pending debounced save immediately (called on shutdown)."""
+        with self.save_lock:
+            if self.save_timer: self.save_timer.cancel(); self.save_timer = None
+            pending, self.pending_json = self.pending_json, None
+        if pending is not None: self._write(*pending)
+
+    def _write(self, data: str, seq: int):
+        """(Internal) Atomically replaces the settings file, so a crash mid-write cannot corrupt it."""
+        tmp_file = f"{self.settings_file}.{os.getpid()}.{uuid.uuid4().hex}.tmp"  # Another instance may be saving too
+        with self.write_lock:
+            if seq < self.written_seq: return
+            try:
+                with open(tmp_file, 'w') as f:
+                    f.write(data)
+                    f.flush(); os.fsync(f.fileno())
+                os.replace(tmp_file, self.settings_file)
+                self.written_seq = seq
+                logger.info(f"Settings successfully saved to {self.settings_file}.")
+            except (IOError, OSError) as e:
+                logger.error(f"Failed to save settings to {self.settings_file}: {e}")
+                if os.path.exists(tmp_file): os.remove(tmp_file)
\ No newline at end of file
@@ -4,73 +4,150 @@ Provides application-wide bandwidth management using a thread-safe
 token bucket algorithm for smooth and accurate rate limiting.
 """
 import time
+import asyncio
 import threading
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Bounds for the byte credits handed to a single transfer per limiter call
+MIN_GRANT_BYTES = 64 * 1024
+MAX_GRANT_BYTES = 4 * 1024 * 1024
+# Longest single sleep, so waiting threads notice when the limit is lifted
+MAX_SLEEP_SLICE = 0.25
+
 class SpeedLimiter:
     """
     A thread-safe speed limiter using the token bucket algorithm. This allows for
     smooth and accurate bandwidth throttling across multiple download threads.
+
+    The bucket is tracked as a single "theoretical arrival time" (GCRA): each
+    reservation pushes it forward by amount / rate, and the caller waits until its
+    bytes fall inside the burst window. Callers are therefore paced in the order they
+    reserved, with exactly one lock acquisition per reservation.
     """
 
     def __init__(self):
         """Initializes the SpeedLimiter."""
         self.rate_limit_bytes_per_sec = 0
-        self.tokens = 0.0
-        self.last_refill_time = time.monotonic()
+        self.burst_bytes = 0.0
+        self.theoretical_arrival = time.monotonic()
         self.lock = threading.Lock()
         self.is_enabled = False
         logger.info("SpeedLimiter initialized.")
 
-    def configure(self, is_enabled: bool, limit_kb_per_sec: float):
+    def configure(self, is_enabled: bool, limit_kb_per_sec: float, burst_kb: Optional[float] = None):
         """
         Configures and enables or disables the speed limit.
 
         Args:
             is_enabled (bool): Whether the speed limit should be active.
             limit_kb_per_sec (float): The speed limit in kilobytes per second.
+            burst_kb (float, optional): Bucket capacity in kilobytes. Defaults to one second of traffic.
         """
         with self.lock:
             self.is_enabled = is_enabled
             if self.is_enabled and limit_kb_per_sec > 0:
                 self.rate_limit_bytes_per_sec = limit_kb_per_sec * 1024
-                self.tokens = self.rate_limit_bytes_per_sec
-                logger.info(f"Speed limit ENABLED and set to {limit_kb_per_sec:.2f} KB/s.")
+                self.burst_bytes = burst_kb * 1024 if burst_kb and burst_kb > 0 else self.rate_limit_bytes_per_sec
+                self.theoretical_arrival = time.monotonic()  # Start with a full bucket
+                logger.info(f"Speed limit ENABLED and set to {limit_kb_per_sec:.2f} KB/s (burst {self.burst_bytes / 1024:.0f} KB).")
             else:
                 self.is_enabled = False
                 self.rate_limit_bytes_per_sec = 0
                 logger.info("Speed limit DISABLED.")
 
+    def reserve(self, amount_bytes: int) -> float:
+        """
+        Reserves `amount_bytes` from the bucket without blocking.
+
+        Returns:
+            The number of seconds the caller must wait before transferring the bytes.
+        """
+        if not self.is_enabled or amount_bytes <= 0:
+            return 0.0
+
+        with self.lock:
+            rate = self.rate_limit_bytes_per_sec
+            if rate <= 0: return 0.0
+            now = time.monotonic()
+            self.theoretical_arrival = max(self.theoretical_arrival, now) + amount_bytes / rate
+            return max(0.0, self.theoretical_arrival - self.burst_bytes / rate - now)
+
+    def refund(self, amount_bytes: int):
+        """Returns reserved but unused bytes to the bucket."""
+        if not self.is_enabled or amount_bytes <= 0:
+            return
+        with self.lock:
+            if self.rate_limit_bytes_per_sec > 0:
+                now = time.monotonic()
+                self.theoretical_arrival = max(now, self.theoretical_arrival - amount_bytes / self.rate_limit_bytes_per_sec)
+
     def consume(self, amount_bytes: int):
         """
         Consume a number of bytes from the bucket. If not enough tokens are
         available, this method will block until they are replenished.
         """
-        if not self.is_enabled or self.rate_limit_bytes_per_sec <= 0:
+        deadline = time.monotonic() + self.reserve(amount_bytes)
+        while self.is_enabled and (remaining := deadline - time.monotonic()) > 0:
+            time.sleep(min(remaining, MAX_SLEEP_SLICE))
+
+    async def consume_async(self, amount_bytes: int):
+        """Awaitable variant of consume() for asyncio code."""
+        deadline = time.monotonic() + self.reserve(amount_bytes)
+        while self.is_enabled and (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.sleep(min(remaining, MAX_SLEEP_SLICE))
+
+    def credit(self, grant_bytes: Optional[int] = None) -> 'ByteCredit':
+        """Creates a per-transfer ByteCredit drawing from this limiter."""
+        return ByteCredit(self, grant_bytes)
+
+    def default_grant_bytes(self) -> int:
+        """Grant size worth roughly 50 ms of traffic at the current rate, within sane bounds."""
+        return int(min(max(self.rate_limit_bytes_per_sec / 20, MIN_GRANT_BYTES), MAX_GRANT_BYTES))
+
+class ByteCredit:
+    """
+    A single transfer's running byte allowance. Chunks are charged locally without
+    touching the limiter; only when the allowance runs out is a new grant reserved,
+    so a transfer takes one lock per grant instead of one per chunk.
+    Not thread-safe: create one per transfer thread or task.
+    """
+
+    def __init__(self, limiter: SpeedLimiter, grant_bytes: Optional[int] = None):
+        self.limiter = limiter
+        self.grant_bytes = grant_bytes
+        self.balance = 0
+
+    def _next_grant(self) -> int:
+        grant = self.grant_bytes or self.limiter.default_grant_bytes()
+        return max(grant, -self.balance)
+
+    def consume(self, amount_bytes: int):
+        """Charges `amount_bytes`, blocking for a new grant when the allowance is exhausted."""
+        if not self.limiter.is_enabled:
+            self.balance = 0
+            return
+        self.balance -= amount_bytes
+        if self.balance < 0:
+            grant = self._next_grant()
+            self.limiter.consume(grant)
+            self.balance += grant
+
+    async def consume_async(self, amount_bytes: int):
+        """Awaitable variant of consume() for asyncio code."""
+        if not self.limiter.is_enabled:
+            self.balance = 0
             return
+        self.balance -= amount_bytes
+        if self.balance < 0:
+            grant = self._next_grant()
+            await self.limiter.consume_async(grant)
+            self.balance += grant
 
-        if amount_bytes <= 0: return
-
-        needed = amount_bytes
-        while needed > 0:
-            with self.lock:
-                self._refill()
-                consume_amount = min(needed, self.tokens)
-                if consume_amount > 0:
-                    self.tokens -= consume_amount
-                    needed -= consume_amount
-
-            if needed > 0:
-                sleep_duration = needed / self.rate_limit_bytes_per_sec
-                time.sleep(sleep_duration)
-
-    def _refill(self):
-        """(Internal) Adds new tokens to the bucket based on elapsed time."""
-        now = time.monotonic()
-        elapsed = now - self.last_refill_time
-        if elapsed > 0:
-            new_tokens = elapsed * self.rate_limit_bytes_per_sec
-            self.tokens = min(self.tokens + new_tokens, self.rate_limit_bytes_per_sec)
-            self.last_refill_time = now
\ No newline at end of file
+    def release(self):
+        """Returns any unused allowance to the limiter at the end of a transfer."""
+        if self.balance > 0:
+            self.limiter.refund(self.balance)
+        self.balance = 0
@@ -0,0 +1,124 @@
+"""
+Download Status Hub for LoadifyPro
+Keeps a thread-safe snapshot of every download for external clients (HTTP API) and
+fans out coalesced progress and state changes to stream subscribers.
+"""
+import threading
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# DownloadItem attributes exposed to external clients
+PUBLIC_FIELDS = ('id', 'url', 'filename', 'destination', 'state', 'progress', 'total_size', 'downloaded_size',
+                 'speed', 'time_remaining', 'fragment_progress', 'quality', 'is_youtube', 'scan_status', 'error_message')
+
+class StatusSubscription:
+    """
+    A single stream consumer. Updates for the same item are merged until the consumer
+    collects them, so a slow client receives the latest state instead of a backlog.
+    """
+
+    def __init__(self, hub: 'DownloadStatusHub'):
+        self.hub = hub
+        self.pending: Dict[str, dict] = {}
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def _push(self, item_id: str, update: dict):
+        with self.condition:
+            self.pending.setdefault(item_id, {'id': item_id}).update(update)
+            self.condition.notify()
+
+    def get(self, timeout: float) -> Optional[List[dict]]:
+        """
+        Waits up to `timeout` seconds for changes.
+
+        Returns:
+            A list of merged per-item changes (empty on timeout), or None once the subscription is closed.
+        """
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed:
+                return None
+            changes, self.pending = list(self.pending.values()), {}
+            return changes
+
+    def close(self):
+        self.hub.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+class DownloadStatusHub:
+    """Thread-safe registry of download snapshots shared by the UI update path and the HTTP API."""
+
+    def __init__(self):
+        self.snapshots: Dict[str, dict] = {}
+        self.subscribers: List[StatusSubscription] = []
+        self.lock = threading.Lock()
+        logger.info("DownloadStatusHub initialized.")
+
+    def register(self, item):
+        """Records a newly created DownloadItem."""
+        snapshot = {name: getattr(item, name, None) for name in PUBLIC_FIELDS}
+        with self.lock:
+            self.snapshots[item.id] = snapshot
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber._push(item.id, snapshot)
+
+    def publish(self, item_id: str, update: dict):
+        """Applies a partial update (as passed to the UI update queue) and notifies subscribers."""
+        update = {key: value for key, value in update.items() if key in PUBLIC_FIELDS}
+        if not update:
+            return
+        with self.lock:
+            if item_id not in self.snapshots:
+                return
+            self.snapshots[item_id].update(update)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber._push(item_id, update)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        with self.lock:
+            snapshot = self.snapshots.get(item_id)
+            return dict(snapshot) if snapshot else None
+
+    def query(self, state: Optional[str] = None, url: Optional[str] = None, offset: int = 0, limit: int = 100) -> dict:
+        """
+        Lists downloads in creation order.
+
+        Args:
+            state (str, optional): Only include downloads in this DownloadState (case-insensitive).
+            url (str, optional): Only include downloads of exactly this URL.
+            offset (int): Number of matching downloads to skip.
+            limit (int): Maximum number of downloads to return.
+
+        Returns:
+            A dict with the matching 'total' and the requested page of 'downloads'.
+        """
+        with self.lock:
+            matches = [dict(s) for s in self.snapshots.values()
+                       if (not state or str(s['state']).upper() == state.upper()) and (not url or s['url'] == url)]
+        return {'total': len(matches), 'offset': offset, 'limit': limit, 'downloads': matches[offset:offset + limit]}
+
+    def subscribe(self) -> StatusSubscription:
+        subscription = StatusSubscription(self)
+        with self.lock:
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def close(self):
+        """Ends every open subscription (used on shutdown)."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
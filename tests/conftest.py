@@ -0,0 +1,42 @@
+"""
+Shared fixtures for the LoadifyPro tests: the project root on sys.path and local stub
+HTTP servers standing in for mirrors, proxies and third-party APIs.
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Base for stub request handlers; quiet, and HTTP/1.1 so connections are reused like real servers."""
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status: int, body: bytes = b'', headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def serve():
+    """serve(handler_class) starts a stub server on a free local port and returns its base URL's port."""
+    servers = []
+
+    def start(handler_class, host: str = '127.0.0.1') -> int:
+        server = ThreadingHTTPServer((host, 0), handler_class)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,69 @@
+import hashlib
+
+import pytest
+
+requests = pytest.importorskip('requests')
+from requests.utils import parse_dict_header
+
+from auth_manager import AuthManager
+from conftest import StubHandler
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode()).hexdigest()
+
+def test_digest_challenge_is_reused_across_requests(serve):
+    seen = {'requests': 0, 'challenges': 0}
+
+    class DigestServer(StubHandler):
+        def do_GET(self):
+            seen['requests'] += 1
+            header = self.headers.get('Authorization', '')
+            if header.startswith('Digest '):
+                p = parse_dict_header(header[len('Digest '):])
+                expected = _md5(f"{_md5('alice:files:secret')}:{p['nonce']}:{p['nc']}:{p['cnonce']}:auth:{_md5(f'GET:{self.path}')}")
+                if p['nonce'] == 'n1' and p['response'] == expected:
+                    return self.reply(200, b'ok')
+            seen['challenges'] += 1
+            self.reply(401, headers={'WWW-Authenticate': 'Digest realm="files", nonce="n1", qop="auth", opaque="o"'})
+
+    base = f"http://127.0.0.1:{serve(DigestServer)}"
+    manager = AuthManager()
+    manager.configure(True, '', '', [{'host': '127.0.0.1', 'realm': 'files', 'username': 'alice', 'password': 'secret'}])
+    for i in range(5):
+        assert requests.get(f"{base}/file{i}?part=1", auth=manager.get_auth(base)).content == b'ok'
+    assert seen == {'requests': 6, 'challenges': 1}
+
+def test_rejected_credentials_are_not_retried(serve):
+    seen = {'requests': 0}
+
+    class RejectingServer(StubHandler):
+        def do_GET(self):
+            seen['requests'] += 1
+            self.reply(401, headers={'WWW-Authenticate': 'Basic realm="files"'})
+
+    base = f"http://127.0.0.1:{serve(RejectingServer)}"
+    manager = AuthManager()
+    manager.configure(True, 'alice', 'wrong')
+    assert requests.get(base, auth=manager.get_auth(base)).status_code == 401
+    assert seen['requests'] == 1
+
+def test_redirect_target_never_gets_the_original_hosts_credentials(serve):
+    received = []
+
+    class OtherHost(StubHandler):
+        def do_GET(self):
+            received.append(self.headers.get('Authorization'))
+            self.reply(401, headers={'WWW-Authenticate': 'Basic realm="other"'})
+
+    other = f"http://localhost:{serve(OtherHost)}/file"
+
+    class RedirectingHost(StubHandler):
+        def do_GET(self):
+            self.reply(302, headers={'Location': other})
+
+    base = f"http://127.0.0.1:{serve(RedirectingHost)}"
+    manager = AuthManager()
+    manager.configure(True, '', '', [{'host': '127.0.0.1', 'username': 'alice', 'password': 'secret'}])
+    assert requests.get(base, auth=manager.get_auth(base)).status_code == 401
+    assert received == [None]
+    assert not manager.challenges
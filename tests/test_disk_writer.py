@@ -0,0 +1,23 @@
+import pytest
+
+from disk_writer import DiskWriter
+
+def test_write_behind_coalesces_and_writes_everything(tmp_path):
+    writer = DiskWriter()
+    writer.configure(True, buffer_mb=0.0625, coalesce_kb=16, fsync_default='close')
+    path = tmp_path / 'out.bin'
+    with writer.open(str(path)) as f:
+        for i in range(200):
+            f.write(bytes([i % 256]) * 1000)
+    assert path.read_bytes() == b''.join(bytes([i % 256]) * 1000 for i in range(200))
+
+def test_writer_errors_reach_the_receiver(tmp_path):
+    writer = DiskWriter()
+    writer.configure(True, buffer_mb=0.0625)
+    f = writer.open(str(tmp_path / 'out.bin'))
+    f.file.write = lambda data: 1 / 0  # Not an OSError
+    with pytest.raises(ZeroDivisionError):
+        for _ in range(1000):
+            f.write(b'x' * 8192)
+    with pytest.raises(ZeroDivisionError):
+        f.close()
@@ -0,0 +1,77 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from http_integration import HTTPIntegration
+from status_hub import DownloadStatusHub
+
+@pytest.fixture
+def server():
+    integration = HTTPIntegration(lambda url, quality: None, port=0, status_hub=DownloadStatusHub())
+    integration.start()
+    yield f"http://localhost:{integration.server.server_address[1]}"
+    integration.stop()
+
+def _get(url: str, origin: str = None):
+    request = urllib.request.Request(url, headers={'Origin': origin} if origin else {})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.headers, json.loads(response.read())
+
+def test_status_is_not_readable_by_web_pages(server):
+    headers, body = _get(f"{server}/downloads", origin='https://evil.example')
+    assert body['total'] == 0
+    assert headers.get('Access-Control-Allow-Origin') is None
+
+def test_status_is_readable_by_the_extension(server):
+    headers, _ = _get(f"{server}/downloads", origin='chrome-extension://abcdefghijklmnop')
+    assert headers.get('Access-Control-Allow-Origin') == 'chrome-extension://abcdefghijklmnop'
+
+def test_scan_history_is_not_readable_by_web_pages(tmp_path):
+    from scan_history import ScanHistory
+    history = ScanHistory(str(tmp_path / 'scans.db'))
+    integration = HTTPIntegration(lambda url, quality: None, port=0, scan_history=history)
+    integration.start()
+    try:
+        headers, body = _get(f"http://localhost:{integration.server.server_address[1]}/scans", origin='https://evil.example')
+    finally:
+        integration.stop()
+        history.close()
+    assert body['total'] == 0
+    assert headers.get('Access-Control-Allow-Origin') is None
+
+def test_device_stats_are_served(tmp_path):
+    from device_scheduler import DeviceScheduler
+    devices = DeviceScheduler(default_limit=2)
+    devices.acquire('a', str(tmp_path))
+    integration = HTTPIntegration(lambda url, quality: None, port=0, device_scheduler=devices)
+    integration.start()
+    try:
+        headers, body = _get(f"http://localhost:{integration.server.server_address[1]}/devices", origin='https://evil.example')
+    finally:
+        integration.stop()
+    assert [(device['active'], device['limit']) for device in body['devices']] == [(1, 2)]
+    assert headers.get('Access-Control-Allow-Origin') is None
+
+def _post(url: str, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+def test_batch_urls_must_be_a_list_of_strings():
+    received = []
+    integration = HTTPIntegration(lambda url, quality: received.append(url), port=0)
+    integration.start()
+    try:
+        base = f"http://localhost:{integration.server.server_address[1]}/add_downloads"
+        assert _post(base, {"urls": "http://x"})[0] == 400
+        assert _post(base, {"downloads": [{"url": 1}]})[0] == 400
+        status, body = _post(base, {"urls": ["http://a", "http://b"]})
+    finally:
+        integration.stop()
+    assert status == 202 and body['accepted'] == 2
+    assert received == ["http://a", "http://b"]
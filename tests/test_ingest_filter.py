@@ -0,0 +1,22 @@
+import time
+
+from ingest_filter import IngestDecision, IngestFilter
+
+def test_a_large_batch_costs_one_token():
+    ingest = IngestFilter(rate_per_origin=1, burst_per_origin=2)
+    decisions = ingest.check_batch([f"https://example.com/file{i}" for i in range(50)], 'chrome-extension://x')
+    assert decisions == [IngestDecision.ACCEPTED] * 50
+    assert ingest.check_batch(["https://example.com/more"], 'chrome-extension://x') == [IngestDecision.ACCEPTED]
+    assert ingest.check_batch(["https://example.com/again"], 'chrome-extension://x') == [IngestDecision.RATE_LIMITED]
+
+def test_retried_duplicates_do_not_extend_the_window():
+    ingest = IngestFilter(dedup_window_sec=0.2, rate_per_origin=0)
+    url = "https://example.com/file?utm_source=x"
+    assert ingest.check(url) == IngestDecision.ACCEPTED
+    ingest.release(url)
+    released = time.monotonic()
+    while time.monotonic() < released + 0.15:
+        assert ingest.check(url) == IngestDecision.DUPLICATE
+        time.sleep(0.03)
+    time.sleep(released + 0.25 - time.monotonic())
+    assert ingest.check(url) == IngestDecision.ACCEPTED
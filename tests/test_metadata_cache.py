@@ -0,0 +1,18 @@
+import os
+
+from metadata_cache import MetadataCache
+
+def test_prune_tolerates_entries_removed_by_another_process(tmp_path, monkeypatch):
+    cache = MetadataCache(str(tmp_path), max_entries=1)
+    for i in range(3):
+        cache.put(f"https://example.com/video{i}", {'title': i})
+    scandir = os.scandir
+
+    def listing_then_removing(path):
+        entries = list(scandir(path))
+        os.remove(entries[0].path)  # Another worker process deletes an entry after the listing
+        return entries
+
+    monkeypatch.setattr(os, 'scandir', listing_then_removing)
+    cache.prune()
+    assert len(os.listdir(tmp_path)) == 1
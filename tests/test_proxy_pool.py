@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+pytest.importorskip('requests')
+from proxy_pool import ProxyPool, ProxyStats
+from conftest import StubHandler
+
+CHECK_URL = 'http://mirror.invalid/generate_204'
+
+def _proxy(serve, state: dict) -> str:
+    """A stub proxy answering every request with state['status'] and recording the requested URLs."""
+    state.setdefault('requested', [])
+
+    class Proxy(StubHandler):
+        def do_GET(self):
+            state['requested'].append(self.path)
+            self.reply(state['status'])
+
+    return f"http://127.0.0.1:{serve(Proxy)}"
+
+def _pool(*urls) -> ProxyPool:
+    pool = ProxyPool(check_url=CHECK_URL, check_timeout_sec=5, eject_after_failures=2, eject_sec=60)
+    pool.proxies = {url: ProxyStats(url) for url in urls}  # Checks are run by hand instead of by the checker thread
+    return pool
+
+def test_health_checks_go_through_the_proxy_and_eject_failing_ones(serve):
+    good, bad = {'status': 204}, {'status': 502}
+    good_url, bad_url = _proxy(serve, good), _proxy(serve, bad)
+    pool = _pool(good_url, bad_url)
+    for _ in range(2):
+        for stats in list(pool.proxies.values()): pool.check(stats)
+    assert good['requested'] == [CHECK_URL] * 2
+    by_url = {entry['url']: entry for entry in pool.stats()}
+    assert not by_url[good_url]['ejected'] and by_url[good_url]['latency_ms'] is not None
+    assert by_url[bad_url]['ejected'] and by_url[bad_url]['consecutive_failures'] == 2
+    assert {pool.select('http://example.com/file') for _ in range(20)} == {good_url}
+
+def test_an_ejected_proxy_returns_once_a_check_passes(serve):
+    state = {'status': 502}
+    url = _proxy(serve, state)
+    pool = _pool(url)
+    stats = pool.proxies[url]
+    pool.check(stats); pool.check(stats)
+    assert stats.ejected
+    state['status'] = 204
+    pool.check(stats)
+    assert not stats.ejected and stats.consecutive_failures == 0
+
+def test_an_unreachable_proxy_fails_its_check():
+    pool = _pool('http://127.0.0.1:9')
+    stats = pool.proxies['http://127.0.0.1:9']
+    pool.check(stats)
+    assert stats.consecutive_failures == 1 and stats.latency is None
+
+def test_the_checker_survives_an_emptied_pool(serve):
+    state = {'status': 204}
+    url = _proxy(serve, state)
+    pool = ProxyPool(check_url=CHECK_URL, check_timeout_sec=5)
+    try:
+        pool.configure([url])
+        checker = pool.checker
+        pool.configure([])
+        pool.configure([url])
+        assert pool.checker is checker and checker.is_alive()
+        deadline = time.monotonic() + 5
+        while not state['requested'] and time.monotonic() < deadline: time.sleep(0.05)
+        assert state['requested']
+    finally:
+        pool.stop()
+    checker.join(5)
+    assert not checker.is_alive() and pool.checker is None
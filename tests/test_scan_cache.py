@@ -0,0 +1,10 @@
+from scan_cache import ScanVerdictCache
+
+def test_verdicts_expire_per_entry(tmp_path):
+    cache = ScanVerdictCache(str(tmp_path))
+    cache.put('abc', 'clamd', {'status': 'CLEAN', 'threats_found': []})
+    cache.put('def', 'clamd', {'status': 'CLEAN', 'threats_found': []}, ttl_sec=-1)
+    assert cache.get('abc', 'clamd') == {'status': 'CLEAN', 'threats_found': []}
+    assert cache.get('abc', 'virustotal') is None
+    assert cache.get('def', 'clamd') is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['clamd_abc.json']
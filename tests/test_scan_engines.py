@@ -0,0 +1,57 @@
+import socketserver
+import struct
+import threading
+
+import pytest
+
+from scan_engines import ClamdEngine, ScanResult, ScanStatus
+
+EICAR = b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*'
+
+class ClamdStub(socketserver.BaseRequestHandler):
+    """Speaks clamd's zINSTREAM: length-prefixed chunks, a zero length, then a NUL-terminated verdict."""
+
+    def handle(self):
+        stream = self.request.makefile('rb')
+        assert stream.read(len(b'zINSTREAM\0')) == b'zINSTREAM\0'
+        data = b''
+        while (size := struct.unpack('>I', stream.read(4))[0]):
+            data += stream.read(size)
+        self.server.received.append(data)
+        self.request.sendall(b'stream: Eicar-Signature FOUND\0' if EICAR in data else b'stream: OK\0')
+
+@pytest.fixture
+def clamd():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), ClamdStub)
+    server.daemon_threads = True
+    server.received = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_scan_file_sends_the_file_over_instream(clamd, tmp_path):
+    engine = ClamdEngine()
+    engine.CHUNK_SIZE = 16  # Several chunks per file
+    config = {'address': f"127.0.0.1:{clamd.server_address[1]}", 'timeout': 5}
+    infected, clean = tmp_path / 'infected.com', tmp_path / 'clean.txt'
+    infected.write_bytes(EICAR)
+    clean.write_bytes(b'hello' * 10)
+    result = engine.scan_file(str(infected), config, ScanResult(str(infected), 'clamd', ScanStatus.SCANNING))
+    assert (result.status, result.threats_found) == (ScanStatus.INFECTED, ['Eicar-Signature'])
+    result = engine.scan_file(str(clean), config, ScanResult(str(clean), 'clamd', ScanStatus.SCANNING))
+    assert (result.status, result.threats_found) == (ScanStatus.CLEAN, [])
+    assert clamd.received == [EICAR, b'hello' * 10]
+
+def test_stream_scan_gives_a_verdict_when_the_download_ends(clamd):
+    stream = ClamdEngine().open_stream({'address': f"tcp://127.0.0.1:{clamd.server_address[1]}", 'timeout': 5})
+    for i in range(0, len(EICAR), 10):
+        stream.feed(EICAR[i:i + 10])
+    assert stream.finish() == ('INFECTED', ['Eicar-Signature'])
+
+def test_stream_scan_falls_back_when_clamd_is_unreachable():
+    with socketserver.TCPServer(('127.0.0.1', 0), ClamdStub) as closed:
+        port = closed.server_address[1]
+    stream = ClamdEngine().open_stream({'address': f"127.0.0.1:{port}", 'timeout': 5})
+    stream.feed(b'data')
+    assert stream.finish() is None
@@ -0,0 +1,50 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from scheduler import CATCH_UP_SPACING_SEC, MAX_CATCH_UP_RUNS, MisfirePolicy, Scheduler
+
+def _recurring(scheduler):
+    return sorted((job.cron.expression, job.args) for job in scheduler.jobs.values() if job.cron)
+
+def test_sync_recurring_keeps_matching_jobs(tmp_path):
+    scheduler = Scheduler(jobs_file=str(tmp_path / 'jobs.json'))
+    scheduler.register_action('add_downloads', lambda *args: None)
+    scheduler.sync_recurring('add_downloads', [('0 2 * * *', (['https://a'], None, 'best'), MisfirePolicy.RUN_ONCE),
+                                               ('not cron', ([], None, 'best'), MisfirePolicy.RUN_ONCE)])
+    kept = next(iter(scheduler.jobs))
+    scheduler.sync_recurring('add_downloads', [('0 2 * * *', (['https://a'], None, 'best'), MisfirePolicy.RUN_ONCE),
+                                               ('@hourly', (['https://b'], None, 'best'), MisfirePolicy.SKIP)])
+    assert kept in scheduler.jobs
+    assert _recurring(scheduler) == [('0 2 * * *', (['https://a'], None, 'best')), ('@hourly', (['https://b'], None, 'best'))]
+    scheduler.sync_recurring('add_downloads', [])
+    assert not scheduler.jobs
+
+def test_run_all_catch_up_is_capped_and_spread_out(tmp_path):
+    jobs_file = tmp_path / 'jobs.json'
+    long_ago = datetime.now() - timedelta(days=30)
+    jobs_file.write_text(json.dumps([{'id': 'job_1', 'cron': '@hourly', 'action': 'noop', 'args': [],
+                                      'next_run': long_ago.isoformat(), 'misfire_policy': MisfirePolicy.RUN_ALL}]))
+    scheduler = Scheduler(jobs_file=str(jobs_file))
+    scheduler.register_action('noop', lambda: None)
+    scheduler.restore_jobs()
+    deadlines = sorted(deadline for deadline, _, job_id in scheduler.queue if not scheduler.jobs[job_id].cron)
+    assert len(deadlines) == MAX_CATCH_UP_RUNS
+    assert deadlines[-1] - deadlines[0] >= (MAX_CATCH_UP_RUNS - 1) * CATCH_UP_SPACING_SEC - 1
+    assert deadlines[0] <= time.monotonic()
+
+def test_jobs_for_unregistered_actions_survive_a_restore(tmp_path):
+    jobs_file = tmp_path / 'jobs.json'
+    saved = [{'id': 'job_1', 'cron': '@daily', 'action': 'from_plugin', 'args': [], 'next_run': datetime.now().isoformat(), 'misfire_policy': MisfirePolicy.SKIP},
+             {'id': 'job_2', 'cron': '@hourly', 'action': 'noop', 'args': [], 'next_run': datetime.now().isoformat(), 'misfire_policy': MisfirePolicy.SKIP}]
+    jobs_file.write_text(json.dumps(saved))
+    scheduler = Scheduler(jobs_file=str(jobs_file))
+    scheduler.register_action('noop', lambda: None)
+    scheduler.restore_jobs()
+    assert list(scheduler.jobs) == ['job_2']
+    assert sorted(job['id'] for job in json.loads(jobs_file.read_text())) == ['job_1', 'job_2']
+
+    scheduler.register_action('from_plugin', lambda: None)
+    scheduler.restore_jobs()
+    assert sorted(scheduler.jobs) == ['job_1', 'job_2']
+    assert not scheduler.unrestored_jobs
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+from virustotal_client import QuotaExceededError, VirusTotalClient
+from conftest import StubHandler
+
+KNOWN = 'a' * 64
+
+@pytest.fixture
+def virustotal(serve):
+    seen = []
+
+    class VirusTotalStub(StubHandler):
+        def do_GET(self):
+            seen.append((self.path, self.headers.get('x-apikey')))
+            if self.path == f'/api/v3/files/{KNOWN}':
+                body = {'data': {'attributes': {'last_analysis_stats': {'malicious': 3, 'harmless': 60}}}}
+                return self.reply(200, json.dumps(body).encode(), {'Content-Type': 'application/json'})
+            if self.path.endswith('/limited'):
+                return self.reply(429, headers={'Retry-After': '0'})
+            self.reply(404)
+
+    return f"http://127.0.0.1:{serve(VirusTotalStub)}/api/v3", seen
+
+def test_lookup_returns_analysis_stats(virustotal):
+    base_url, seen = virustotal
+    client = VirusTotalClient('key', base_url, requests_per_minute=0)
+    assert client.lookup_file(KNOWN) == {'malicious': 3, 'harmless': 60}
+    assert client.lookup_file('b' * 64) is None
+    assert seen == [(f'/api/v3/files/{KNOWN}', 'key'), (f"/api/v3/files/{'b' * 64}", 'key')]
+
+def test_rate_limit_and_daily_quota_raise(virustotal):
+    base_url, seen = virustotal
+    client = VirusTotalClient('key', base_url, requests_per_minute=0, daily_quota=2)
+    with pytest.raises(QuotaExceededError):
+        client.lookup_file('limited')
+    client.lookup_file(KNOWN)
+    assert client.remaining_quota() == 0
+    with pytest.raises(QuotaExceededError):
+        client.lookup_file(KNOWN)
+    assert len(seen) == 2  # The lookup over quota never reached the server
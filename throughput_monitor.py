@@ -0,0 +1,62 @@
+"""
+Throughput Monitor for LoadifyPro
+Keeps a smoothed estimate of the transfer speed achieved per source host, fed from
+download progress updates. Used to pick a video quality that fits the link.
+"""
+import re
+import time
+import threading
+import logging
+from urllib.parse import urlsplit
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_HOST = re.compile(r'(^|\.)(youtube\.com|youtu\.be)$')
+
+def host_key(url: str) -> str:
+    """Returns the host a URL's throughput is tracked under; all YouTube URL forms share one entry."""
+    try:
+        host = (urlsplit(url.strip()).hostname or '').lower()
+    except ValueError:
+        return ''
+    if YOUTUBE_HOST.search(host):
+        return 'youtube.com'
+    return host[4:] if host.startswith('www.') else host
+
+class ThroughputMonitor:
+    """Thread-safe per-host exponentially weighted moving average of transfer speed."""
+
+    def __init__(self, alpha: float = 0.2, max_age_sec: float = 3600):
+        """
+        Initializes the ThroughputMonitor.
+
+        Args:
+            alpha (float): Weight of each new sample in the moving average.
+            max_age_sec (float): Estimates not refreshed for this long are discarded,
+                                 since the link may have changed in the meantime.
+        """
+        self.alpha = alpha
+        self.max_age_sec = max_age_sec
+        self.estimates: Dict[str, Tuple[float, float]] = {}  # host -> (bytes per second, last sample monotonic)
+        self.lock = threading.Lock()
+        logger.info("ThroughputMonitor initialized.")
+
+    def record(self, url: str, bytes_per_sec: float):
+        """Adds a speed sample for the host of `url`. Zero samples (transfer just starting) are ignored."""
+        if bytes_per_sec <= 0 or not (host := host_key(url)):
+            return
+        now = time.monotonic()
+        with self.lock:
+            previous = self.estimates.get(host)
+            if previous and now - previous[1] <= self.max_age_sec:
+                bytes_per_sec = previous[0] + self.alpha * (bytes_per_sec - previous[0])
+            self.estimates[host] = (bytes_per_sec, now)
+
+    def estimate(self, url: str) -> Optional[float]:
+        """Returns the smoothed bytes per second for the host of `url`, or None if unmeasured."""
+        with self.lock:
+            entry = self.estimates.get(host_key(url))
+        if not entry or time.monotonic() - entry[1] > self.max_age_sec:
+            return None
+        return entry[0]
@@ -27,7 +27,7 @@ class DownloadCard(ctk.CTkFrame):
 
     def _create_widgets(self):
         self.grid_columnconfigure(1, weight=1)
-        icon_text = "📹" if self.item.is_youtube else "📁"
+        icon_text = "📃" if getattr(self.item, 'is_group', False) else "📹" if self.item.is_youtube else "📁"
         ctk.CTkLabel(self, text=icon_text, font=ctk.CTkFont(size=24)).grid(row=0, column=0, rowspan=4, padx=15, pady=15, sticky="ns")
         
         self.filename_label = ctk.CTkLabel(self, text=self.item.filename, font=ctk.CTkFont(size=14, weight="bold"), anchor="w")
@@ -35,7 +35,7 @@ class DownloadCard(ctk.CTkFrame):
         
         # Quality label
         quality_text = getattr(self.item, 'quality', 'best')
-        quality_display = {'best': '🎬 Best', '2160p': '📺 4K', '1080p': '📺 1080p', '720p': '📺 720p', '480p': '📺 480p', '360p': '📺 360p', 'audio': '🎵 MP3', 'audio_m4a': '🎵 M4A'}.get(quality_text, f'📺 {quality_text}')
+        quality_display = {'auto': f"⚡ Auto {getattr(self.item, 'auto_format_label', '')}".rstrip(), 'best': '🎬 Best', '2160p': '📺 4K', '1080p': '📺 1080p', '720p': '📺 720p', '480p': '📺 480p', '360p': '📺 360p', 'audio': '🎵 MP3', 'audio_m4a': '🎵 M4A'}.get(quality_text, f'📺 {quality_text}')
         self.quality_label = ctk.CTkLabel(self, text=quality_display, font=ctk.CTkFont(size=10), text_color='#666')
         self.quality_label.grid(row=0, column=1, sticky="e", padx=10, pady=(10, 0))
 
@@ -101,6 +101,12 @@ class DownloadCard(ctk.CTkFrame):
             if self.item.state in [DownloadState.DOWNLOADING, DownloadState.PAUSED, DownloadState.QUEUED]:
                 context_menu.add_command(label="❌ Cancel Download", command=self._on_cancel)
             
+            # Scans of finished downloads: queued ones can be dropped, others requested ahead of the queue
+            if self.item.state == DownloadState.COMPLETED and self.item.scan_status == ScanStatus.PENDING.value:
+                context_menu.add_command(label="🛡️ Cancel Scan", command=self._on_cancel_scan)
+            elif self.item.state == DownloadState.COMPLETED and self.item.scan_status != ScanStatus.SCANNING.value:
+                context_menu.add_command(label="🛡️ Scan Now", command=self._on_scan)
+            
             # Add separator and info
             context_menu.add_separator()
             context_menu.add_command(label=f"📁 Open Folder", command=self._open_download_folder)
@@ -111,6 +117,16 @@ class DownloadCard(ctk.CTkFrame):
         except Exception as e:
             print(f"Error showing context menu: {e}")
 
+    def _on_scan(self):
+        """Request an antivirus scan of the downloaded file."""
+        if self.callbacks.get('scan_download'):
+            self.callbacks['scan_download'](self.item.id)
+
+    def _on_cancel_scan(self):
+        """Drop a scan that is still waiting in the queue."""
+        if self.callbacks.get('cancel_scan'):
+            self.callbacks['cancel_scan'](self.item.id)
+
     def _on_refresh_link(self):
         """Refresh the download link."""
         if self.callbacks.get('refresh_download_link'):
@@ -153,12 +169,13 @@ class DownloadCard(ctk.CTkFrame):
         
         # Update quality display
         quality_text = getattr(self.item, 'quality', 'best')
-        quality_display = {'best': '🎬 Best', '2160p': '📺 4K', '1080p': '📺 1080p', '720p': '📺 720p', '480p': '📺 480p', '360p': '📺 360p', 'audio': '🎵 MP3', 'audio_m4a': '🎵 M4A'}.get(quality_text, f'📺 {quality_text}')
+        quality_display = {'auto': f"⚡ Auto {getattr(self.item, 'auto_format_label', '')}".rstrip(), 'best': '🎬 Best', '2160p': '📺 4K', '1080p': '📺 1080p', '720p': '📺 720p', '480p': '📺 480p', '360p': '📺 360p', 'audio': '🎵 MP3', 'audio_m4a': '🎵 M4A'}.get(quality_text, f'📺 {quality_text}')
         self.quality_label.configure(text=quality_display)
         
         self.progress_bar.set(self.item.progress / 100)
         self.percentage_label.configure(text=f"{self.item.progress:.1f}%")
-        self.size_label.configure(text=f"{self._format_size(self.item.downloaded_size)} / {self._format_size(self.item.total_size)}")
+        fragments = getattr(self.item, 'fragment_progress', '')
+        self.size_label.configure(text=f"{self._format_size(self.item.downloaded_size)} / {self._format_size(self.item.total_size)}" + (f" · frag {fragments}" if fragments else ""))
         self.speed_label.configure(text=f"{self.item.speed:.2f} MB/s")
         self.eta_label.configure(text=f"{self.eta_label_prefix}: {self.item.time_remaining}")
         
@@ -287,6 +304,11 @@ class SettingsWindow(ctk.CTkToplevel):
         self.proxy_https_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
         row += 1
 
+        ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_proxy_bypass')).grid(row=row, column=0, padx=20, pady=5, sticky="w")
+        self.proxy_bypass_entry = ctk.CTkEntry(self.scrollable_frame, placeholder_text="localhost, *.corp.lan, 10.0.0.0/8")
+        self.proxy_bypass_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
+        row += 1
+
         # Speed Limiter Section
         ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_speed_limit'), font=ctk.CTkFont(size=16, weight="bold")).grid(row=row, column=0, columnspan=2, pady=(20, 10), padx=20, sticky="w")
         row += 1
@@ -326,6 +348,21 @@ class SettingsWindow(ctk.CTkToplevel):
         self.max_concurrent_entry = ctk.CTkEntry(self.scrollable_frame, placeholder_text="3")
         self.max_concurrent_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
         row += 1
+        
+        ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_concurrent_fragments')).grid(row=row, column=0, padx=20, pady=5, sticky="w")
+        self.concurrent_fragments_entry = ctk.CTkEntry(self.scrollable_frame, placeholder_text="4")
+        self.concurrent_fragments_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
+        row += 1
+        
+        ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_video_workers')).grid(row=row, column=0, padx=20, pady=5, sticky="w")
+        self.video_workers_entry = ctk.CTkEntry(self.scrollable_frame, placeholder_text="0")
+        self.video_workers_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
+        row += 1
+        
+        ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_auto_quality_target')).grid(row=row, column=0, padx=20, pady=5, sticky="w")
+        self.auto_quality_target_entry = ctk.CTkEntry(self.scrollable_frame, placeholder_text="10")
+        self.auto_quality_target_entry.grid(row=row, column=1, padx=20, pady=5, sticky="ew")
+        row += 1
 
         # Antivirus Settings Section
         ctk.CTkLabel(self.scrollable_frame, text=self.translator.get('settings_antivirus'), font=ctk.CTkFont(size=16, weight="bold")).grid(row=row, column=0, columnspan=2, pady=(20, 10), padx=20, sticky="w")
@@ -362,6 +399,7 @@ class SettingsWindow(ctk.CTkToplevel):
         self.proxy_enabled_var.set(s.get('proxy_enabled', False))
         self.proxy_http_entry.insert(0, s.get('proxy_http', ''))
         self.proxy_https_entry.insert(0, s.get('proxy_https', ''))
+        self.proxy_bypass_entry.insert(0, ', '.join(s.get('proxy_bypass', [])))
         
         # Speed Limiter Settings
         self.speed_limit_enabled_var.set(s.get('speed_limit_enabled', False))
@@ -374,6 +412,9 @@ class SettingsWindow(ctk.CTkToplevel):
         
         # Scheduler Settings
         self.max_concurrent_entry.insert(0, str(s.get('max_concurrent_downloads', 3)))
+        self.concurrent_fragments_entry.insert(0, str(s.get('concurrent_fragments', 4)))
+        self.video_workers_entry.insert(0, str(s.get('video_worker_processes', 0)))
+        self.auto_quality_target_entry.insert(0, str(s.get('auto_quality_target_min', 10)))
         
         # Antivirus Settings
         if av_active: self.engine_menu.set(av_active)
@@ -394,6 +435,7 @@ class SettingsWindow(ctk.CTkToplevel):
                 'proxy_enabled': self.proxy_enabled_var.get(),
                 'proxy_http': self.proxy_http_entry.get().strip(),
                 'proxy_https': self.proxy_https_entry.get().strip(),
+                'proxy_bypass': [rule.strip() for rule in self.proxy_bypass_entry.get().split(',') if rule.strip()],
                 
                 # Speed Limiter Settings
                 'speed_limit_enabled': self.speed_limit_enabled_var.get(),
@@ -406,6 +448,9 @@ class SettingsWindow(ctk.CTkToplevel):
                 
                 # Scheduler Settings
                 'max_concurrent_downloads': int(self.max_concurrent_entry.get() or 3),
+                'concurrent_fragments': int(self.concurrent_fragments_entry.get() or 4),
+                'video_worker_processes': int(self.video_workers_entry.get() or 0),
+                'auto_quality_target_min': int(self.auto_quality_target_entry.get() or 10),
                 
                 # Antivirus Settings
                 'av_active_config': self.engine_menu.get(),
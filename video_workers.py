@@ -0,0 +1,301 @@
+"""
+Video Worker Pool for LoadifyPro
+Runs yt-dlp jobs in separate worker processes so extraction and post-processing
+(pure Python, CPU-heavy) do not compete with the Tk loop for the GIL. Each worker is
+driven over a duplex pipe: the parent sends jobs and control messages, the worker
+streams back compact progress tuples.
+
+Messages are tuples tagged by their first element:
+    parent -> worker: ('j', job) start a job, ('p',) pause, ('c',) cancel,
+                      ('g', wait_seconds) speed-limit grant, ('l', enabled, bytes_per_sec) limit changed,
+                      None to exit
+    worker -> parent: ('p', values) progress (see PROGRESS_FIELDS), ('u', update) any other item update,
+                      ('b', n_bytes) speed-limit charge request, ('r', ok, n_bytes, seconds) proxy outcome,
+                      ('d', error_message) job finished
+
+Workers are started by running this file as a script (see _Worker) and connect back to
+the parent over a multiprocessing connection. Unlike multiprocessing's spawn start method,
+this never re-imports the parent's __main__ (the whole GUI) in the worker.
+"""
+import os
+import sys
+import time
+import queue
+import threading
+import subprocess
+import logging
+from multiprocessing.connection import Client, Listener
+from typing import Callable, List, Optional
+
+from download_core import DownloadItem, DownloadState, download_youtube_task
+
+logger = logging.getLogger(__name__)
+
+# Progress updates travel as a positional tuple in this order instead of a dict
+PROGRESS_FIELDS = ('total_size', 'downloaded_size', 'progress', 'speed', 'time_remaining', 'fragment_progress')
+# Progress is coalesced to at most one message per interval; the UI only redraws every 200 ms
+PROGRESS_INTERVAL = 0.1
+# How long a new worker process may take to connect back before it is given up on
+WORKER_START_TIMEOUT = 30
+# How often the parent checks the item's pause/cancel events and the speed limit while a job runs
+CONTROL_POLL_INTERVAL = 0.2
+
+class _RemoteSpeedLimiter:
+    """
+    (Internal) Worker-side stand-in for the app's SpeedLimiter. Charges are reserved from
+    the parent's limiter, so the global limit holds across all processes.
+    """
+
+    def __init__(self, send: Callable, is_enabled: bool, bytes_per_sec: float):
+        self.send = send
+        self.is_enabled = is_enabled
+        self.rate_limit_bytes_per_sec = bytes_per_sec
+        self.grants: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()  # One outstanding request, so grants cannot be mixed up between fragment threads
+
+    def consume(self, amount_bytes: int):
+        if not self.is_enabled or amount_bytes <= 0:
+            return
+        with self.lock:
+            self.send(('b', amount_bytes))
+            wait = self.grants.get()
+        if wait > 0: time.sleep(wait)
+
+class _ProxyStandIn:
+    """(Internal) Worker-side stand-in for ProxyManager carrying the proxies the parent chose for one job."""
+
+    def __init__(self, send: Callable, proxies: Optional[dict]):
+        self.send = send
+        self.proxies = proxies
+
+    def get_proxies(self, url: Optional[str] = None) -> Optional[dict]:
+        return self.proxies
+
+    def report(self, proxies: Optional[dict], ok: bool, n_bytes: int = 0, seconds: float = 0):
+        self.send(('r', ok, n_bytes, seconds))
+
+class _ThroughputStandIn:
+    """(Internal) Worker-side stand-in for ThroughputMonitor carrying the parent's estimate for the job's host."""
+
+    def __init__(self, bytes_per_sec: Optional[float]):
+        self.bytes_per_sec = bytes_per_sec
+
+    def estimate(self, url: str) -> Optional[float]:
+        return self.bytes_per_sec
+
+# DownloadItem attributes copied into the worker's copy of the item
+JOB_ITEM_FIELDS = ('id', 'quality', 'concurrent_fragments', 'downloaded_size', 'auto_target_sec', 'auto_format_id', 'auto_format_label', 'auto_throughput')
+
+def _worker_main(conn):
+    """(Internal) Entry point of a worker process: runs jobs from `conn` until told to exit."""
+    from metadata_cache import MetadataCache  # Imported here so the module stays cheap to import in the parent
+
+    send_lock = threading.Lock()
+    jobs: queue.Queue = queue.Queue()
+    current = {'item': None, 'limiter': None}
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def receive():
+        # The only reader of the pipe; control messages apply to the job in progress
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                item = current['item']
+                if item: item.cancel_event.set()
+                jobs.put(None)
+                return
+            tag, item, limiter = message[0], current['item'], current['limiter']
+            if tag == 'j':
+                # Set up here rather than in the job loop, so control messages sent right after the job are not lost
+                job = message[1]
+                item = DownloadItem(job['url'], job['destination'])
+                for name in JOB_ITEM_FIELDS: setattr(item, name, job['item'][name])
+                current['item'], current['limiter'] = item, _RemoteSpeedLimiter(send, *job['speed_limit'])
+                jobs.put(job)
+            elif tag == 'p' and item: item.pause_event.set()
+            elif tag == 'c' and item: item.cancel_event.set()
+            elif tag == 'g' and limiter: limiter.grants.put(message[1])
+            elif tag == 'l' and limiter: limiter.is_enabled, limiter.rate_limit_bytes_per_sec = message[1], message[2]
+
+    threading.Thread(target=receive, daemon=True).start()
+    while (job := jobs.get()) is not None:
+        item, limiter = current['item'], current['limiter']
+        cache = MetadataCache(job['metadata_cache_dir'], job['metadata_cache_ttl']) if job.get('metadata_cache_dir') else None
+        managers = {'proxy': _ProxyStandIn(send, job['proxies']), 'speed_limiter': limiter, 'metadata_cache': cache, 'throughput': _ThroughputStandIn(job['throughput'])}
+        last_sent, pending = 0.0, None
+
+        def update_callback(item_id, update):
+            nonlocal last_sent, pending
+            if update.keys() <= set(PROGRESS_FIELDS):
+                pending = tuple(update.get(name) for name in PROGRESS_FIELDS)
+                if time.monotonic() - last_sent < PROGRESS_INTERVAL: return
+                last_sent = time.monotonic()
+                send(('p', pending)); pending = None
+            else:
+                if pending: send(('p', pending)); pending = None  # Keep the last progress ahead of a state change
+                send(('u', update))
+
+        def finished_callback(item_id):
+            # Cleared before reporting, since the parent may send the next job as soon as it reads this.
+            # error_message is set on the item rather than sent as an update, so it travels with the finish message.
+            current['item'] = current['limiter'] = None
+            send(('d', item.error_message))
+
+        download_youtube_task(item, update_callback, finished_callback, managers)
+
+class _Worker:
+    """
+    (Internal) Parent-side handle of one worker process. The worker is this file run as a
+    script; it reads the connection's auth key from stdin and connects back to a one-off listener.
+    """
+
+    def __init__(self):
+        authkey = os.urandom(32)
+        with Listener(authkey=authkey) as listener:
+            self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), listener.address], stdin=subprocess.PIPE)
+            self.process.stdin.write(authkey); self.process.stdin.close()
+            accepted = {}
+
+            def accept():
+                try: accepted['conn'] = listener.accept()
+                except Exception as e: accepted['error'] = e
+
+            acceptor = threading.Thread(target=accept, name="video-worker-accept", daemon=True)
+            acceptor.start()
+            deadline = time.monotonic() + WORKER_START_TIMEOUT
+            while acceptor.is_alive() and self.process.poll() is None and time.monotonic() < deadline:
+                acceptor.join(0.1)
+            if acceptor.is_alive():
+                # The worker died or hung before connecting: connect ourselves so accept() returns
+                Client(listener.address, authkey=authkey).close()
+                acceptor.join()
+                if 'conn' in accepted: accepted['conn'].close()
+                self.process.kill()
+                raise RuntimeError("Video worker process did not start.")
+        if 'conn' not in accepted:
+            self.process.kill()
+            raise RuntimeError(f"Video worker process could not connect: {accepted.get('error')}")
+        self.conn = accepted['conn']
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        try: self.conn.send(None)
+        except OSError: pass
+        self.conn.close()
+
+class VideoWorkerPool:
+    """
+    Runs video downloads in a pool of worker processes. `run` has the signature of
+    download_youtube_task, so it can be used as a drop-in download thread target; the
+    calling thread only relays messages and spends its time blocked on the pipe.
+    """
+
+    def __init__(self, max_workers: int = 0):
+        """
+        Initializes the VideoWorkerPool. Processes are started on demand.
+
+        Args:
+            max_workers (int): Maximum number of worker processes. 0 disables the pool.
+        """
+        self.max_workers = max_workers
+        self.idle: List[_Worker] = []
+        self.busy = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        logger.info("VideoWorkerPool initialized.")
+
+    def set_max_workers(self, count: int):
+        """Resizes the pool. Waiting jobs start at once if it grew; surplus workers exit once their job is done."""
+        with self.condition:
+            self.max_workers = max(count, 0)
+            self.condition.notify_all()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0 and not self.closed
+
+    def _acquire(self) -> _Worker:
+        with self.condition:
+            while not self.idle and self.busy >= self.max_workers and not self.closed:
+                self.condition.wait()
+            if self.closed: raise RuntimeError("Video worker pool is closed.")
+            self.busy += 1
+            worker = self.idle.pop() if self.idle else None
+        if worker is None or not worker.is_alive():
+            try:
+                worker = _Worker()
+            except Exception:
+                with self.condition:
+                    self.busy -= 1; self.condition.notify()
+                raise
+        return worker
+
+    def _release(self, worker: Optional[_Worker], reusable: bool):
+        with self.condition:
+            self.busy -= 1
+            if worker and reusable and not self.closed and len(self.idle) + self.busy < self.max_workers:
+                self.idle.append(worker); worker = None
+            self.condition.notify()
+        if worker: worker.close()  # Broken, surplus after the pool was shrunk, or the pool is closed
+
+    def run(self, item: DownloadItem, update_callback: Callable, finished_callback: Callable, managers: dict):
+        """Runs download_youtube_task for `item` in a worker process, blocking until it finishes."""
+        speed_limiter, metadata_cache, throughput = managers['speed_limiter'], managers.get('metadata_cache'), managers.get('throughput')
+        worker, error_message, finished = None, None, False
+        try:
+            worker = self._acquire()
+            limit = (speed_limiter.is_enabled, speed_limiter.rate_limit_bytes_per_sec)
+            proxies = managers['proxy'].get_proxies(item.url)
+            worker.conn.send(('j', {
+                'url': item.url, 'destination': item.destination, 'item': {name: getattr(item, name) for name in JOB_ITEM_FIELDS},
+                'proxies': proxies, 'speed_limit': limit, 'throughput': throughput.estimate(item.url) if throughput else None,
+                'metadata_cache_dir': metadata_cache.cache_dir if metadata_cache else None,
+                'metadata_cache_ttl': metadata_cache.ttl_sec if metadata_cache else 0,
+            }))
+            paused = cancelled = False
+            while not finished:
+                if item.cancel_event.is_set() and not cancelled: worker.conn.send(('c',)); cancelled = True
+                if item.pause_event.is_set() and not paused: worker.conn.send(('p',)); paused = True
+                if (current := (speed_limiter.is_enabled, speed_limiter.rate_limit_bytes_per_sec)) != limit:
+                    worker.conn.send(('l', *current)); limit = current
+                if not worker.conn.poll(CONTROL_POLL_INTERVAL): continue
+                message = worker.conn.recv()
+                tag = message[0]
+                if tag == 'p': update_callback(item.id, {name: value for name, value in zip(PROGRESS_FIELDS, message[1]) if value is not None})
+                elif tag == 'u': update_callback(item.id, message[1])
+                elif tag == 'b': worker.conn.send(('g', speed_limiter.reserve(message[1])))
+                elif tag == 'r': managers['proxy'].report(proxies, *message[1:])
+                elif tag == 'd': item.error_message, finished = message[1] or item.error_message, True
+        except (EOFError, OSError) as e:
+            logger.error(f"Video worker process failed for {item.url}: {e}")
+            error_message = "Worker process exited unexpectedly."
+        except Exception as e:
+            logger.error(f"Video worker pool failed for {item.url}: {e}")
+            error_message = str(e)
+        finally:
+            if worker is not None: self._release(worker, reusable=finished)
+            if not finished:
+                # The worker never reported a final state (crash, or it could not be started)
+                item.error_message = error_message or "Video worker did not finish."
+                update_callback(item.id, {'state': DownloadState.CANCELLED if item.cancel_event.is_set() else DownloadState.ERROR})
+            finished_callback(item.id)
+
+    def close(self):
+        """Stops idle workers; busy ones exit with the application (their connection closes)."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.condition.notify_all()
+        for worker in idle: worker.close()
+
+if __name__ == '__main__':
+    # Worker process entry point (see _Worker): argv[1] is the parent's listener address, stdin the auth key
+    _worker_main(Client(sys.argv[1], authkey=sys.stdin.buffer.read()))
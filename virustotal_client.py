@@ -0,0 +1,106 @@
+"""
+VirusTotal Client for LoadifyPro
+A small, rate-limited client for VirusTotal file-hash lookups that keeps within the
+account's per-minute rate and daily quota. The base URL is configurable so a local
+stand-in server can take VirusTotal's place in tests.
+"""
+import time
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://www.virustotal.com/api/v3"
+
+class QuotaExceededError(Exception):
+    """Raised when the daily lookup quota is used up, or VirusTotal reports it is."""
+
+class VirusTotalClient:
+    """
+    Thread-safe VirusTotal lookup client. Requests are paced like SpeedLimiter paces bytes:
+    each request reserves the next slot (GCRA), so concurrent scans queue up in order
+    instead of tripping the API's rate limit.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, requests_per_minute: int = 4, daily_quota: int = 500, timeout: float = 30):
+        """
+        Initializes the VirusTotalClient.
+
+        Args:
+            api_key (str): VirusTotal API key.
+            base_url (str): API root, e.g. http://127.0.0.1:8999 for a local stand-in.
+            requests_per_minute (int): Sustained request rate (4 on the public API). 0 disables pacing.
+            daily_quota (int): Lookups allowed per UTC day (500 on the public API). 0 means unlimited.
+            timeout (float): Per-request timeout in seconds.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.requests_per_minute = requests_per_minute
+        self.daily_quota = daily_quota
+        self.timeout = timeout
+        self.theoretical_arrival = time.monotonic()
+        self.quota_day = self._today()
+        self.used_today = 0
+        self.blocked_until = 0.0  # monotonic; set when the server answers 429
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def _reserve(self) -> float:
+        """(Internal) Counts one request against the quota and returns how long to wait before sending it."""
+        with self.lock:
+            if (today := self._today()) != self.quota_day:
+                self.quota_day, self.used_today = today, 0
+            if self.daily_quota and self.used_today >= self.daily_quota:
+                raise QuotaExceededError(f"VirusTotal daily quota of {self.daily_quota} lookups is used up.")
+            self.used_today += 1
+            now = time.monotonic()
+            if self.requests_per_minute <= 0:
+                return max(0.0, self.blocked_until - now)
+            interval = 60.0 / self.requests_per_minute
+            self.theoretical_arrival = max(self.theoretical_arrival, now, self.blocked_until) + interval
+            return max(0.0, self.theoretical_arrival - self.requests_per_minute * interval - now)
+
+    def remaining_quota(self) -> Optional[int]:
+        """Lookups left today, or None if the quota is unlimited."""
+        with self.lock:
+            if not self.daily_quota: return None
+            return self.daily_quota - (self.used_today if self.quota_day == self._today() else 0)
+
+    def lookup_file(self, file_hash: str) -> Optional[dict]:
+        """
+        Fetches the report for a file hash, waiting for a rate slot first.
+
+        Returns:
+            The report's 'last_analysis_stats' dict, or None if VirusTotal does not know the file.
+
+        Raises:
+            QuotaExceededError: The daily quota is exhausted.
+            ConnectionError: The request failed.
+        """
+        if (wait := self._reserve()) > 0:
+            time.sleep(wait)
+        try:
+            response = self.session.get(f"{self.base_url}/files/{file_hash}", headers={"x-apikey": self.api_key}, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"VirusTotal API request failed: {e}")
+        if response.status_code == 404:
+            return None
+        if response.status_code == 429:
+            # Per-minute limit hit (e.g. shared key) or quota exhausted server-side: hold off all requests
+            retry_after = float(response.headers.get('Retry-After') or 60)
+            with self.lock:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            raise QuotaExceededError(f"VirusTotal rate limit or quota exceeded (retry after {retry_after:.0f}s).")
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"VirusTotal API request failed: {e}")
+        return response.json().get("data", {}).get("attributes", {}).get("last_analysis_stats", {})